@@ -0,0 +1,111 @@
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Tuple, Dict
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+FICLONE = 0x40049409
+
+def is_up_to_date(from_path: str, to_path: str) -> bool:
+    """
+        Checks if `to_path` already has the same size and mtime as `from_path`, which is what `place_file` leaves behind
+
+        Takes:
+        `from_path: str` => the source file
+        `to_path: str` => the copy
+
+        Returns
+        `bool`
+    """
+    try:
+        source = os.stat(from_path)
+        dest = os.stat(to_path)
+    except FileNotFoundError:
+        return False
+    return source.st_size == dest.st_size and source.st_mtime_ns == dest.st_mtime_ns
+
+def reflink(source_file, dest_file) -> None:
+    if fcntl is None:
+        raise OSError('reflinks are not supported here')
+    fcntl.ioctl(dest_file.fileno(), FICLONE, source_file.fileno())
+
+def copy_range(source_file, dest_file) -> None:
+    if not hasattr(os, 'copy_file_range'):
+        raise OSError('copy_file_range is not supported here')
+    size = os.fstat(source_file.fileno()).st_size
+    copied = 0
+    while copied < size:
+        count = os.copy_file_range(source_file.fileno(), dest_file.fileno(), size - copied)
+        if count == 0:
+            raise OSError(f'copy_file_range stopped after {copied} of {size} bytes')
+        copied += count
+
+def place_file(from_path: str, to_path: str, link: bool = False) -> str:
+    """
+        Puts a copy of `from_path` at `to_path` using the cheapest method the filesystem supports: a hardlink when `link` is set, then a reflink, then `copy_file_range` and finally a plain byte copy.
+        The copy is made next to `to_path` and renamed over it, and it keeps the mtime of the source so `is_up_to_date` can skip it next time.
+
+        Takes:
+        `from_path: str` => the source file
+        `to_path: str` => where the copy goes
+        `link: bool` => whether a hardlink may be used, the copy then shares its contents with the source
+
+        Returns
+        `method: str` => `link`, `reflink`, `copy_file_range` or `copy`
+    """
+    temp_path = f'{to_path}.{os.getpid()}.tmp'
+    if link:
+        try:
+            os.link(from_path, temp_path)
+            os.replace(temp_path, to_path)
+            return 'link'
+        except OSError:
+            if os.path.lexists(temp_path):
+                os.remove(temp_path)
+
+    method = 'copy'
+    try:
+        with open(from_path, 'rb') as source_file, open(temp_path, 'wb') as dest_file:
+            for name, function in (('reflink', reflink), ('copy_file_range', copy_range)):
+                try:
+                    function(source_file, dest_file)
+                    method = name
+                    break
+                except OSError:
+                    source_file.seek(0)
+                    dest_file.seek(0)
+                    dest_file.truncate()
+            else:
+                shutil.copyfileobj(source_file, dest_file)
+        shutil.copystat(from_path, temp_path)
+        os.replace(temp_path, to_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    return method
+
+def place_files(files: List[Tuple[str, str]], jobs: int = 8, link: bool = False) -> Dict[str, int]:
+    """
+        Runs `place_file` on every pair of files using a thread pool, since copying is mostly waiting on the disk
+
+        Takes:
+        `files: List[Tuple[str, str]]` => pairs of source and destination paths
+        `jobs: int` => how many files to copy at the same time
+        `link: bool` => whether hardlinks may be used
+
+        Returns
+        `methods: { method: count }` => how many files were placed with each method
+    """
+    methods: Dict[str, int] = {}
+    if jobs <= 1 or len(files) <= 1:
+        results = [place_file(from_path, to_path, link) for from_path, to_path in files]
+    else:
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            results = list(executor.map(lambda pair: place_file(pair[0], pair[1], link), files))
+    for method in results:
+        methods[method] = methods.get(method, 0) + 1
+    return methods
@@ -0,0 +1,266 @@
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import platform
+import tempfile
+import tracemalloc
+import contextlib
+from typing import Optional, Callable, Dict, List
+
+from helper_functions import markdown_to_blocks, block_to_block_type, text_to_textnodes, markdown_to_html_node, block_type_paragraph, extract_markdown_links, split_nodes_link, split_nodes_image
+from htmlnode import LeafNode, ParentNode
+from textnode import TextNode, TextType
+from template import Template
+from search import page_terms
+
+DOCUMENT_SIZES = {
+    'short': 1_000,
+    'medium': 20_000,
+    'large': 2_000_000,
+}
+DEFAULT_PAGE_COUNTS = [100, 1000]
+TEMPLATE = '<!DOCTYPE html>\n<html>\n<head>\n<title> {{ Title }} </title>\n<link href="/index.css" rel="stylesheet">\n</head>\n<body>\n<article>\n{{ Content }}\n</article>\n</body>\n</html>\n'
+WORDS = 'the quick brown fox jumps over a lazy dog while elves sing of ancient kings and hobbits eat second breakfast'.split()
+
+def random_sentence(rng: random.Random) -> str:
+    words = [rng.choice(WORDS) for _ in range(rng.randint(6, 16))]
+    for _ in range(rng.randint(0, 2)):
+        index = rng.randrange(len(words))
+        kind = rng.randrange(5)
+        if kind == 0:
+            words[index] = f'**{words[index]}**'
+        elif kind == 1:
+            words[index] = f'_{words[index]}_'
+        elif kind == 2:
+            words[index] = f'`{words[index]}`'
+        elif kind == 3:
+            words[index] = f'[{words[index]}](/blog/{words[index]})'
+        else:
+            words[index] = f'![{words[index]}](/images/{words[index]}.png)'
+    return ' '.join(words).capitalize() + '.'
+
+def random_block(rng: random.Random) -> str:
+    kind = rng.randrange(10)
+    if kind == 0:
+        return f'{"#" * rng.randint(2, 4)} {random_sentence(rng)}'
+    if kind == 1:
+        return '\n'.join(f'- {random_sentence(rng)}' for _ in range(rng.randint(2, 6)))
+    if kind == 2:
+        return '\n'.join(f'{i}. {random_sentence(rng)}' for i in range(1, rng.randint(2, 6)))
+    if kind == 3:
+        return '\n'.join(f'> {random_sentence(rng)}' for _ in range(rng.randint(1, 3)))
+    if kind == 4:
+        return '```\n' + '\n'.join(f'    {rng.choice(WORDS)}()' for _ in range(rng.randint(2, 8))) + '\n```'
+    return '\n'.join(random_sentence(rng) for _ in range(rng.randint(1, 5)))
+
+def generate_markdown(size: int, seed: int = 0) -> str:
+    """
+        Generates a markdown document that uses every block and inline type
+
+        Takes:
+        `size: int` => roughly how many characters the document should have
+        `seed: int` => the seed for the random generator, the same seed always gives the same document
+
+        Returns
+        `markdown: str`
+    """
+    rng = random.Random(seed)
+    blocks = [f'# Page {seed}']
+    length = len(blocks[0])
+    while length < size:
+        block = random_block(rng)
+        blocks.append(block)
+        length += len(block) + 2
+    return '\n\n'.join(blocks)
+
+def generate_link_page(links: int, seed: int = 0) -> str:
+    """
+        Generates a page that is mostly links, like an api index, with every link on its own list item and some repeated
+    """
+    rng = random.Random(seed)
+    items = []
+    for index in range(links):
+        name = f'{rng.choice(WORDS)}_{index % (links // 4 or 1)}'
+        items.append(f'- [{name}](/api/{name}/) and ![icon](/images/{rng.choice(WORDS)}.png)')
+    return '# API index\n\n' + '\n'.join(items)
+
+def generate_site(root: str, pages: int, size: int) -> None:
+    """
+        Writes a site with `pages` pages of roughly `size` characters into `root`, spread over nested folders like a blog
+    """
+    os.makedirs(os.path.join(root, 'static', 'images'))
+    with open(os.path.join(root, 'static', 'index.css'), 'w') as file:
+        file.write('body { margin: 0 auto; max-width: 40em; }\n')
+    with open(os.path.join(root, 'template.html'), 'w') as file:
+        file.write(TEMPLATE)
+    for page in range(pages):
+        directory = os.path.join(root, 'content', f'section{page % 10}', f'page{page}')
+        os.makedirs(directory)
+        with open(os.path.join(directory, 'index.md'), 'w') as file:
+            file.write(generate_markdown(size, page))
+
+def measure(function: Callable[[], object], repeat: int, min_time: float = 0.01) -> float:
+    """
+        Times `function` `repeat` times and returns the fastest run in seconds.
+        Fast functions are called in a loop until a run takes at least `min_time` so timer noise does not dominate.
+    """
+    loops = 1
+    best = float('inf')
+    for _ in range(repeat):
+        while True:
+            started = time.perf_counter()
+            for _ in range(loops):
+                function()
+            elapsed = time.perf_counter() - started
+            if elapsed >= min_time or loops >= 1_000_000:
+                break
+            loops *= 10
+        best = min(best, elapsed / loops)
+    return best
+
+def bench_stages(name: str, markdown: str, repeat: int, results: Dict[str, float]) -> None:
+    blocks = markdown_to_blocks(markdown)
+    texts = [' '.join(block.split('\n')) for block in blocks if block_to_block_type(block) == block_type_paragraph]
+    node = markdown_to_html_node(markdown)
+    html = node.to_html()
+    template = Template(TEMPLATE)
+
+    def file_io():
+        with tempfile.NamedTemporaryFile('w+', suffix='.html') as file:
+            file.write(html)
+            file.flush()
+            file.seek(0)
+            file.read()
+
+    results[f'{name}/markdown_to_blocks'] = measure(lambda: markdown_to_blocks(markdown), repeat)
+    results[f'{name}/block_to_block_type'] = measure(lambda: [block_to_block_type(block) for block in blocks], repeat)
+    results[f'{name}/text_to_textnodes'] = measure(lambda: [text_to_textnodes(text) for text in texts], repeat)
+    results[f'{name}/markdown_to_html_node'] = measure(lambda: markdown_to_html_node(markdown), repeat)
+    results[f'{name}/to_html'] = measure(node.to_html, repeat)
+    results[f'{name}/page_terms'] = measure(lambda: page_terms(node), repeat)
+    results[f'{name}/template'] = measure(lambda: template.render({'Title': 'Title', 'Content': node}), repeat)
+    results[f'{name}/file_io'] = measure(file_io, repeat)
+
+def bench_links(links: int, repeat: int, results: Dict[str, float]) -> None:
+    markdown = generate_link_page(links)
+    text = ' '.join(markdown.split('\n')[2:])
+    nodes = [TextNode(text, TextType.TEXT)]
+
+    results[f'links{links}/extract_markdown_links'] = measure(lambda: extract_markdown_links(text), repeat)
+    results[f'links{links}/split_nodes'] = measure(lambda: split_nodes_image(split_nodes_link(nodes)), repeat)
+    results[f'links{links}/text_to_textnodes'] = measure(lambda: text_to_textnodes(text), repeat)
+    results[f'links{links}/markdown_to_html_node'] = measure(lambda: markdown_to_html_node(markdown), repeat)
+
+def bench_build(pages: int, size: int, repeat: int, jobs: int) -> float:
+    """
+        Times an end to end build of a generated site the same way `main()` runs it
+    """
+    from main import main
+
+    root = tempfile.mkdtemp(prefix='bench-site-')
+    cwd = os.getcwd()
+    try:
+        generate_site(root, pages, size)
+        os.chdir(root)
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            return measure(lambda: main(['/', '--jobs', str(jobs)]), repeat, min_time=0)
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(root)
+
+def bench_node_memory(count: int = 10_000) -> Dict[str, float]:
+    """
+        Measures how many bytes a single node takes, not counting the strings it holds
+    """
+    results = {}
+    factories = {
+        'TextNode': lambda: TextNode('text', TextType.TEXT),
+        'LeafNode': lambda: LeafNode('b', 'text'),
+        'ParentNode': lambda: ParentNode('p', []),
+    }
+    for name, factory in factories.items():
+        tracemalloc.start()
+        nodes = [factory() for _ in range(count)]
+        size, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        results[f'memory/{name}'] = size / len(nodes)
+    return results
+
+def compare(results: Dict[str, float], baseline: Dict[str, float], threshold: float) -> List[str]:
+    """
+        Prints every result next to its baseline
+
+        Returns
+        `regressions: List[str]` => the names of results that got slower than `threshold`, eg 0.1 for 10%
+    """
+    regressions = []
+    for name, value in results.items():
+        old_value = baseline.get(name)
+        if not old_value:
+            print(f'{name:45} {value:12.6f}')
+            continue
+        change = value / old_value - 1
+        marker = ''
+        if change > threshold:
+            marker = '  REGRESSION'
+            regressions.append(name)
+        print(f'{name:45} {value:12.6f} {old_value:12.6f} {change:+8.1%}{marker}')
+    return regressions
+
+def parse_args(argv: Optional[list] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Benchmarks every stage of the markdown pipeline and full site builds')
+    parser.add_argument('--sizes', nargs='+', default=['short', 'medium'], choices=list(DOCUMENT_SIZES), help='document sizes to time each stage on')
+    parser.add_argument('--links', nargs='*', type=int, default=[5000], help='link counts of the link heavy pages to time the link parsing on')
+    parser.add_argument('--pages', nargs='*', type=int, default=DEFAULT_PAGE_COUNTS, help='site sizes to time full builds on, eg 100 1000 100000')
+    parser.add_argument('--page-size', default='short', choices=list(DOCUMENT_SIZES), help='document size used for the pages of full builds')
+    parser.add_argument('--jobs', '-j', type=int, default=1, help='passed on to full builds')
+    parser.add_argument('--repeat', type=int, default=5, help='how many times to run each stage, the fastest run is kept')
+    parser.add_argument('--output', default='bench_results.json', help='where to write the results')
+    parser.add_argument('--baseline', default='bench_baseline.json', help='results to compare against')
+    parser.add_argument('--save-baseline', action='store_true', help='also store the results as the new baseline')
+    parser.add_argument('--threshold', type=float, default=0.1, help='how much slower than the baseline counts as a regression')
+    return parser.parse_args(argv)
+
+def main(argv: Optional[list] = None) -> int:
+    args = parse_args(argv)
+    results: Dict[str, float] = {}
+
+    for size in args.sizes:
+        markdown = generate_markdown(DOCUMENT_SIZES[size])
+        repeat = args.repeat if DOCUMENT_SIZES[size] < 1_000_000 else 1
+        bench_stages(size, markdown, repeat, results)
+    for links in args.links:
+        bench_links(links, args.repeat, results)
+    for pages in args.pages:
+        repeat = args.repeat if pages <= 1000 else 1
+        results[f'build/{pages}'] = bench_build(pages, DOCUMENT_SIZES[args.page_size], repeat, args.jobs)
+    results.update(bench_node_memory())
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as file:
+            baseline = json.load(file)['results']
+    regressions = compare(results, baseline, args.threshold)
+
+    data = {
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'results': results,
+    }
+    with open(args.output, 'w') as file:
+        json.dump(data, file, indent=1)
+    if args.save_baseline:
+        shutil.copy(args.output, args.baseline)
+
+    if regressions:
+        print(f'{len(regressions)} results regressed by more than {args.threshold:.0%}')
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
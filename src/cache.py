@@ -0,0 +1,121 @@
+import os
+import json
+import hashlib
+from typing import Optional, Tuple, List, NamedTuple, Sequence, Dict
+
+import helper_functions
+import htmlnode
+import textnode
+import template
+
+DEFAULT_CACHE_SIZE = 256 * 1024 * 1024
+CACHE_FORMAT = b'3'
+
+class CachedPage(NamedTuple):
+    title: str
+    body: str
+    links: Tuple[str, ...] = ()
+    images: Tuple[str, ...] = ()
+    terms: Optional[Dict[str, int]] = None
+
+def parser_version(*extra_sources: str) -> str:
+    """
+        Hashes the source of everything that decides how markdown is rendered, so cached pages are thrown away whenever the parser changes.
+        The template module is included because cached bodies already have their urls rewritten by `basepath_rewriter`
+
+        Takes:
+        `extra_sources: str` => more source code to include, eg the source of `extract_title`
+
+        Returns
+        `version: str`
+    """
+    digest = hashlib.sha256()
+    for module in (helper_functions, htmlnode, textnode, template):
+        with open(module.__file__, 'rb') as file:
+            digest.update(file.read())
+    for source in extra_sources:
+        digest.update(source.encode())
+    return digest.hexdigest()[:16]
+
+class ParseCache():
+    """
+        On disk cache of rendered page bodies and titles, keyed by the markdown and the parser version.
+        Entries are evicted least recently used first once the cache grows past `max_bytes`.
+
+        Args:
+            - `directory : str` => Where the entries are stored
+            - `version : str` => The parser version, see `parser_version`
+            - `max_bytes : int` => How big the cache may get before `evict` removes entries
+    """
+    def __init__(self, directory: str, version: str, max_bytes: int = DEFAULT_CACHE_SIZE):
+        self.directory = directory
+        self.version = version
+        self.max_bytes = max_bytes
+
+    def key(self, markdown: str, basepath: str) -> str:
+        digest = hashlib.sha256(self.version.encode())
+        digest.update(b'\0')
+        digest.update(CACHE_FORMAT)
+        digest.update(b'\0')
+        digest.update(basepath.encode())
+        digest.update(b'\0')
+        digest.update(markdown.encode())
+        return digest.hexdigest()
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f'{key}.json')
+
+    def get(self, key: str) -> Optional[CachedPage]:
+        """
+            Looks up a page, marking it as recently used
+
+            Returns
+            `CachedPage` or `None` when the page is not cached
+        """
+        path = self.path(key)
+        try:
+            with open(path) as file:
+                entry = json.load(file)
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        return CachedPage(entry['title'], entry['body'], tuple(entry['links']), tuple(entry['images']), entry['terms'])
+
+    def put(self, key: str, title: str, body: str, links: Sequence[str] = (), images: Sequence[str] = (), terms: Optional[Dict[str, int]] = None) -> None:
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f'{path}.{os.getpid()}.tmp'
+        with open(temp_path, 'w') as file:
+            json.dump({'title': title, 'body': body, 'links': list(links), 'images': list(images), 'terms': terms}, file)
+        os.replace(temp_path, path)
+
+    def evict(self) -> List[str]:
+        """
+            Removes the least recently used entries until the cache fits in `max_bytes`
+
+            Returns
+            `removed: List[str]` => the keys that were removed
+        """
+        entries = []
+        total = 0
+        if not os.path.isdir(self.directory):
+            return []
+        for shard in os.scandir(self.directory):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                stat = entry.stat()
+                entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+                total += stat.st_size
+        removed = []
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            removed.append(os.path.basename(path).split('.')[0])
+        return removed
@@ -0,0 +1,147 @@
+import os
+import re
+import gzip
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple
+
+from walker import walk_files
+from writer import atomic_open
+
+COMPRESSIBLE_EXTENSIONS = ('.html', '.css', '.js', '.json', '.xml', '.svg', '.txt')
+GZIP_LEVEL = 9
+
+raw_html_pattern = re.compile(r'(<(pre|textarea|script|style)\b.*?</\2\s*>)', re.IGNORECASE | re.DOTALL)
+html_comment_pattern = re.compile(r'<!--(?!\[if).*?-->', re.DOTALL)
+whitespace_pattern = re.compile(r'\s+')
+css_token_pattern = re.compile(r'("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\')|/\*.*?\*/', re.DOTALL)
+css_punctuation_pattern = re.compile(r'\s*([{};,>])\s*')
+
+def minify_html(html: str) -> str:
+    """
+        Drops comments and collapses every run of whitespace into a single space, leaving the contents of `pre`, `textarea`, `script` and `style` as they are.
+        One space is always kept, so text that was separated still is.
+
+        Takes:
+        `html: str` => the page
+
+        Returns
+        `html: str`
+    """
+    parts = raw_html_pattern.split(html)
+    minified = []
+    for index in range(0, len(parts), 3):
+        text = html_comment_pattern.sub('', parts[index])
+        minified.append(whitespace_pattern.sub(' ', text))
+        if index + 1 < len(parts):
+            minified.append(parts[index + 1])
+    return ''.join(minified).strip()
+
+def minify_css(css: str) -> str:
+    """
+        Drops comments, collapses whitespace and removes the spaces around `{ } ; , >` and after `:`, leaving strings as they are.
+        Spaces around `+` and `-` are kept because `calc` needs them.
+    """
+    minified = []
+    position = 0
+    for match in css_token_pattern.finditer(css):
+        minified.append(minify_css_code(css[position:match.start()]))
+        if match[1] is not None:
+            minified.append(match[1])
+        position = match.end()
+    minified.append(minify_css_code(css[position:]))
+    return ''.join(minified).strip()
+
+def minify_css_code(code: str) -> str:
+    code = whitespace_pattern.sub(' ', code)
+    code = css_punctuation_pattern.sub(r'\1', code)
+    code = code.replace(': ', ':')
+    return code.replace(';}', '}')
+
+def gzip_bytes(data: bytes) -> bytes:
+    """
+        Compresses at `GZIP_LEVEL` without a timestamp, so the same input always gives the same bytes
+    """
+    return gzip.compress(data, GZIP_LEVEL, mtime=0)
+
+def compress_file(path: str, minify: bool = True, sidecar: bool = True) -> Tuple[bool, bool]:
+    """
+        Minifies an html or css file in place and writes `<path>.gz` next to it.
+        The sidecar gets the mtime of the file, so a file that was not touched since is skipped without reading it. Files are only written when their bytes change.
+
+        Takes:
+        `path: str` => the file in the output folder
+        `minify: bool` => minify html and css files
+        `sidecar: bool` => write the gzip sidecar
+
+        Returns
+        `(minified, compressed)` => whether the file and the sidecar were written
+    """
+    gz_path = f'{path}.gz'
+    stat = os.stat(path)
+    if sidecar:
+        try:
+            if os.stat(gz_path).st_mtime_ns == stat.st_mtime_ns:
+                return False, False
+        except FileNotFoundError:
+            pass
+    with open(path, 'rb') as file:
+        data = file.read()
+
+    minified = False
+    if minify and path.endswith(('.html', '.css')):
+        text = data.decode('utf-8')
+        text = minify_html(text) if path.endswith('.html') else minify_css(text)
+        if text.encode('utf-8') != data:
+            data = text.encode('utf-8')
+            with atomic_open(path, 'wb') as file:
+                file.write(data)
+            stat = os.stat(path)
+            minified = True
+    if not sidecar:
+        return minified, False
+
+    compressed = gzip_bytes(data)
+    written = False
+    try:
+        with open(gz_path, 'rb') as file:
+            written = file.read() != compressed
+    except FileNotFoundError:
+        written = True
+    if written:
+        with atomic_open(gz_path, 'wb') as file:
+            file.write(compressed)
+    os.utime(gz_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    return minified, written
+
+def compress_site(dest_path: str, minify: bool = True, sidecar: bool = True, jobs: int = 8) -> Dict[str, int]:
+    """
+        Runs `compress_file` on every text file of the built site on a thread pool, zlib lets go of the GIL while it compresses.
+        Sidecars whose file is gone, eg a page deleted by an incremental build, are removed so servers stop serving them.
+        Hidden files like the build manifest are left alone.
+
+        Takes:
+        `dest_path: str` => the output folder
+        `minify: bool` => minify html and css files
+        `sidecar: bool` => write gzip sidecars
+        `jobs: int` => how many files to handle at the same time
+
+        Returns
+        `counts: { 'files' | 'minified' | 'compressed' | 'removed': count }`
+    """
+    paths: List[str] = []
+    sidecars: List[str] = []
+    for entry in walk_files(dest_path, exclude=['.*', '*/.*']):
+        if entry.name.endswith(COMPRESSIBLE_EXTENSIONS):
+            paths.append(entry.path)
+        elif entry.name.endswith('.gz'):
+            sidecars.append(entry.path)
+    counts = {'files': len(paths), 'minified': 0, 'compressed': 0, 'removed': 0}
+    for gz_path in sidecars:
+        if not os.path.exists(gz_path[:-len('.gz')]):
+            os.remove(gz_path)
+            counts['removed'] += 1
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as executor:
+        for minified, compressed in executor.map(compress_file, paths, [minify] * len(paths), [sidecar] * len(paths)):
+            counts['minified'] += minified
+            counts['compressed'] += compressed
+    return counts
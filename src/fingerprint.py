@@ -0,0 +1,126 @@
+import os
+import json
+import hashlib
+from typing import Dict, Optional, Tuple, Sequence
+
+from manifest import file_hash
+from walker import walk_files, matches_any
+from writer import atomic_open
+
+ASSET_MANIFEST_NAME = 'asset-manifest.json'
+ASSET_MANIFEST_VERSION = 1
+FINGERPRINT_LENGTH = 8
+FIXED_NAMES = ['robots.txt', 'favicon.ico', 'CNAME', '.*', '*.html']
+
+def fingerprinted_url(url: str, digest: str) -> str:
+    """
+        Puts the start of a content hash before the extension, eg `/index.css` becomes `/index.3f9a1c08.css`
+    """
+    directory, name = url.rsplit('/', 1)
+    stem, dot, extension = name.partition('.')
+    return f'{directory}/{stem}.{digest[:FINGERPRINT_LENGTH]}{dot}{extension}'
+
+def is_fixed(relative_path: str, keep: Sequence[str]) -> bool:
+    """
+        Checks if a static file keeps its name, because the whole path or any folder or file name in it matches one of the `keep` globs, eg `.well-known/security.txt`
+    """
+    parts = relative_path.split('/')
+    return matches_any(relative_path, keep) or any(matches_any(part, keep) for part in parts)
+
+class AssetManifest():
+    """
+        The fingerprinted url of every static file, so files can be served with long lived cache headers and pages still point at the current version.
+        Urls are relative to the root of the site, eg `/index.css`, and lookups ignore the query and fragment.
+        The size, mtime and hash of every file are kept in the manifest too, so the next build only hashes the files that changed.
+        Only urls in pages are rewritten, so files are also placed under their own name for references like `url()` in css or paths built in js.
+    """
+    def __init__(self):
+        self.assets: Dict[str, str] = {}
+        self.hashes: Dict[str, Tuple[int, int, str]] = {}
+        self.version = ''
+        self.hashed = 0
+
+    @classmethod
+    def load(cls, path: str) -> "AssetManifest":
+        """
+            Loads the manifest of the last build, an unreadable or missing manifest is treated as empty
+        """
+        manifest = cls()
+        try:
+            with open(path) as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            return manifest
+        if data.get('version') != ASSET_MANIFEST_VERSION:
+            return manifest
+        manifest.assets = data['assets']
+        manifest.hashes = {url: tuple(stat) for url, stat in data['hashes'].items()}
+        return manifest
+
+    @classmethod
+    def scan(cls, static_path: str, previous: Optional["AssetManifest"] = None, keep: Sequence[str] = FIXED_NAMES) -> "AssetManifest":
+        """
+            Fingerprints every file in the static folder
+
+            Takes:
+            `static_path: str` => the static folder
+            `previous: AssetManifest` => the manifest of the last build, files whose size and mtime did not change keep their hash
+            `keep: List[str]` => globs of files that are fetched by name, eg `robots.txt`, which keep their name. They are matched against the path below the static folder and every name in it
+
+            Returns
+            `AssetManifest`
+        """
+        manifest = cls()
+        known = previous.hashes if previous is not None else {}
+        prefix = len(os.path.join(static_path, ''))
+        for entry in walk_files(static_path):
+            relative_path = entry.path[prefix:].replace(os.sep, '/')
+            if is_fixed(relative_path, keep):
+                continue
+            url = '/' + relative_path
+            stat = entry.stat()
+            cached = known.get(url)
+            if cached is not None and cached[0] == stat.st_size and cached[1] == stat.st_mtime_ns:
+                digest = cached[2]
+            else:
+                digest = file_hash(entry.path)
+                manifest.hashed += 1
+            manifest.hashes[url] = (stat.st_size, stat.st_mtime_ns, digest)
+            manifest.assets[url] = fingerprinted_url(url, digest)
+        manifest.version = hashlib.sha256(json.dumps(manifest.assets, sort_keys=True).encode()).hexdigest()[:16]
+        return manifest
+
+    def __contains__(self, url: str) -> bool:
+        return url in self.assets
+
+    def url(self, url: str) -> str:
+        """
+            Returns the fingerprinted url of a root relative url, or the url itself when it is not a static file
+        """
+        end = len(url)
+        for separator in '?#':
+            index = url.find(separator)
+            if index != -1:
+                end = min(end, index)
+        fingerprinted = self.assets.get(url[:end])
+        if fingerprinted is None:
+            return url
+        return fingerprinted + url[end:]
+
+    def output_path(self, path: str, root: str) -> str:
+        """
+            Renames a path in the output folder to its fingerprinted name, eg `docs/index.css` to `docs/index.3f9a1c08.css`
+        """
+        url = '/' + os.path.relpath(path, root).replace(os.sep, '/')
+        fingerprinted = self.assets.get(url)
+        if fingerprinted is None:
+            return path
+        return os.path.join(root, *fingerprinted[1:].split('/'))
+
+    def write(self, dest_path: str) -> None:
+        with atomic_open(os.path.join(dest_path, ASSET_MANIFEST_NAME)) as file:
+            json.dump({
+                'version': ASSET_MANIFEST_VERSION,
+                'assets': self.assets,
+                'hashes': {url: list(stat) for url, stat in self.hashes.items()},
+            }, file, indent=1, sort_keys=True)
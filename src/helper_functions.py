@@ -1,7 +1,8 @@
 import re
-from typing import List, Tuple
+from collections import OrderedDict
+from typing import List, Tuple, Iterator, Iterable, NamedTuple, Optional, Callable
 
-from htmlnode import HTMLNode, LeafNode, ParentNode
+from htmlnode import HTMLNode, LeafNode, ParentNode, RenderedNode
 from textnode import TextNode, TextType
 
 block_type_paragraph = "paragraph"
@@ -70,6 +71,45 @@ def split_nodes_delimiter(
     return new_nodes
 
 
+image_pattern = re.compile(r"!\[([^\[\]]*)\]\(([^\(\)]*)\)")
+link_pattern = re.compile(r"(?<!!)\[([^\[\]]*)\]\(([^\(\)]*)\)")
+
+
+class InlineMatch(NamedTuple):
+    start: int
+    end: int
+    text: str
+    url: str
+
+
+def find_markdown_images(text: str) -> Iterator[InlineMatch]:
+    """
+    Finds every image in text formatted in Markdown along with where it is
+
+    Args:
+    `text: str` => a string of text formatted in markdown
+
+    Returns:
+    `Iterator[InlineMatch]` => the span, alt text and link of every image in order
+    """
+    for match in image_pattern.finditer(text):
+        yield InlineMatch(match.start(), match.end(), match[1], match[2])
+
+
+def find_markdown_links(text: str) -> Iterator[InlineMatch]:
+    """
+    Finds every link in text formatted in Markdown along with where it is, images are not links
+
+    Args:
+    `text: str` => a string of text formatted in markdown
+
+    Returns:
+    `Iterator[InlineMatch]` => the span, text and link of every link in order
+    """
+    for match in link_pattern.finditer(text):
+        yield InlineMatch(match.start(), match.end(), match[1], match[2])
+
+
 def extract_markdown_images(text: str) -> List[Tuple[str, str]]:
     """
     Takes text formatted in Markdown and extracts images from it and returns them in a list of tuples
@@ -80,9 +120,7 @@ def extract_markdown_images(text: str) -> List[Tuple[str, str]]:
     Returns:
     `List[Tuple[alt_text, link_to_image]]`
     """
-    pattern = r"!\[([^\[\]]*)\]\(([^\(\)]*)\)"
-    matches = re.findall(pattern, text)
-    return matches
+    return image_pattern.findall(text)
 
 
 def extract_markdown_links(text: str) -> List[Tuple[str, str]]:
@@ -95,115 +133,182 @@ def extract_markdown_links(text: str) -> List[Tuple[str, str]]:
     Returns:
     `List[Tuple[text, link]]`
     """
+    return link_pattern.findall(text)
 
-    pattern = r"(?<!!)\[([^\[\]]*)\]\(([^\(\)]*)\)"
-    matches = re.findall(pattern, text)
-    return matches
 
+def split_nodes_matches(
+    old_nodes: List[TextNode],
+    find: Callable[[str], Iterator[InlineMatch]],
+    text_type: TextType,
+) -> List[TextNode]:
+    """
+    Takes a list of `TextNode`s and splits out everything `find` matches as nodes of `text_type`.
+    The text is sliced at the spans of the matches, so each node is scanned once and
+    a link that appears twice is split at both places.
+
+    Args:
+    `old_nodes: List[TextNode]` => a list of nodes that you want seperated
+    `find: Callable` => `find_markdown_links` or `find_markdown_images`
+    `text_type: TextType` => the type of the matched nodes
 
-def split_nodes_link(old_nodes: List[TextNode]) -> List[TextNode]:
+    Returns:
+    `List[TextNode]`
+    """
     new_nodes: List[TextNode] = []
     for node in old_nodes:
         node_text = node.text
-        links = extract_markdown_links(node_text)
-        if len(links) == 0:
+        position = 0
+        for match in find(node_text):
+            section = node_text[position:match.start]
+            if has_content(section):
+                new_nodes.append(TextNode(section, node.text_type))
+            new_nodes.append(TextNode(match.text, text_type, match.url))
+            position = match.end
+        if position == 0:
             new_nodes.append(node)
-        else:
-            sections = [node_text]
-            for text, link in links:
-                sub_sections = sections[-1].split(f"[{text}]({link})", 1)
-                sections.pop()
-                sections.extend(sub_sections)
-            for index in range(len(sections)):
-                section = sections[index]
-                is_empty = not has_content(section)
-                if not is_empty:
-                    new_nodes.append(TextNode(section, node.text_type))
-                if index != len(sections) - 1:
-                    new_nodes.append(
-                        TextNode(links[index][0], TextType.LINK, links[index][1])
-                    )
-
+            continue
+        section = node_text[position:]
+        if has_content(section):
+            new_nodes.append(TextNode(section, node.text_type))
     return new_nodes
 
 
-def split_nodes_image(old_nodes: List[TextNode]) -> List[TextNode]:
-    new_nodes: List[TextNode] = []
+def split_nodes_link(old_nodes: List[TextNode]) -> List[TextNode]:
+    return split_nodes_matches(old_nodes, find_markdown_links, TextType.LINK)
 
-    for node in old_nodes:
-        node_text = node.text
-        images = extract_markdown_images(node_text)
-        if len(images) == 0:
-            new_nodes.append(node)
-        else:
-            sections = [node_text]
-            for text, link in images:
-                sub_sections = sections[-1].split(f"![{text}]({link})", 1)
-                sections.pop()
-                sections.extend(sub_sections)
-            for index in range(len(sections)):
-                section = sections[index]
-                is_empty = not has_content(section)
-                if not is_empty:
-                    new_nodes.append(TextNode(section, node.text_type))
-                if index != len(sections) - 1:
-                    new_nodes.append(
-                        TextNode(images[index][0], TextType.IMAGE, images[index][1])
-                    )
 
-    return new_nodes
+def split_nodes_image(old_nodes: List[TextNode]) -> List[TextNode]:
+    return split_nodes_matches(old_nodes, find_markdown_images, TextType.IMAGE)
 
 
 def has_content(text: str) -> bool:
     return bool(text.strip())
 
 
-def text_to_textnodes(text: str) -> List[TextNode]:
-    nodes = [TextNode(text, TextType.TEXT)]
+inline_pattern = re.compile(
+    r"!\[(?P<image_alt>[^\[\]]*)\]\((?P<image_url>[^\(\)]*)\)"
+    r"|\[(?P<link_text>[^\[\]]*)\]\((?P<link_url>[^\(\)]*)\)"
+    r"|`(?P<code>[^`]+)`"
+    r"|\*\*(?P<bold>.+?)\*\*"
+    r"|_(?P<italic>[^_]+)_",
+    re.DOTALL,
+)
 
-    nodes = split_nodes_image(nodes)
-    nodes = split_nodes_link(nodes)
 
-    nodes = split_nodes_delimiter(nodes, "**", TextType.BOLD)
-    nodes = split_nodes_delimiter(nodes, "_", TextType.ITALIC)
-    nodes = split_nodes_delimiter(nodes, "`", TextType.CODE)
+def text_to_textnodes(text: str) -> List[TextNode]:
+    """
+    Takes a line of markdown and splits it into `TextNode`s in a single scan.
+    Images, links, code, bold and italic are all matched by one regex, so the text
+    between two matches is emitted as plain text without being looked at again.
+    Code spans are matched as a whole, so delimiters inside them are left alone.
+    The text inside bold and italic is scanned again and flattened like the old
+    delimiter splitting did, eg `**a _b_ c**` gives bold, italic and bold nodes.
+
+    Args:
+    `text: str` => a string of text formatted in markdown
 
+    Returns:
+    `List[TextNode]`
+    """
+    nodes: List[TextNode] = []
+    position = 0
+    for match in inline_pattern.finditer(text):
+        start = match.start()
+        if start > position:
+            nodes.append(TextNode(text[position:start], TextType.TEXT))
+        kind = match.lastgroup
+        if kind == "image_url":
+            nodes.append(TextNode(match["image_alt"], TextType.IMAGE, match["image_url"]))
+        elif kind == "link_url":
+            nodes.append(TextNode(match["link_text"], TextType.LINK, match["link_url"]))
+        elif kind == "code":
+            nodes.append(TextNode(match["code"], TextType.CODE))
+        else:
+            text_type = TextType.BOLD if kind == "bold" else TextType.ITALIC
+            for node in text_to_textnodes(match[kind]):
+                nodes.append(TextNode(node.text, text_type) if node.text_type == TextType.TEXT else node)
+        position = match.end()
+    if position < len(text):
+        nodes.append(TextNode(text[position:], TextType.TEXT))
     return nodes
 
 
-def markdown_to_blocks(markdown: str) -> List[str]:
-    blocks = markdown.split("\n\n")
+class Block(NamedTuple):
+    block_type: str
+    lines: List[str]
+
+
+def parse_blocks(markdown: str) -> Iterator[Block]:
+    """
+    Walks a markdown document line by line once and yields its blocks, already typed and split into lines.
+    Blocks are separated by lines that are empty or only whitespace, except inside fenced code
+    where every line up to the closing fence belongs to the code block.
+
+    Args:
+    `markdown: str` => the markdown text
 
-    blocks = filter(lambda block: len(block) != 0, blocks)
+    Returns:
+    `Iterator[Block]`
+    """
+    lines: List[str] = []
+    in_fence = False
+    for line in markdown.split("\n"):
+        if in_fence:
+            lines.append(line)
+            if line.lstrip().startswith("```"):
+                lines[-1] = line.strip()
+                yield Block(block_type_code, lines)
+                lines = []
+                in_fence = False
+            continue
+        if not line or line.isspace():
+            if lines:
+                lines[-1] = lines[-1].rstrip()
+                yield Block(lines_to_block_type(lines), lines)
+                lines = []
+            continue
+        if not lines:
+            line = line.lstrip()
+            if line.startswith("```") and line.count("```") == 1:
+                in_fence = True
+        lines.append(line)
+    if lines:
+        lines[-1] = lines[-1].rstrip()
+        block_type = block_type_code if in_fence else lines_to_block_type(lines)
+        yield Block(block_type, lines)
 
-    blocks = list(map(lambda block: block.lstrip().rstrip(), blocks))
 
-    return blocks
+def markdown_to_blocks(markdown: str) -> List[str]:
+    return ["\n".join(block.lines) for block in parse_blocks(markdown)]
 
 
 def block_to_block_type(block: str) -> str:
-    lines = block.split("\n")
+    return lines_to_block_type(block.split("\n"))
 
-    if block.startswith(("# ", "## ", "### ", "#### ", "##### ", "###### ")):
+
+def lines_to_block_type(lines: List[str]) -> str:
+    first_line = lines[0]
+
+    if first_line.startswith(("# ", "## ", "### ", "#### ", "##### ", "###### ")):
         return block_type_heading
-    if len(lines) > 1 and lines[0].startswith("```") and lines[-1].startswith("```"):
+    if len(lines) > 1 and first_line.startswith("```") and lines[-1].startswith("```"):
         return block_type_code
-    if block.startswith(">"):
+    if first_line.startswith(">"):
         for line in lines:
             if not line.startswith(">"):
                 return block_type_paragraph
         return block_type_quote
-    if block.startswith("* "):
+    if first_line.startswith("* "):
         for line in lines:
             if not line.startswith("* "):
                 return block_type_paragraph
         return block_type_ulist
-    if block.startswith("- "):
+    if first_line.startswith("- "):
         for line in lines:
             if not line.startswith("- "):
                 return block_type_paragraph
         return block_type_ulist
-    if block.startswith("1. "):
+    if first_line.startswith("1. "):
         i = 1
         for line in lines:
             if not line.startswith(f"{i}. "):
@@ -212,29 +317,75 @@ def block_to_block_type(block: str) -> str:
         return block_type_olist
     return block_type_paragraph
 
-def markdown_to_html_node(markdown: str) -> HTMLNode:
-    blocks = markdown_to_blocks(markdown)
+class BlockCache:
+    """
+    Bounded cache from the lines of a block to its rendered HTML, so blocks that repeat
+    across pages are only parsed and serialized once per process. The least recently used
+    block is dropped once there are more than `max_entries`.
+
+    Args:
+    `max_entries: int` => how many blocks to keep
+    `rewrite_url: (url) => url` => applied to urls when a block is serialized, every page using the cache must use the same one
+    """
+
+    def __init__(
+        self, max_entries: int = 4096, rewrite_url: Optional[Callable[[str], str]] = None
+    ):
+        self.max_entries = max_entries
+        self.rewrite_url = rewrite_url
+        self.entries: OrderedDict[Tuple[str, ...], RenderedNode] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, block: Block) -> HTMLNode:
+        key = tuple(block.lines)
+        node = self.entries.get(key)
+        if node is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return node
+        self.misses += 1
+        html_node = lines_to_html_node(block.block_type, block.lines)
+        node = RenderedNode(html_node, html_node.to_html(self.rewrite_url))
+        self.entries[key] = node
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return node
+
+
+def markdown_to_html_node(markdown: str, block_cache: Optional[BlockCache] = None) -> HTMLNode:
+    return blocks_to_html_node(parse_blocks(markdown), block_cache)
+
+
+def blocks_to_html_node(blocks: Iterable[Block], block_cache: Optional[BlockCache] = None) -> HTMLNode:
     children = []
     for block in blocks:
-        html_node = block_to_html_node(block)
+        if block_cache is None:
+            html_node = lines_to_html_node(block.block_type, block.lines)
+        else:
+            html_node = block_cache.render(block)
         children.append(html_node)
     return ParentNode("div", children, None)
 
 
 def block_to_html_node(block: str) -> HTMLNode:
-    block_type = block_to_block_type(block)
+    lines = block.split("\n")
+    return lines_to_html_node(lines_to_block_type(lines), lines)
+
+
+def lines_to_html_node(block_type: str, lines: List[str]) -> HTMLNode:
     if block_type == block_type_paragraph:
-        return paragraph_to_html_node(block)
+        return paragraph_to_html_node(lines)
     if block_type == block_type_heading:
-        return heading_to_html_node(block)
+        return heading_to_html_node(lines)
     if block_type == block_type_code:
-        return code_to_html_node(block)
+        return code_to_html_node(lines)
     if block_type == block_type_olist:
-        return olist_to_html_node(block)
+        return olist_to_html_node(lines)
     if block_type == block_type_ulist:
-        return ulist_to_html_node(block)
+        return ulist_to_html_node(lines)
     if block_type == block_type_quote:
-        return quote_to_html_node(block)
+        return quote_to_html_node(lines)
     raise ValueError("invalid block type")
 
 
@@ -247,14 +398,14 @@ def text_to_children(text: str) -> List[HTMLNode]:
     return children
 
 
-def paragraph_to_html_node(block: str) -> ParentNode:
-    lines = block.split("\n")
+def paragraph_to_html_node(lines: List[str]) -> ParentNode:
     paragraph = " ".join(lines)
     children = text_to_children(paragraph)
     return ParentNode("p", children)
 
 
-def heading_to_html_node(block: str) -> ParentNode:
+def heading_to_html_node(lines: List[str]) -> ParentNode:
+    block = "\n".join(lines)
     level = 0
     for char in block:
         if char == "#":
@@ -268,37 +419,34 @@ def heading_to_html_node(block: str) -> ParentNode:
     return ParentNode(f"h{level}", children)
 
 
-def code_to_html_node(block: str) -> ParentNode:
-    if not block.startswith("```") or not block.endswith("```"):
+def code_to_html_node(lines: List[str]) -> ParentNode:
+    if not lines[0].startswith("```"):
         raise ValueError("invalid code block")
-    text = block[4:-3]
-    children = text_to_children(text)
-    code = ParentNode("code", children)
+    end = len(lines) - 1 if len(lines) > 1 and lines[-1].startswith("```") else len(lines)
+    text = "".join([f"{line}\n" for line in lines[1:end]])
+    code = ParentNode("code", [LeafNode(None, text)])
     return ParentNode("pre", [code])
 
 
-def olist_to_html_node(block: str) -> ParentNode:
-    items = block.split("\n")
+def olist_to_html_node(lines: List[str]) -> ParentNode:
     html_items = []
-    for item in items:
+    for item in lines:
         text = item[3:]
         children = text_to_children(text)
         html_items.append(ParentNode("li", children))
     return ParentNode("ol", html_items)
 
 
-def ulist_to_html_node(block: str) -> ParentNode:
-    items = block.split("\n")
+def ulist_to_html_node(lines: List[str]) -> ParentNode:
     html_items = []
-    for item in items:
+    for item in lines:
         text = item[2:]
         children = text_to_children(text)
         html_items.append(ParentNode("li", children))
     return ParentNode("ul", html_items)
 
 
-def quote_to_html_node(block: str) -> ParentNode:
-    lines = block.split("\n")
+def quote_to_html_node(lines: List[str]) -> ParentNode:
     new_lines = []
     for line in lines:
         if not line.startswith(">"):
@@ -1,4 +1,17 @@
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, Callable, Iterator, TextIO
+
+URL_PROPS = ("href", "src")
+SRCSET_PROP = "srcset"
+
+def rewrite_srcset(srcset: str, rewrite_url: Callable[[str], str]) -> str:
+    """
+        Applies `rewrite_url` to the url of every candidate in a `srcset`, eg `/a-480w.png 480w, /a.png 960w`
+    """
+    candidates = []
+    for candidate in srcset.split(","):
+        url, _, descriptor = candidate.strip().partition(" ")
+        candidates.append(f"{rewrite_url(url)} {descriptor}" if descriptor else rewrite_url(url))
+    return ", ".join(candidates)
 
 class HTMLNode():
     """
@@ -10,27 +23,48 @@ class HTMLNode():
             - `children : HTMLNode[]` => An array of HTMLNode containing child nodes of this node
             - `props : { key: value }` => A dict containing key value pairs, where keys are the attributes that the html node can take and the values are the values of those attributes
     """
+    __slots__ = ("tag", "value", "children", "props")
+
     def __init__(self, tag:Optional[str]=None, value: Optional[str]=None, children: Optional[List["HTMLNode"]]=None, props: Optional[Dict[str, str]]=None):
         self.tag = tag
         self.value = value
         self.children = children
         self.props = props
     
-    def to_html(self) -> str:
+    def to_html(self, rewrite_url: Optional[Callable[[str], str]]=None) -> str:
+        return "".join(self.iter_html(rewrite_url))
+    
+    def iter_html(self, rewrite_url: Optional[Callable[[str], str]]=None) -> Iterator[str]:
+        """
+            Yields the HTML of this node in chunks so it can be written out without building the whole string
+
+            Args:
+                - `rewrite_url : (url) => url` => Optional function applied to every `href` and `src` value and the urls in `srcset`
+        """
         raise NotImplementedError("still needs an implementation")
     
-    def props_to_html(self) -> str:
+    def write_to(self, out: TextIO, rewrite_url: Optional[Callable[[str], str]]=None) -> None:
+        """
+            Streams the HTML of this node into a file like object
+        """
+        out.writelines(self.iter_html(rewrite_url))
+    
+    def props_to_html(self, rewrite_url: Optional[Callable[[str], str]]=None) -> str:
         
         if self.props == None:
             return ""
 
-        props = ""
+        if rewrite_url == None:
+            return "".join([f' {prop}="{value}"' for prop, value in self.props.items()])
 
-        for prop in self.props:
-            props += f' {prop}="{self.props[prop]}"'
+        def rewrite(prop: str, value: str) -> str:
+            if prop in URL_PROPS:
+                return rewrite_url(value)
+            if prop == SRCSET_PROP:
+                return rewrite_srcset(value, rewrite_url)
+            return value
 
-        
-        return props
+        return "".join([f' {prop}="{rewrite(prop, value)}"' for prop, value in self.props.items()])
     
     def __repr__(self):
         return f"HTMLNode({self.tag}, {self.value}, {self.children}, {self.props})"
@@ -44,47 +78,62 @@ class LeafNode(HTMLNode):
             - `value: str` => The contents of the node
             - `props: { key: value }` => A dict containing key value pairs, where keys are the attributes that the html node can take and the values are the values of those attributes
     """
+    __slots__ = ()
+
     def __init__(self, tag: Optional[str]=None, value: Optional[str]=None, props: Optional[Dict[str, str]]=None):
         self.tag = tag
         self.value = value
         self.children = None
         self.props = props
     
-    def to_html(self) -> str:
+    def to_html(self, rewrite_url: Optional[Callable[[str], str]]=None) -> str:
         if (self.value == None):
             raise ValueError("leaf nodes require a value")
         if (self.tag == None):
             return self.value
-        return f"<{self.tag}{self.props_to_html()}>{self.value}</{self.tag}>"
+        return f"<{self.tag}{self.props_to_html(rewrite_url)}>{self.value}</{self.tag}>"
     
-    def props_to_html(self):
-        
-        if self.props == None:
-            return ""
-
-        props = ""
-
-        for prop in self.props:
-            props += f' {prop}="{self.props[prop]}"'
-
-        
-        return props
+    def iter_html(self, rewrite_url: Optional[Callable[[str], str]]=None) -> Iterator[str]:
+        yield self.to_html(rewrite_url)
     
     def __repr__(self):
         return super().__repr__()
     
 class ParentNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag: str, children: List[HTMLNode], props: Optional[Dict[str, str]]=None):
         super().__init__(tag, None, children, props)
     
-    def to_html(self):
+    def iter_html(self, rewrite_url: Optional[Callable[[str], str]]=None) -> Iterator[str]:
         if self.tag == None:
             raise ValueError("parent node needs a tag")
         if self.children == None:
             raise ValueError("parent node must have children")
-        children = ""
+        yield f"<{self.tag}{self.props_to_html(rewrite_url)}>"
         for child in self.children:
-            children += child.to_html()
-        return f"<{self.tag}{self.props_to_html()}>{children}</{self.tag}>"
+            if isinstance(child, LeafNode):
+                yield child.to_html(rewrite_url)
+            else:
+                yield from child.iter_html(rewrite_url)
+        yield f"</{self.tag}>"
+
+class RenderedNode(HTMLNode):
+    """
+        Class used to reuse a node that has already been serialized
+
+        Args:
+            - `node: HTMLNode` => The node the HTML was made from, kept as the only child so the tree can still be walked
+            - `html: str` => The HTML of the node. Urls in it were already rewritten when it was made, so `rewrite_url` is ignored
+    """
+    __slots__ = ("html",)
+
+    def __init__(self, node: HTMLNode, html: str):
+        super().__init__(None, None, [node], None)
+        self.html = html
+
+    def to_html(self, rewrite_url: Optional[Callable[[str], str]]=None) -> str:
+        return self.html
 
-    
\ No newline at end of file
+    def iter_html(self, rewrite_url: Optional[Callable[[str], str]]=None) -> Iterator[str]:
+        yield self.html
@@ -0,0 +1,297 @@
+import os
+import json
+import struct
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Tuple, Dict, List, Callable, Sequence
+
+from htmlnode import HTMLNode, RenderedNode
+from assets import place_file, is_up_to_date
+from walker import walk_files
+from writer import atomic_open
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.gif', '.webp')
+RESIZABLE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.webp')
+PROBE_SIZE = 64 * 1024
+DIGEST_INDEX_NAME = 'digests.json'
+
+def can_resize() -> bool:
+    """
+        Whether Pillow is installed, which making downscaled copies needs. Reading sizes does not
+    """
+    return Image is not None
+
+def probe_size(path: str) -> Optional[Tuple[int, int]]:
+    """
+        Reads the width and height of a PNG, JPEG, GIF or WebP image from its header without decoding it
+
+        Takes:
+        `path: str` => the image file
+
+        Returns
+        `(width, height)` or `None` when the format is not recognised
+    """
+    with open(path, 'rb') as file:
+        head = file.read(32)
+        if head.startswith(b'\x89PNG\r\n\x1a\n') and head[12:16] == b'IHDR':
+            return struct.unpack('>II', head[16:24])
+        if head[:6] in (b'GIF87a', b'GIF89a'):
+            return struct.unpack('<HH', head[6:10])
+        if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+            return probe_webp(head)
+        if head[:2] == b'\xff\xd8':
+            file.seek(2)
+            return probe_jpeg(file)
+    return None
+
+def probe_webp(head: bytes) -> Optional[Tuple[int, int]]:
+    chunk = head[12:16]
+    if chunk == b'VP8 ':
+        width, height = struct.unpack('<HH', head[26:30])
+        return width & 0x3fff, height & 0x3fff
+    if chunk == b'VP8L':
+        bits = int.from_bytes(head[21:25], 'little')
+        return (bits & 0x3fff) + 1, ((bits >> 14) & 0x3fff) + 1
+    if chunk == b'VP8X':
+        return int.from_bytes(head[24:27], 'little') + 1, int.from_bytes(head[27:30], 'little') + 1
+    return None
+
+def probe_jpeg(file) -> Optional[Tuple[int, int]]:
+    """
+        Walks the JPEG segments up to the first start of frame marker, which holds the size
+    """
+    read = 2
+    while read < PROBE_SIZE:
+        marker = file.read(2)
+        if len(marker) < 2 or marker[0] != 0xff:
+            return None
+        kind = marker[1]
+        if kind == 0xd8 or 0xd0 <= kind <= 0xd7 or kind == 0x01:
+            read += 2
+            continue
+        length_bytes = file.read(2)
+        if len(length_bytes) < 2:
+            return None
+        length = struct.unpack('>H', length_bytes)[0]
+        if 0xc0 <= kind <= 0xcf and kind not in (0xc4, 0xc8, 0xcc):
+            frame = file.read(5)
+            if len(frame) < 5:
+                return None
+            height, width = struct.unpack('>HH', frame[1:5])
+            return width, height
+        file.seek(length - 2, os.SEEK_CUR)
+        read += length + 2
+    return None
+
+def derivative_url(url: str, width: int) -> str:
+    """
+        Works out where the downscaled copy of an image goes, eg `/images/a.png` at 480 pixels is `/images/a-480w.png`
+    """
+    stem, extension = os.path.splitext(url)
+    return f'{stem}-{width}w{extension}'
+
+def images_fingerprint(static_path: str) -> str:
+    """
+        Hashes the path, size and mtime of every image, so anything rendered with their sizes can be thrown away when one changes
+    """
+    digest = hashlib.sha256()
+    for entry in walk_files(static_path):
+        if entry.name.lower().endswith(IMAGE_EXTENSIONS):
+            stat = entry.stat()
+            digest.update(f'{entry.path}\0{stat.st_size}\0{stat.st_mtime_ns}\n'.encode())
+    return digest.hexdigest()[:16]
+
+class ImageSizer():
+    """
+        Adds the `width` and `height` of images served from the static folder to the `img` nodes of a page, so browsers can lay the page out before the images load.
+        When derivative widths are given the images also get a `srcset` listing their downscaled copies, see `build_derivatives`.
+        Sizes are probed once per image and kept, so it should not outlive a build. Sizers sent to worker processes arrive as the one sizer of that process for the same folder and widths, so each process probes an image only once.
+
+        Args:
+            - `static_path : str` => The folder root relative image urls are served from
+            - `widths : List[int]` => The widths of the downscaled copies, only the ones narrower than an image are used
+    """
+    def __init__(self, static_path: str, widths: Sequence[int] = ()):
+        self.static_path = static_path
+        self.widths = sorted(widths)
+        self.sizes: Dict[str, Optional[Tuple[int, int]]] = {}
+
+    def __reduce__(self):
+        return shared_sizer, (self.static_path, tuple(self.widths))
+
+    def source_path(self, url: str) -> Optional[str]:
+        if not url.startswith('/') or url.startswith('//'):
+            return None
+        path = url.split('?', 1)[0].split('#', 1)[0]
+        return os.path.join(self.static_path, *path[1:].split('/'))
+
+    def size(self, url: str) -> Optional[Tuple[int, int]]:
+        if url not in self.sizes:
+            path = self.source_path(url)
+            try:
+                self.sizes[url] = probe_size(path) if path is not None else None
+            except OSError:
+                self.sizes[url] = None
+        return self.sizes[url]
+
+    def attributes(self, url: str) -> Dict[str, str]:
+        """
+            Returns
+            `props: { attribute: value }` => the `width`, `height` and `srcset` for an image, empty when its size is unknown
+        """
+        size = self.size(url)
+        if size is None:
+            return {}
+        props = {'width': str(size[0]), 'height': str(size[1])}
+        widths = derivative_widths(url, size[0], self.widths)
+        if widths:
+            candidates = [f'{derivative_url(url, width)} {width}w' for width in widths]
+            props['srcset'] = ', '.join(candidates + [f'{url} {size[0]}w'])
+        return props
+
+    def annotate(self, node: HTMLNode, rewrite_url: Optional[Callable[[str], str]] = None) -> bool:
+        """
+            Adds the attributes to every `img` below `node` that does not have a size yet.
+            Already serialized `RenderedNode`s that contain an image are serialized again with `rewrite_url`.
+
+            Returns
+            `bool` => whether any image was changed
+        """
+        if node.tag == 'img' and node.props is not None:
+            if 'width' in node.props or 'src' not in node.props:
+                return False
+            props = self.attributes(node.props['src'])
+            node.props.update(props)
+            return bool(props)
+        changed = False
+        for child in node.children or ():
+            changed = self.annotate(child, rewrite_url) or changed
+        if changed and isinstance(node, RenderedNode):
+            node.html = node.children[0].to_html(rewrite_url)
+        return changed
+
+_sizers: Dict[Tuple[str, Tuple[int, ...]], ImageSizer] = {}
+
+def shared_sizer(static_path: str, widths: Tuple[int, ...]) -> ImageSizer:
+    sizer = _sizers.get((static_path, widths))
+    if sizer is None:
+        sizer = ImageSizer(static_path, widths)
+        _sizers[(static_path, widths)] = sizer
+    return sizer
+
+def derivative_widths(url: str, width: int, widths: Sequence[int]) -> List[int]:
+    if not url.lower().endswith(RESIZABLE_EXTENSIONS):
+        return []
+    return [target for target in widths if target < width]
+
+def make_derivative(source_path: str, cache_path: str, width: int) -> str:
+    """
+        Downscales an image to `width` keeping its aspect ratio, writing it to `cache_path`. Runs in worker processes
+    """
+    with Image.open(source_path) as image:
+        height = max(1, round(image.height * width / image.width))
+        resized = image.resize((width, height), Image.LANCZOS)
+        temp_path = f'{cache_path}.{os.getpid()}.tmp{os.path.splitext(cache_path)[1]}'
+        resized.save(temp_path, optimize=True)
+    os.replace(temp_path, cache_path)
+    return cache_path
+
+def cached_digest(path: str, stat: os.stat_result, digests: Dict[str, List]) -> Tuple[str, bool]:
+    """
+        Returns the hash `build_derivatives` caches copies of an image by, only reading the image when its size or mtime changed since it was last hashed
+
+        Takes:
+        `path: str` => the image
+        `stat: stat_result` => the stat of the image
+        `digests: { path: [size, mtime, digest] }` => the hashes of earlier builds, updated in place
+
+        Returns
+        `(digest, hashed)` => the hash and whether the image had to be read
+    """
+    key = os.path.abspath(path)
+    known = digests.get(key)
+    if known is not None and known[0] == stat.st_size and known[1] == stat.st_mtime_ns:
+        return known[2], False
+    with open(path, 'rb') as file:
+        digest = hashlib.file_digest(file, 'sha256').hexdigest()[:24]
+    digests[key] = [stat.st_size, stat.st_mtime_ns, digest]
+    return digest, True
+
+def load_digests(path: str) -> Dict[str, List]:
+    try:
+        with open(path) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+def build_derivatives(static_path: str, dest_path: str, widths: Sequence[int], cache_dir: str, jobs: int = 1, link: bool = False) -> Dict[str, int]:
+    """
+        Makes the downscaled copies of every image in the static folder that `ImageSizer` points `srcset` at.
+        Copies are cached in `cache_dir` by the hash of the source image and the width, so an image is only ever resized once. New copies are made in a process pool.
+        The hashes are kept in `cache_dir` along with the size and mtime of each image, so only images that changed are read again.
+
+        Takes:
+        `static_path: str` => the static folder
+        `dest_path: str` => the output folder
+        `widths: List[int]` => the widths to make copies at
+        `cache_dir: str` => where the copies are cached
+        `jobs: int` => how many processes resize at the same time
+        `link: bool` => hardlink copies from the cache instead of copying them
+
+        Returns
+        `counts: { 'cached' | 'resized' | 'placed' | 'hashed': count }`
+    """
+    if not can_resize():
+        raise Exception('making downscaled images needs Pillow, install it with pip install Pillow')
+    os.makedirs(cache_dir, exist_ok=True)
+    prefix = len(os.path.join(static_path, ''))
+    jobs_to_run: List[Tuple[str, str, int]] = []
+    placements: List[Tuple[str, str]] = []
+    counts = {'cached': 0, 'resized': 0, 'placed': 0, 'hashed': 0}
+    digests_path = os.path.join(cache_dir, DIGEST_INDEX_NAME)
+    digests = load_digests(digests_path)
+    for entry in walk_files(static_path):
+        url = '/' + entry.path[prefix:].replace(os.sep, '/')
+        try:
+            size = probe_size(entry.path)
+        except OSError:
+            continue
+        if size is None:
+            continue
+        widths_needed = derivative_widths(url, size[0], widths)
+        if not widths_needed:
+            continue
+        digest, hashed = cached_digest(entry.path, entry.stat(), digests)
+        counts['hashed'] += hashed
+        extension = os.path.splitext(entry.name)[1].lower()
+        for width in widths_needed:
+            cache_path = os.path.join(cache_dir, f'{digest}-{width}w{extension}')
+            if os.path.exists(cache_path):
+                counts['cached'] += 1
+            else:
+                jobs_to_run.append((entry.path, cache_path, width))
+            placements.append((cache_path, os.path.join(dest_path, *derivative_url(url, width)[1:].split('/'))))
+    if counts['hashed']:
+        with atomic_open(digests_path) as file:
+            json.dump(digests, file)
+
+    if jobs_to_run:
+        if jobs <= 1 or len(jobs_to_run) == 1:
+            for job in jobs_to_run:
+                make_derivative(*job)
+        else:
+            with ProcessPoolExecutor(max_workers=jobs) as executor:
+                list(executor.map(make_derivative, *zip(*jobs_to_run)))
+        counts['resized'] = len(jobs_to_run)
+
+    for cache_path, output_path in placements:
+        if not is_up_to_date(cache_path, output_path):
+            os.makedirs(os.path.dirname(output_path), exist_ok=True)
+            place_file(cache_path, output_path, link)
+            counts['placed'] += 1
+    return counts
@@ -1,63 +1,274 @@
 import os
 import sys
-from shutil import rmtree, copy
-from helper_functions import markdown_to_html_node
+import inspect
+import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, Future
+from shutil import rmtree
+from typing import Optional, List, Tuple, Dict, Union, Iterable, Iterator, Deque, Set, NamedTuple
+from helper_functions import parse_blocks, blocks_to_html_node, BlockCache
+from htmlnode import HTMLNode
+from template import Template, load_template, basepath_rewriter, ChunkList
+from profiler import PageProfile, BuildProfile, count_nodes, timed
+from cache import ParseCache, parser_version, DEFAULT_CACHE_SIZE
+from assets import place_files, is_up_to_date
+from writer import OutputWriter, atomic_open, prepare_staging, swap_into_place
+from manifest import BuildManifest, MANIFEST_NAME, file_hash
+from walker import walk_files, PageFilter
+from site_index import SiteIndex, PageLinks, collect_links, index_files
+from search import SearchIndex, page_terms, SEARCH_STATE_NAME, SEARCH_VERSION
+from metadata import split_front_matter, read_metadata, title_pattern
+from images import ImageSizer, build_derivatives, images_fingerprint, can_resize
+from fingerprint import AssetManifest, ASSET_MANIFEST_NAME
+from compress import compress_site
+from shard import Shard, parse_shard, write_shard_manifest
 
-def init() -> None:
+def init(clean: bool = True) -> None:
     """
         Prepares the docs folder and make sure that all the required folders and files exist
 
         Takes:
+        `clean: bool` => whether to wipe the docs folder, incremental builds keep it
         
         Returns: `None`
     """
     if not os.path.exists('./static/'):
         raise Exception('static folder must exist')
     public_path = './docs/'
-    if os.path.exists(public_path):
+    if clean and os.path.exists(public_path):
         rmtree(public_path)
-    os.mkdir('./docs/')
+    if not os.path.exists(public_path):
+        os.mkdir(public_path)
 
-def copy_files(from_path: str, to_path: str) -> None:
+def copy_files(from_path: str, to_path: str, manifest: Optional[BuildManifest] = None, jobs: int = 8, link: bool = False, assets: Optional[AssetManifest] = None) -> None:
     """
         Copies over the files from static to destination.
+        Files that already have the same size and mtime in the destination are skipped, the rest are copied `jobs` at a time.
 
         Takes:
 
         `to_path: str` => A path to copy to
+        `manifest: BuildManifest` => when given, files that have not changed since the last build are skipped
+        `jobs: int` => how many files to copy at the same time
+        `link: bool` => hardlink files instead of copying them where possible
+        `assets: AssetManifest` => when given, files are also copied to their fingerprinted names
         
         Returns: `None`
     """
-    files = os.listdir(from_path)
-    for file in files:
-        if os.path.isfile(f'{from_path}/{file}'):
-            copy(f'{from_path}/{file}', to_path)
-        else:
-            if not os.path.exists(f'{to_path}/{file}'):
-                os.mkdir(f'{to_path}/{file}')
-            copy_files(f'{from_path}/{file}', f'{to_path}/{file}')
+    files = find_files_to_copy(from_path, to_path, manifest, assets)
+    place_files(files, jobs, link)
+
+def find_files_to_copy(from_path: str, to_path: str, manifest: Optional[BuildManifest] = None, assets: Optional[AssetManifest] = None) -> List[Tuple[str, str]]:
+    """
+        Walks `from_path` and lists the files that are missing or out of date in `to_path`, creating the destination folders on the way
+
+        Returns
+        `files: List[Tuple[str, str]]` => pairs of source and destination paths
+    """
+    files = []
+    made: Set[str] = set()
+    prefix = len(os.path.join(from_path, ''))
+    for entry in walk_files(from_path):
+        file_to = os.path.join(to_path, entry.path[prefix:])
+        aliases = []
+        if assets is not None:
+            hashed_to = assets.output_path(file_to, to_path)
+            if hashed_to != file_to:
+                aliases.append(file_to)
+                file_to = hashed_to
+        make_parent(file_to, made)
+        if manifest is not None:
+            if manifest.needs_update(entry.path, file_to, 'static', aliases):
+                files.extend((entry.path, path) for path in [file_to, *aliases])
+            continue
+        for path in [file_to, *aliases]:
+            if not is_up_to_date(entry.path, path):
+                files.append((entry.path, path))
+    return files
+
+def make_parent(path: str, made: Set[str]) -> None:
+    """
+        Creates the folder `path` goes in unless it is in `made`, the folders already made during this walk, so a big tree costs one check per folder
+    """
+    directory = os.path.dirname(path)
+    if directory not in made:
+        os.makedirs(directory, exist_ok=True)
+        made.add(directory)
     
 def extract_title(markdown: str) -> str:
     """
-        Reads a file and extracts first line that is a header1 from import 
+        Finds the first line that is a header1, scanning only as far as that line
 
         Takes:
         `markdown: str` => The markdown text
 
         Returns
-        `title: str` => The title
+        `title: str` => The title, without the `# ` marker
+    """
+    match = title_pattern.search(markdown)
+    if match is None:
+        raise Exception(f'there is no h1 header in {markdown[:200]}')
+    return match[1].strip()
+
+def page_url(dest_path: str, dest_root: str, basepath: str) -> str:
+    """
+        Works out the url a generated page is served at
+
+        Takes:
+        `dest_path: str` => the path of the html file
+        `dest_root: str` => the folder the site is built into
+        `basepath: str` => the path the site is served under
+
+        Returns
+        `url: str` => eg `/blog/tom/` for `docs/blog/tom/index.html`
+    """
+    relative_path = os.path.relpath(dest_path, dest_root).replace(os.sep, '/')
+    if relative_path == 'index.html' or relative_path.endswith('/index.html'):
+        relative_path = relative_path[:-len('index.html')]
+    return f'{basepath}{relative_path}'
+
+_block_caches: Dict[Tuple[str, str], BlockCache] = {}
+
+def get_block_cache(basepath: str, max_entries: int, assets: Optional[AssetManifest] = None) -> Optional[BlockCache]:
+    """
+        Returns the block cache of this process for `basepath`, so every page rendered by a process shares it
+
+        Takes:
+        `basepath: str` => the path the site is served under
+        `max_entries: int` => how many blocks to keep, 0 turns the cache off
+        `assets: AssetManifest` => the fingerprinted urls the blocks point at, blocks are not shared between different versions of the assets
+
+        Returns
+        `BlockCache` or `None` when turned off
     """
+    if max_entries <= 0:
+        return None
+    key = (basepath, assets.version if assets is not None else '')
+    block_cache = _block_caches.get(key)
+    if block_cache is None:
+        block_cache = BlockCache(max_entries, basepath_rewriter(basepath, assets))
+        _block_caches[key] = block_cache
+    return block_cache
 
-    markdown_blocks = markdown.split('\n')
+class PageResult(NamedTuple):
+    title: str
+    links: Optional[PageLinks] = None
+    terms: Optional[Dict[str, int]] = None
+    profile: Optional[PageProfile] = None
+    block_cache_hits: int = 0
+    block_cache_misses: int = 0
 
-    for line in markdown_blocks:
-        stripped_line = line.lstrip().rstrip()
-        if stripped_line.startswith('# '):
-            return stripped_line.lstrip('# ')
+class RenderedContent(NamedTuple):
+    title: str
+    content: Union[str, HTMLNode]
+    links: Optional[PageLinks] = None
+    terms: Optional[Dict[str, int]] = None
+    metadata: Optional[Dict[str, str]] = None
 
-    raise Exception(f'there is no h1 header in {markdown}')
+def block_cache_counts(block_cache: Optional[BlockCache]) -> Tuple[int, int]:
+    return (block_cache.hits, block_cache.misses) if block_cache is not None else (0, 0)
 
-def generate_page(from_path: str, template_path: str, dest_path: str, basepath: str) -> None:
+def page_summary(count: int, failed: int, counts: Dict[str, int], block_cache_size: int) -> str:
+    """
+        Describes how the pages of a build went in one line, eg `Generated 6 of 6 pages, block cache: 25 hits, 101 misses`
+
+        Takes:
+        `count: int` => how many pages had to be generated
+        `failed: int` => how many of them failed
+        `counts: { name: count }` => the totals collected by `generate_pages`
+        `block_cache_size: int` => how many blocks each process keeps, the block cache is left out of the line when it is off
+    """
+    summary = f'Generated {count - failed} of {count} pages'
+    if block_cache_size > 0:
+        summary += f', block cache: {counts.get("block_cache_hits", 0)} hits, {counts.get("block_cache_misses", 0)} misses'
+    return summary
+
+def add_counts(counts: Dict[str, int], result: PageResult) -> None:
+    counts['block_cache_hits'] = counts.get('block_cache_hits', 0) + result.block_cache_hits
+    counts['block_cache_misses'] = counts.get('block_cache_misses', 0) + result.block_cache_misses
+
+def render_content(markdown: str, basepath: str, cache: Optional[ParseCache] = None, block_cache: Optional[BlockCache] = None, index: bool = False, search: bool = False, images: Optional[ImageSizer] = None, assets: Optional[AssetManifest] = None, page: Optional[PageProfile] = None) -> RenderedContent:
+    """
+        Works out the title and content of a page, reusing them from `cache` when this markdown was rendered before
+
+        Takes:
+        `index: bool` => also collect the links and images on the page
+        `search: bool` => also collect the search terms of the page
+        `images: ImageSizer` => when given, images from the static folder get their size and `srcset`
+        `assets: AssetManifest` => when given, links and images to static files point at their fingerprinted urls. Content returned as a node still has to be written with the same assets
+        `page: PageProfile` => when given, every stage is timed and the cache hits and misses are counted in it
+
+        Returns
+        `RenderedContent` => the content is a node, or an already serialized string when it went through the cache. The links and terms are `None` unless asked for, pages going through the cache always have them. The front matter is in `metadata`
+    """
+    with timed(page, 'extract_title'):
+        metadata, body = split_front_matter(markdown)
+    rewrite_url = basepath_rewriter(basepath, assets)
+    if cache is not None:
+        with timed(page, 'cache'):
+            key = cache.key(markdown, basepath)
+            cached = cache.get(key)
+        if page is not None:
+            page.count('parse_cache_hits' if cached is not None else 'parse_cache_misses')
+        if cached is not None:
+            return RenderedContent(cached.title, cached.body, PageLinks(cached.links, cached.images), cached.terms, metadata)
+    with timed(page, 'extract_title'):
+        title = metadata.get('Title') or extract_title(body)
+    with timed(page, 'block_parse'):
+        blocks = list(parse_blocks(body))
+    hits, misses = block_cache_counts(block_cache)
+    with timed(page, 'inline_parse'):
+        node = blocks_to_html_node(blocks, block_cache)
+    if page is not None:
+        if block_cache is not None:
+            page.count('block_cache_hits', block_cache.hits - hits)
+            page.count('block_cache_misses', block_cache.misses - misses)
+        page.nodes = count_nodes(node)
+    if images is not None:
+        with timed(page, 'images'):
+            images.annotate(node, rewrite_url)
+    links = None
+    terms = None
+    if index or cache is not None:
+        with timed(page, 'index'):
+            links = collect_links(node)
+    if search or cache is not None:
+        with timed(page, 'search'):
+            terms = page_terms(node)
+    if cache is None:
+        return RenderedContent(title, node, links, terms, metadata)
+    with timed(page, 'serialize'):
+        content = node.to_html(rewrite_url)
+    with timed(page, 'cache'):
+        cache.put(key, title, content, links.links, links.images, terms)
+    return RenderedContent(title, content, links, terms, metadata)
+
+def render_page(markdown: str, template_path: str, basepath: str, values: Optional[Dict[str, str]] = None, cache: Optional[ParseCache] = None, block_cache_size: int = 0, index: bool = False, search: bool = False, images: Optional[ImageSizer] = None, assets: Optional[AssetManifest] = None) -> Tuple[str, PageResult]:
+    """
+        Renders a page that has already been read into the template without touching the destination, so reading and writing can happen elsewhere
+
+        Takes:
+        `markdown: str` => the contents of the md file
+        `template_path: str` => the path of the template file
+        `values: { slot: value }` => extra values for the template, eg `Path`
+        `index: bool` => also collect the links and images on the page
+        `search: bool` => also collect the search terms of the page
+        `images: ImageSizer` => when given, images from the static folder get their size and `srcset`
+        `assets: AssetManifest` => when given, urls of static files point at their fingerprinted urls
+
+        Returns
+        `(html, PageResult)`
+    """
+    template = load_template(template_path, basepath, assets)
+    block_cache = get_block_cache(basepath, block_cache_size, assets)
+    hits, misses = block_cache_counts(block_cache)
+    rendered = render_content(markdown, basepath, cache, block_cache, index, search, images, assets)
+    chunks: List[str] = []
+    template.write_to(ChunkList(chunks), {**rendered.metadata, **(values or {}), 'Title': rendered.title, 'Content': rendered.content})
+    new_hits, new_misses = block_cache_counts(block_cache)
+    return ''.join(chunks), PageResult(rendered.title, rendered.links, rendered.terms, None, new_hits - hits, new_misses - misses)
+
+def generate_page(from_path: str, template_path: str, dest_path: str, basepath: str, values: Optional[Dict[str, str]] = None, profile: bool = False, cache: Optional[ParseCache] = None, block_cache_size: int = 0, writer: Optional[OutputWriter] = None, index: bool = False, search: bool = False, images: Optional[ImageSizer] = None, assets: Optional[AssetManifest] = None) -> PageResult:
     """
         Generates the HTML page
 
@@ -65,32 +276,230 @@ def generate_page(from_path: str, template_path: str, dest_path: str, basepath:
         `from_path: str` => the path of the md file to be converted
         `template_path: str` => the path of the template file 
         `dest_path: str` => the path of the destination html file
+        `values: { slot: value }` => extra values for the template, eg `Path`
+        `profile: bool` => time every stage of generating the page
+        `cache: ParseCache` => when given, the title and content are reused from the cache if this markdown was rendered before
+        `block_cache_size: int` => how many rendered blocks this process keeps to reuse across pages, 0 turns it off
+        `writer: OutputWriter` => when given, the page is handed to it to write in the background
+        `index: bool` => also collect the links and images on the page for the site index
+        `search: bool` => also collect the search terms of the page
+        `images: ImageSizer` => when given, images from the static folder get their size and `srcset`
+        `assets: AssetManifest` => when given, urls of static files point at their fingerprinted urls
 
         Returns
-        `None`
+        `PageResult` => the title and how the block cache did, and the links, terms and `PageProfile` when asked for
     """
     
     print(f'Generating pades from {from_path} to {dest_path} using {template_path}')
+    block_cache = get_block_cache(basepath, block_cache_size, assets)
+    hits, misses = block_cache_counts(block_cache)
+    if profile:
+        result = profile_page(from_path, template_path, dest_path, basepath, values, cache, block_cache, index, search, images, assets)
+        new_hits, new_misses = block_cache_counts(block_cache)
+        return result._replace(block_cache_hits=new_hits - hits, block_cache_misses=new_misses - misses)
     file = open(from_path)
     markdown = file.read()
     file.close()
-    file = open(template_path)
-    html = file.read()
-    file.close()
-    
-    title = extract_title(markdown)
-    content = markdown_to_html_node(markdown).to_html()
+    template = load_template(template_path, basepath, assets)
+    rendered = render_content(markdown, basepath, cache, block_cache, index, search, images, assets)
+    page_values = {**rendered.metadata, **(values or {}), 'Title': rendered.title, 'Content': rendered.content}
 
-    html = html.replace('{{ Title }}', title)
-    html = html.replace('{{ Content }}', content)
-    html = html.replace('href="/', f'href="{basepath}')
-    html = html.replace('src="/', f'src="{basepath}')
+    if writer is None:
+        with atomic_open(dest_path) as file:
+            template.write_to(file, page_values)
+    else:
+        chunks: List[str] = []
+        template.write_to(ChunkList(chunks), page_values)
+        writer.write(dest_path, chunks)
+    new_hits, new_misses = block_cache_counts(block_cache)
+    return PageResult(rendered.title, rendered.links, rendered.terms, None, new_hits - hits, new_misses - misses)
 
-    file = open(dest_path, 'x')
-    file.write(html)
-    file.close()
+def profile_page(from_path: str, template_path: str, dest_path: str, basepath: str, values: Optional[Dict[str, str]] = None, cache: Optional[ParseCache] = None, block_cache: Optional[BlockCache] = None, index: bool = False, search: bool = False, images: Optional[ImageSizer] = None, assets: Optional[AssetManifest] = None) -> PageResult:
+    """
+        Does the same as `generate_page` while timing every stage, `render_content` times its own stages.
+        The content is serialized to a string before filling the template instead of being streamed into the file.
+
+        Returns
+        `PageResult` with the `PageProfile`
+    """
+    page = PageProfile(from_path)
+    with page.stage('read'):
+        with open(from_path) as file:
+            markdown = file.read()
+    rendered = render_content(markdown, basepath, cache, block_cache, index, search, images, assets, page)
+    content = rendered.content
+    if not isinstance(content, str):
+        with page.stage('serialize'):
+            content = content.to_html(basepath_rewriter(basepath, assets))
+    with page.stage('template'):
+        template = load_template(template_path, basepath, assets)
+        html = template.render({**rendered.metadata, **(values or {}), 'Title': rendered.title, 'Content': content})
+    with page.stage('write'):
+        with atomic_open(dest_path) as file:
+            file.write(html)
+    return PageResult(rendered.title, rendered.links, rendered.terms, page)
+
+def iter_pages(from_path: str, dest_path: str, filters: PageFilter = PageFilter()) -> Iterator[Tuple[str, str]]:
+    """
+        Walks the `from_path` directory and yields every page that has to be generated as it is found, creating the destination folders on the way
+
+        Takes:
+        `from_path: str` => the folder containing the md files
+        `dest_path: str` => the folder the html files go in
+        `filters: PageFilter` => globs and drafts to skip while walking
+
+        Returns
+        `Iterator[Tuple[str, str]]` => pairs of source md path and destination html path, in a stable order
+    """
+    made: Set[str] = set()
+    prefix = len(os.path.join(from_path, ''))
+    for entry in walk_files(from_path, filters.include, filters.exclude, filters.drafts):
+        directory = os.path.dirname(entry.path[prefix:])
+        page_path = os.path.join(dest_path, directory, f'{entry.name.split(".")[0]}.html')
+        make_parent(page_path, made)
+        yield entry.path, page_path
 
-def generate_page_recursive(from_path: str, template_path: str, dest_path: str, basepath: str) -> None:
+def discover_pages(from_path: str, dest_path: str, filters: PageFilter = PageFilter()) -> List[Tuple[str, str]]:
+    """
+        Lists every page `iter_pages` finds
+
+        Returns
+        `pages: List[Tuple[str, str]]` => pairs of source md path and destination html path, in a stable order
+    """
+    return list(iter_pages(from_path, dest_path, filters))
+
+class PageSelection():
+    """
+        The pages a build has to generate, iterating over it walks `from_path` and yields them as they are found.
+        Both `generate_page_recursive` and the async pipeline pick their pages and report how they went through this.
+
+        Args:
+            - `from_path : str` => the content folder
+            - `dest_path : str` => the output folder
+            - `filters : PageFilter` => globs and drafts to skip while walking
+            - `manifest : BuildManifest` => when given, pages that have not changed since the last build are skipped
+            - `search : SearchIndex` => when given, pages that are skipped are kept in it
+            - `shard : Shard` => when given, only the pages of this shard are yielded
+    """
+    def __init__(self, from_path: str, dest_path: str, filters: PageFilter = PageFilter(), manifest: Optional[BuildManifest] = None, search: Optional[SearchIndex] = None, shard: Optional[Shard] = None):
+        self.from_path = from_path
+        self.dest_path = dest_path
+        self.filters = filters
+        self.manifest = manifest
+        self.search = search
+        self.shard = shard
+        self.count = 0
+
+    def __iter__(self) -> Iterator[Tuple[str, str]]:
+        found = iter_pages(self.from_path, self.dest_path, self.filters)
+        if self.shard is not None:
+            found = self.shard.select(found, self.from_path)
+        for page in found:
+            if self.search is not None:
+                self.search.keep(page_url(page[1], self.dest_path, '/'))
+            if self.manifest is None or self.manifest.needs_update(page[0], page[1], 'page'):
+                self.count += 1
+                yield page
+
+    def report(self, errors: List[Tuple[str, Exception]], counts: Dict[str, int], block_cache_size: int) -> None:
+        """
+            Prints how the pages went and the pages that failed, which are marked out of date in the manifest so the next build retries them
+
+            Takes:
+            `errors: List[Tuple[str, Exception]]` => the pages that failed along with their error
+            `counts: { name: count }` => the totals collected while generating
+            `block_cache_size: int` => how many blocks each process keeps, 0 when the block cache is off
+
+            Raises
+            `Exception` when any page failed
+        """
+        print(page_summary(self.count, len(errors), counts, block_cache_size))
+        for page_path, error in errors:
+            print(f'Failed to generate {page_path}: {error}', file=sys.stderr)
+            if self.manifest is not None:
+                self.manifest.forget(page_path)
+        if errors:
+            raise Exception(f'{len(errors)} of {self.count} pages failed to generate')
+
+def generate_pages(pages: Iterable[Tuple[str, str]], template_path: str, basepath: str, jobs: int = 1, dest_root: Optional[str] = None, profile: Optional[BuildProfile] = None, cache: Optional[ParseCache] = None, block_cache_size: int = 0, write_thread: bool = False, site_index: Optional[SiteIndex] = None, search: Optional[SearchIndex] = None, images: Optional[ImageSizer] = None, assets: Optional[AssetManifest] = None, counts: Optional[Dict[str, int]] = None) -> List[Tuple[str, Exception]]:
+    """
+        Runs `generate_page` on every page, spreading the work over `jobs` processes.
+        Pages are taken from `pages` as they are needed, so it can be a generator like `iter_pages`.
+
+        Takes:
+        `pages: Iterable[Tuple[str, str]]` => pairs of source md path and destination html path
+        `template_path: str` => the path of the template file 
+        `jobs: int` => how many worker processes to use, 1 renders in this process
+        `dest_root: str` => the folder the site is built into, used to fill in the `Path` of every page
+        `profile: BuildProfile` => when given, every page is timed and added to it
+        `cache: ParseCache` => when given, pages whose markdown was rendered before are not parsed again
+        `block_cache_size: int` => how many rendered blocks each process keeps to reuse across pages, 0 turns it off
+        `write_thread: bool` => when rendering in this process, write the pages on a background thread. Worker processes always write their own pages
+        `site_index: SiteIndex` => when given, the title, links and images of every page are added to it, this needs `dest_root`
+        `search: SearchIndex` => when given, the search terms of every page are added to it, this needs `dest_root`
+        `images: ImageSizer` => when given, images from the static folder get their size and `srcset`
+        `assets: AssetManifest` => when given, urls of static files point at their fingerprinted urls
+        `counts: { name: count }` => when given, the block cache hits and misses of every page are added up in it
+
+        Returns
+        `errors: List[Tuple[str, Exception]]` => the pages that failed along with their error, in the same order as `pages`
+    """
+    errors = []
+    profiling = profile is not None
+    indexing = site_index is not None
+    searching = search is not None
+
+    def page_values(dest_path: str) -> Optional[Dict[str, str]]:
+        return {'Path': page_url(dest_path, dest_root, basepath)} if dest_root is not None else None
+
+    def add_result(dest_path: str, result: PageResult) -> None:
+        if counts is not None:
+            add_counts(counts, result)
+        if profile is not None and result.profile is not None:
+            profile.add(result.profile)
+        if site_index is not None and result.links is not None:
+            site_index.add(page_url(dest_path, dest_root, '/'), result.title, result.links)
+        if search is not None and result.terms is not None:
+            search.add(page_url(dest_path, dest_root, '/'), result.title, result.terms)
+
+    if jobs <= 1:
+        writer = OutputWriter() if write_thread and not profiling else None
+        sources: Dict[str, str] = {}
+        try:
+            for from_path, dest_path in pages:
+                sources[dest_path] = from_path
+                try:
+                    result = generate_page(from_path, template_path, dest_path, basepath, page_values(dest_path), profiling, cache, block_cache_size, writer, indexing, searching, images, assets)
+                except Exception as error:
+                    errors.append((from_path, error))
+                    continue
+                add_result(dest_path, result)
+        finally:
+            if writer is not None:
+                errors.extend((sources[dest_path], error) for dest_path, error in writer.close())
+                order = {from_path: index for index, from_path in enumerate(sources.values())}
+                errors.sort(key=lambda error: order[error[0]])
+        return errors
+
+    def collect(from_path: str, dest_path: str, future: Future) -> None:
+        error = future.exception()
+        if error is not None:
+            errors.append((from_path, error))
+        else:
+            add_result(dest_path, future.result())
+
+    pending: Deque[Tuple[str, str, Future]] = deque()
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        for from_path, dest_path in pages:
+            future = executor.submit(generate_page, from_path, template_path, dest_path, basepath, page_values(dest_path), profiling, cache, block_cache_size, None, indexing, searching, images, assets)
+            pending.append((from_path, dest_path, future))
+            if len(pending) >= jobs * 4:
+                collect(*pending.popleft())
+        while pending:
+            collect(*pending.popleft())
+    return errors
+
+def generate_page_recursive(from_path: str, template_path: str, dest_path: str, basepath: str, manifest: Optional[BuildManifest] = None, jobs: int = 1, profile: Optional[BuildProfile] = None, cache: Optional[ParseCache] = None, block_cache_size: int = 0, write_thread: bool = False, filters: PageFilter = PageFilter(), site_index: Optional[SiteIndex] = None, search: Optional[SearchIndex] = None, images: Optional[ImageSizer] = None, assets: Optional[AssetManifest] = None, shard: Optional[Shard] = None) -> None:
     """
         Recursively runs `generate_page` on all files and subfiles in the `from_path` directory
 
@@ -98,27 +507,247 @@ def generate_page_recursive(from_path: str, template_path: str, dest_path: str,
         `from_path: str` => the path of the md file to be converted
         `template_path: str` => the path of the template file 
         `dest_path: str` => the path of the destination html file
+        `manifest: BuildManifest` => when given, pages that have not changed since the last build are skipped
+        `jobs: int` => how many worker processes to render with
+        `profile: BuildProfile` => when given, every page is timed and added to it
+        `cache: ParseCache` => when given, pages whose markdown was rendered before are not parsed again
+        `block_cache_size: int` => how many rendered blocks each process keeps to reuse across pages, 0 turns it off
+        `write_thread: bool` => write pages on a background thread when rendering in this process
+        `filters: PageFilter` => globs and drafts to skip while walking
+        `site_index: SiteIndex` => when given, every page is added to it
+        `search: SearchIndex` => when given, every rebuilt page is added to it and the pages that were skipped are kept
+        `images: ImageSizer` => when given, images from the static folder get their size and `srcset`
+        `assets: AssetManifest` => when given, urls of static files point at their fingerprinted urls
+        `shard: Shard` => when given, only the pages of this shard are generated
 
         Returns
         `None`
     """
-    files = os.listdir(from_path)
-    for file in files:
-        if os.path.isfile(f'{from_path}/{file}'):
-            new_file_name = f'{file.split('.')[0]}.html'
-            generate_page(f'{from_path}/{file}', template_path, f'{dest_path}/{new_file_name}', basepath)
+    selection = PageSelection(from_path, dest_path, filters, manifest, search, shard)
+    counts: Dict[str, int] = {}
+    errors = generate_pages(selection, template_path, basepath, jobs, dest_path, profile, cache, block_cache_size, write_thread, site_index, search, images, assets, counts)
+    selection.report(errors, counts, block_cache_size)
+
+def write_site_index(site_index: SiteIndex, static_path: str, dest_path: str, template: Template, site_url: str = '', report_path: Optional[str] = None) -> None:
+    """
+        Writes everything made from the site index once every page was built, printing the broken links unless they go to `report_path`
+    """
+    index_files(site_index, (entry.path for entry in walk_files(static_path)), static_path)
+    if not site_url:
+        print('Not writing sitemap.xml, it needs absolute urls so pass --site-url', file=sys.stderr)
+    broken = site_index.write(dest_path, template, site_url, report_path)
+    if broken and report_path is None:
+        for url, link in broken:
+            print(f'Broken link on {url}: {link}', file=sys.stderr)
+    print(f'Indexed {len(site_index.pages)} pages, {len(broken)} broken links')
+
+def list_pages(argv: Optional[list] = None) -> int:
+    """
+        Prints the url, title and front matter of every page, reading each file only as far as its title
+    """
+    parser = argparse.ArgumentParser(description='Lists the pages in ./content without building them')
+    parser.add_argument('basepath', nargs='?', default='/', help='the path the site is served under')
+    parser.add_argument('--fields', nargs='*', default=['Date'], help='front matter values to print after the title')
+    parser.add_argument('--drafts', action=argparse.BooleanOptionalAction, default=True, help='list drafts, --no-drafts leaves them out')
+    args = parser.parse_args(argv)
+    failed = 0
+    for entry in walk_files('./content', drafts=args.drafts):
+        relative_path = os.path.relpath(entry.path, './content')
+        url = page_url(os.path.join('./docs', os.path.dirname(relative_path), f'{entry.name.split(".")[0]}.html'), './docs', args.basepath)
+        try:
+            metadata = read_metadata(entry.path)
+        except Exception as error:
+            print(f'Failed to read {entry.path}: {error}', file=sys.stderr)
+            failed += 1
+            continue
+        fields = '\t'.join(metadata.get(field, '') for field in args.fields)
+        print(f'{url}\t{metadata["Title"]}\t{fields}'.rstrip('\t'))
+    return 1 if failed else 0
+
+def parse_args(argv: Optional[list] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Builds the site in ./content and ./static into ./docs')
+    parser.add_argument('basepath', nargs='?', default='/', help='the path the site is served under')
+    parser.add_argument('--incremental', action='store_true', help='only rebuild pages and files that changed since the last build')
+    parser.add_argument('--jobs', '-j', type=int, default=1, help='how many processes to render pages with, 0 uses every cpu')
+    parser.add_argument('--sync-assets', action='store_true', help='keep ./docs and only copy static files whose size or mtime changed, every page is still rendered')
+    parser.add_argument('--link-assets', action='store_true', help='hardlink static files into ./docs instead of copying them')
+    parser.add_argument('--copy-jobs', type=int, default=8, help='how many static files to copy at the same time')
+    parser.add_argument('--staging', action=argparse.BooleanOptionalAction, default=True, help='build into a staging folder and swap it with ./docs once finished, ignored by incremental and asset sync builds')
+    parser.add_argument('--write-thread', action=argparse.BooleanOptionalAction, default=True, help='write pages on a background thread while the next one renders')
+    parser.add_argument('--include', action='append', default=[], help='only build content files whose path matches this glob, eg blog/*, can be given more than once')
+    parser.add_argument('--exclude', action='append', default=[], help='skip content files and folders whose path matches this glob, can be given more than once')
+    parser.add_argument('--drafts', action=argparse.BooleanOptionalAction, default=True, help='build drafts, content files and folders named _* or *.draft.*, --no-drafts skips them')
+    parser.add_argument('--index', action='store_true', help='collect the title, links and images of every page while rendering to write sitemap.xml, listing pages for sections without an index page and a broken link report')
+    parser.add_argument('--site-url', default='', help='with --index, the scheme and host the site is served from, eg https://example.com. sitemap.xml is only written when it is given')
+    parser.add_argument('--link-report', help='with --index, write the broken internal links to this file instead of printing them')
+    parser.add_argument('--search', action='store_true', help='build a search index of every page into ./docs/search for searching in the browser')
+    parser.add_argument('--fingerprint', action='store_true', help=f'also copy static files to names with a content hash, eg index.3f9a1c08.css, point every page at them and write {ASSET_MANIFEST_NAME}')
+    parser.add_argument('--minify', action='store_true', help='collapse the whitespace in the built html, leaving pre blocks alone, and minify the css')
+    parser.add_argument('--gzip', action='store_true', help='write a .gz next to every html, css, js, json, xml, svg and txt file at the highest compression, for servers that serve them as they are')
+    parser.add_argument('--compress-jobs', type=int, default=8, help='with --minify or --gzip, how many files to handle at the same time')
+    parser.add_argument('--image-sizes', action='store_true', help='add the width and height of images in ./static to their img tags, read from the image headers')
+    parser.add_argument('--responsive-images', type=int, nargs='+', default=[], metavar='WIDTH', help='also make downscaled copies of the images in ./static at these widths and list them in a srcset, needs Pillow')
+    parser.add_argument('--image-cache', default='./.cache/images', help='where the downscaled copies are kept between builds')
+    parser.add_argument('--shard', type=parse_shard, metavar='K/N', help='build only the K-th of N parts of the pages into ./docs.shard-K, shard 1 also copies the static files. Combine the parts with main.py merge')
+    parser.add_argument('--shard-weighted', action='store_true', help='with --shard, split the pages so every shard gets about the same number of bytes of markdown instead of by path hash alone')
+    parser.add_argument('--async', dest='async_build', action='store_true', help='stream pages through read, render and write stages that run at the same time, copying static files alongside')
+    parser.add_argument('--io-jobs', type=int, default=8, help='with --async, how many pages may be read and written at the same time')
+    parser.add_argument('--queue-size', type=int, default=64, help='with --async, how many pages may wait between two stages')
+    parser.add_argument('--cache-dir', help='reuse rendered pages from this folder when their markdown has not changed')
+    parser.add_argument('--cache-size', type=int, default=DEFAULT_CACHE_SIZE // (1024 * 1024), help='how many megabytes the cache may use')
+    parser.add_argument('--block-cache', type=int, default=4096, help='how many rendered blocks each process keeps to reuse across pages, 0 turns it off')
+    parser.add_argument('--profile', action='store_true', help='time every stage of every page and print a report')
+    parser.add_argument('--profile-top', type=int, default=10, help='how many of the slowest pages to list in the report')
+    parser.add_argument('--profile-json', help='also write the profile to this json file')
+    parser.add_argument('--profile-trace', help='also write the profile as a chrome trace to this file')
+    args = parser.parse_args(argv)
+    if args.async_build and (args.profile or args.profile_json or args.profile_trace):
+        parser.error('--async cannot be combined with profiling')
+    if args.index and args.incremental:
+        parser.error('--index needs every page, so it cannot be combined with --incremental')
+    if args.shard is not None:
+        if args.index or args.search:
+            parser.error('--index and --search need every page, so they cannot be combined with --shard')
+        if args.incremental or args.sync_assets:
+            parser.error('shards are always built from scratch, so --shard cannot be combined with --incremental or --sync-assets')
+        args.shard = args.shard._replace(weighted=args.shard_weighted)
+    elif args.shard_weighted:
+        parser.error('--shard-weighted needs --shard')
+    if args.responsive_images and not can_resize():
+        parser.error('--responsive-images needs Pillow, install it with pip install Pillow')
+    return args
+
+def main(argv: Optional[list] = None):
+    if argv is None:
+        argv = sys.argv[1:]
+    if argv and argv[0] == 'serve':
+        import server
+        return server.main(argv[1:])
+    if argv and argv[0] == 'list':
+        return list_pages(argv[1:])
+    if argv and argv[0] == 'merge':
+        import shard
+        return shard.main(argv[1:])
+    if argv and argv[0] == 'preview':
+        import wsgi
+        return wsgi.main(argv[1:])
+    args = parse_args(argv)
+    basepath = args.basepath
+    jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+    assets = AssetManifest.scan('./static', AssetManifest.load(f'./docs/{ASSET_MANIFEST_NAME}')) if args.fingerprint else None
+    manifest = None
+    if args.incremental or args.sync_assets:
+        settings = {'template': file_hash('./template.html'), 'basepath': basepath}
+        if args.search:
+            settings['search'] = SEARCH_VERSION
+        if args.image_sizes or args.responsive_images:
+            settings['images'] = images_fingerprint('./static')
+            settings['image_widths'] = sorted(args.responsive_images)
+        if assets is not None:
+            settings['assets'] = assets.version
+        manifest = BuildManifest.load(f'./docs/{MANIFEST_NAME}', settings)
+        if not args.incremental:
+            # asset syncs render every page, the manifest is only kept so outputs of deleted sources are removed
+            manifest.settings_changed = True
+    images = ImageSizer('./static', args.responsive_images) if args.image_sizes or args.responsive_images else None
+    cache = None
+    if args.cache_dir:
+        sources = [inspect.getsource(extract_title), inspect.getsource(split_front_matter), inspect.getsource(collect_links), inspect.getsource(inspect.getmodule(page_terms)), f'search {SEARCH_VERSION}']
+        if images is not None:
+            sources.append(inspect.getsource(ImageSizer.annotate))
+            sources.append(f'images {images_fingerprint("./static")} {images.widths}')
+        if assets is not None:
+            sources.append(f'assets {assets.version}')
+        cache = ParseCache(args.cache_dir, parser_version(*sources), args.cache_size * 1024 * 1024)
+    profile = BuildProfile() if args.profile or args.profile_json or args.profile_trace else None
+    filters = PageFilter(args.include, args.exclude, args.drafts)
+    site_index = SiteIndex() if args.index else None
+    search = None
+    if args.search:
+        search = SearchIndex.load(f'./docs/{SEARCH_STATE_NAME}') if args.incremental else SearchIndex()
+        if args.incremental and not search.pages:
+            manifest.settings_changed = True
+    shard = args.shard
+    copies_static = shard is None or shard.copies_static
+    if shard is not None:
+        staging = False
+        output = shard.output_path
+        if os.path.exists(output):
+            rmtree(output)
+        os.mkdir(output)
+    else:
+        in_place = manifest is not None
+        staging = args.staging and not in_place
+        init(clean=not in_place and not staging)
+        output = prepare_staging('./docs') if staging else './docs'
+    succeeded = False
+    try:
+        if args.async_build:
+            import asyncio
+            import pipeline
+            asyncio.run(pipeline.build(
+                './content', './static', './template.html', output, basepath,
+                manifest=manifest, jobs=jobs, io_jobs=args.io_jobs, copy_jobs=args.copy_jobs, link=args.link_assets,
+                cache=cache, block_cache_size=args.block_cache, queue_size=args.queue_size, filters=filters,
+                site_index=site_index, search=search, images=images, assets=assets, shard=shard,
+            ))
         else:
-            if not os.path.exists(f'{dest_path}/{file}'):
-                os.mkdir(f'{dest_path}/{file}')
-            generate_page_recursive(f'{from_path}/{file}', template_path, f'{dest_path}/{file}', basepath)
-
-def main():
-    basepath = "/"
-    if len(sys.argv) == 2:
-        basepath = sys.argv[1]
-    init()
-    copy_files('./static', './docs')
-    generate_page_recursive('./content','./template.html','./docs', basepath)
+            if copies_static:
+                copy_files('./static', output, manifest, args.copy_jobs, args.link_assets, assets)
+            generate_page_recursive(
+                './content', './template.html', output, basepath,
+                manifest=manifest, jobs=jobs, profile=profile, cache=cache, block_cache_size=args.block_cache,
+                write_thread=args.write_thread, filters=filters, site_index=site_index, search=search,
+                images=images, assets=assets, shard=shard,
+            )
+        if args.responsive_images and copies_static:
+            counts = build_derivatives('./static', output, args.responsive_images, args.image_cache, jobs, args.link_assets)
+            print(f'Responsive images: {counts["resized"]} resized, {counts["cached"]} from the cache, {counts["placed"]} placed, {counts["hashed"]} hashed')
+        if site_index is not None:
+            write_site_index(site_index, './static', output, load_template('./template.html', basepath, assets), args.site_url, args.link_report)
+        if assets is not None and copies_static:
+            assets.write(output)
+            print(f'Fingerprinted {len(assets.assets)} static files, {assets.hashed} hashed')
+        if search is not None:
+            stats = search.write(output, basepath)
+            print(f'Search index: {stats["pages"]} pages ({search.added} tokenized), {stats["terms"]} terms in {stats["shards"]} shards, {stats["files_written"]} files written in {stats["seconds"] * 1000:.1f} ms')
+        if args.minify or args.gzip:
+            counts = compress_site(output, args.minify, args.gzip, args.compress_jobs)
+            print(f'Compressed {counts["files"]} files, {counts["minified"]} minified, {counts["compressed"]} gzip files written and {counts["removed"]} stale ones removed')
+        if shard is not None:
+            settings = {
+                'basepath': basepath,
+                'template': file_hash('./template.html'),
+                'assets': assets.version if assets is not None else '',
+                'include': args.include,
+                'exclude': args.exclude,
+                'drafts': args.drafts,
+                'images': images_fingerprint('./static') if images is not None else '',
+                'image_sizes': args.image_sizes,
+                'responsive_images': sorted(args.responsive_images),
+                'minify': args.minify,
+                'gzip': args.gzip,
+            }
+            count = write_shard_manifest(output, shard, settings)
+            print(f'Shard {shard.index}/{shard.count}: {count} files written to {output}')
+        succeeded = True
+    finally:
+        if staging:
+            if succeeded:
+                swap_into_place(output, './docs')
+            else:
+                rmtree(output)
+        if manifest is not None:
+            manifest.finish('./docs', succeeded)
+        if cache is not None:
+            cache.evict()
+        if profile is not None:
+            print(profile.report(args.profile_top))
+            if args.profile_json:
+                profile.write_json(args.profile_json)
+            if args.profile_trace:
+                profile.write_chrome_trace(args.profile_trace)
+    return 0
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -0,0 +1,202 @@
+import os
+import json
+import hashlib
+from typing import Optional, Dict, Any, List, Sequence
+
+MANIFEST_NAME = '.build-manifest.json'
+MANIFEST_VERSION = 1
+
+def file_hash(path: str) -> str:
+    """
+        Hashes the contents of a file
+
+        Takes:
+        `path: str` => the path of the file to hash
+
+        Returns
+        `hash: str` => the sha256 hex digest of the file
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(1 << 16), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def entry_outputs(entry: Dict[str, Any]) -> List[str]:
+    """
+        Lists every path a manifest entry was built into, its output followed by its aliases
+    """
+    output = entry.get('output')
+    return ([output] if output is not None else []) + entry.get('aliases', [])
+
+class BuildManifest():
+    """
+        Keeps track of what every output in the build was generated from so that unchanged files can be skipped
+
+        Args:
+            - `path : str` => Where the manifest is stored, usually inside the output folder
+            - `settings : { key: value }` => Anything that affects every page, eg the template hash and the basepath. If these differ from the stored ones every page is rebuilt
+    """
+    def __init__(self, path: str, settings: Optional[Dict[str, str]]=None):
+        self.path = path
+        self.settings = settings or {}
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self.settings_changed = True
+        self.seen: Dict[str, Dict[str, Any]] = {}
+
+    @classmethod
+    def load(cls, path: str, settings: Optional[Dict[str, str]]=None) -> "BuildManifest":
+        """
+            Loads a manifest from disk, an unreadable or missing manifest is treated as empty
+
+            Takes:
+            `path: str` => the path of the manifest file
+            `settings: { key: value }` => the settings for the current build
+
+            Returns
+            `BuildManifest`
+        """
+        manifest = cls(path, settings)
+        try:
+            with open(path) as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            return manifest
+        if data.get('version') != MANIFEST_VERSION:
+            return manifest
+        manifest.entries = data.get('entries', {})
+        manifest.settings_changed = data.get('settings') != manifest.settings
+        return manifest
+
+    def save(self, complete: bool = True) -> None:
+        """
+            Writes the entries seen during this build to disk
+
+            Takes:
+            `complete: bool` => whether every source was walked, when not the entries of sources that were not reached are kept from the last build
+        """
+        data = {
+            'version': MANIFEST_VERSION,
+            'settings': self.settings,
+            'entries': self.seen if complete else {**self.entries, **self.seen},
+        }
+        temp_path = f'{self.path}.tmp'
+        with open(temp_path, 'w') as file:
+            json.dump(data, file, indent=1, sort_keys=True)
+        os.replace(temp_path, self.path)
+
+    def needs_update(self, source: str, output: str, kind: str, aliases: Sequence[str] = ()) -> bool:
+        """
+            Checks if `output` has to be regenerated from `source`.
+            The size and mtime are compared first and the file is only hashed when those differ.
+
+            Takes:
+            `source: str` => the path of the source file
+            `output: str` => the path of the file generated from it
+            `kind: str` => `page` or `static`, pages are also rebuilt when the settings changed
+            `aliases: List[str]` => more paths the same output is placed at, eg the original name of a fingerprinted file
+
+            Returns
+            `bool`
+        """
+        source = os.path.normpath(source)
+        output = os.path.normpath(output)
+        stat = os.stat(source)
+        entry = {'kind': kind, 'output': output, 'size': stat.st_size, 'mtime': stat.st_mtime_ns}
+        if aliases:
+            entry['aliases'] = [os.path.normpath(alias) for alias in aliases]
+        old_entry = self.entries.get(source)
+        self.seen[source] = entry
+
+        if old_entry is None or old_entry.get('output') != output or old_entry.get('kind') != kind or old_entry.get('aliases') != entry.get('aliases'):
+            entry['hash'] = file_hash(source)
+            return True
+        if old_entry.get('size') == stat.st_size and old_entry.get('mtime') == stat.st_mtime_ns:
+            entry['hash'] = old_entry.get('hash')
+        else:
+            entry['hash'] = file_hash(source)
+        if entry['hash'] != old_entry.get('hash'):
+            return True
+        if kind == 'page' and self.settings_changed:
+            return True
+        return not all(os.path.exists(path) for path in entry_outputs(entry))
+
+    def record(self, source: str, output: str, kind: str) -> None:
+        """
+            Marks `source` as built into `output` without checking if it was up to date
+
+            Takes:
+            `source: str` => the path of the source file
+            `output: str` => the path of the file generated from it
+            `kind: str` => `page` or `static`
+        """
+        source = os.path.normpath(source)
+        if source in self.seen:
+            return
+        stat = os.stat(source)
+        self.seen[source] = {
+            'kind': kind,
+            'output': os.path.normpath(output),
+            'size': stat.st_size,
+            'mtime': stat.st_mtime_ns,
+            'hash': file_hash(source),
+        }
+
+    def forget(self, source: str) -> None:
+        """
+            Marks `source` as out of date so that it is rebuilt next time, eg because generating it failed. Its old output is kept
+
+            Takes:
+            `source: str` => the path of the source file
+        """
+        source = os.path.normpath(source)
+        entry = self.seen.pop(source, None)
+        if entry is not None:
+            self.seen[source] = {**entry, 'mtime': None, 'hash': None}
+
+    def finish(self, root: str, complete: bool) -> List[str]:
+        """
+            Ends the build, deleting stale outputs and saving the manifest.
+            Stale outputs are only deleted when the build completed, after a failure most sources may never have been seen so their old entries are saved again instead
+
+            Takes:
+            `root: str` => the output folder
+            `complete: bool` => whether every source was walked
+
+            Returns
+            `removed: List[str]` => the outputs that were deleted
+        """
+        removed = self.remove_stale(root) if complete else []
+        self.save(complete)
+        return removed
+
+    def remove_stale(self, root: str) -> List[str]:
+        """
+            Deletes outputs whose sources were not seen during this build or are now built somewhere else, eg under a new fingerprinted name, along with their gzip sidecars and any folders that end up empty
+
+            Takes:
+            `root: str` => the output folder, folders are never removed above this
+
+            Returns
+            `removed: List[str]` => the outputs that were deleted
+        """
+        root = os.path.normpath(root)
+        live_outputs = {output for entry in self.seen.values() for output in entry_outputs(entry)}
+        removed = []
+        old_outputs = [output for entry in self.entries.values() for output in entry_outputs(entry)]
+        for output in old_outputs:
+            if output in live_outputs:
+                continue
+            if os.path.isfile(output):
+                os.remove(output)
+                removed.append(output)
+            if os.path.isfile(f'{output}.gz'):
+                os.remove(f'{output}.gz')
+            parent = os.path.dirname(output)
+            while parent != root and os.path.commonpath([root, parent]) == root:
+                try:
+                    os.rmdir(parent)
+                except OSError:
+                    break
+                parent = os.path.dirname(parent)
+        return removed
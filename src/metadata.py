@@ -0,0 +1,106 @@
+import re
+from typing import Dict, Tuple, Iterable, Optional
+
+FRONT_MATTER_FENCE = '---'
+title_pattern = re.compile(r'^[ \t]*# (.*)$', re.MULTILINE)
+
+def title_from_line(line: str) -> Optional[str]:
+    """
+        Returns the title if `line` is a `# ` heading, only the `# ` marker is removed so titles like `# #1 fan` keep their own `#`
+    """
+    stripped_line = line.strip()
+    if stripped_line.startswith('# '):
+        return stripped_line[2:].strip()
+    return None
+
+def slot_name(key: str) -> str:
+    """
+        Turns a front matter key into the template slot it fills, eg `date` fills `{{ Date }}`
+    """
+    key = key.strip()
+    return key[:1].upper() + key[1:]
+
+def parse_value(value: str) -> str:
+    value = value.strip()
+    if len(value) >= 2 and value[0] == value[-1] and value[0] in '"\'':
+        return value[1:-1]
+    return value
+
+def split_front_matter(markdown: str) -> Tuple[Dict[str, str], str]:
+    """
+        Splits the `key: value` lines between two `---` lines at the very top of a page from the markdown
+
+        Takes:
+        `markdown: str` => the contents of the md file
+
+        Returns
+        `(metadata, markdown)` => the values keyed by their template slot, and the markdown after the front matter. Pages without front matter are returned as they are
+    """
+    if not markdown.startswith(FRONT_MATTER_FENCE):
+        return {}, markdown
+    first_line_end = markdown.find('\n')
+    if first_line_end == -1 or markdown[:first_line_end].strip() != FRONT_MATTER_FENCE:
+        return {}, markdown
+    metadata: Dict[str, str] = {}
+    position = first_line_end + 1
+    while position < len(markdown):
+        line_end = markdown.find('\n', position)
+        if line_end == -1:
+            line_end = len(markdown)
+        line = markdown[position:line_end]
+        position = line_end + 1
+        if line.strip() == FRONT_MATTER_FENCE:
+            return metadata, markdown[position:]
+        key, separator, value = line.partition(':')
+        if separator:
+            metadata[slot_name(key)] = parse_value(value)
+    return {}, markdown
+
+def extract_metadata(lines: Iterable[str]) -> Dict[str, str]:
+    """
+        Reads the front matter and the title from the start of a page, pulling lines only until the title is found.
+        Passing an open file means only the head of the file is read.
+
+        Takes:
+        `lines: Iterable[str]` => the lines of the page, eg an open file
+
+        Returns
+        `metadata: { slot: value }` => the front matter values and the `Title`
+    """
+    metadata: Dict[str, str] = {}
+    lines = iter(lines)
+    first_line = next(lines, None)
+    if first_line is None:
+        raise Exception('there is no h1 header in an empty page')
+    if first_line.strip() == FRONT_MATTER_FENCE:
+        read_lines = []
+        for line in lines:
+            if line.strip() == FRONT_MATTER_FENCE:
+                break
+            read_lines.append(line)
+            key, separator, value = line.partition(':')
+            if separator:
+                metadata[slot_name(key)] = parse_value(value)
+        else:
+            # without a closing fence there is no front matter, like in `split_front_matter`, so the lines read are part of the page
+            metadata = {}
+            lines = iter(read_lines)
+        if 'Title' in metadata:
+            return metadata
+        first_line = None
+    if first_line is not None:
+        title = title_from_line(first_line)
+        if title is not None:
+            return {**metadata, 'Title': title}
+    for line in lines:
+        title = title_from_line(line)
+        if title is not None:
+            return {**metadata, 'Title': title}
+    raise Exception('there is no h1 header in the page')
+
+def read_metadata(path: str) -> Dict[str, str]:
+    """
+        Runs `extract_metadata` on a file, reading only as far as the title
+    """
+    with open(path) as file:
+        return extract_metadata(file)
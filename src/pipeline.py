@@ -0,0 +1,154 @@
+import asyncio
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional, List, Tuple, Dict, Callable, Awaitable, Any
+
+from main import PageSelection, copy_files, render_page, page_url, add_counts
+from cache import ParseCache
+from manifest import BuildManifest
+from writer import write_file
+from walker import PageFilter
+from site_index import SiteIndex
+from search import SearchIndex
+from images import ImageSizer
+from fingerprint import AssetManifest
+from shard import Shard
+
+def read_file(path: str) -> str:
+    with open(path) as file:
+        return file.read()
+
+async def run_stage(inbox: asyncio.Queue, outbox: Optional[asyncio.Queue], work: Callable[[Any], Awaitable[Any]], workers: int) -> None:
+    """
+        Runs `workers` tasks that take items off `inbox`, pass them to `work` and put whatever it returns on `outbox`.
+        A `None` on `inbox` ends the stage, once every task has finished a single `None` is put on `outbox` to end the next one.
+        Items `work` returns `None` for are dropped, which is how failed pages leave the pipeline.
+    """
+    async def worker() -> None:
+        while True:
+            item = await inbox.get()
+            if item is None:
+                await inbox.put(None)
+                return
+            result = await work(item)
+            if result is not None and outbox is not None:
+                await outbox.put(result)
+
+    await asyncio.gather(*(worker() for _ in range(workers)))
+    if outbox is not None:
+        await outbox.put(None)
+
+async def build_pages(selection: PageSelection, template_path: str, basepath: str, executor: Executor, render_jobs: int = 1, io_jobs: int = 8, cache: Optional[ParseCache] = None, block_cache_size: int = 0, queue_size: int = 64, site_index: Optional[SiteIndex] = None, search: Optional[SearchIndex] = None, images: Optional[ImageSizer] = None, assets: Optional[AssetManifest] = None, counts: Optional[Dict[str, int]] = None) -> List[Tuple[str, Exception]]:
+    """
+        Streams every page through the discover, read, render and write stages, connected by bounded queues so no stage runs far ahead of the next.
+        Reads and writes run on threads and rendering runs on `executor`, so waiting on the disk overlaps with rendering other pages.
+
+        Takes:
+        `selection: PageSelection` => the pages to build, walked on a thread that feeds pages in as they are found
+        `executor: Executor` => where pages are rendered
+        `render_jobs: int` => how many pages may be rendering at the same time
+        `io_jobs: int` => how many files may be read and written at the same time
+        `queue_size: int` => how many pages may wait between two stages
+        `site_index: SiteIndex` => when given, every page is added to it as it is rendered
+        `search: SearchIndex` => when given, every rendered page is added to it
+        `images: ImageSizer` => when given, images from the static folder get their size and `srcset`
+        `assets: AssetManifest` => when given, urls of static files point at their fingerprinted urls
+        `counts: { name: count }` => when given, the block cache hits and misses of every page are added up in it
+
+        Returns
+        `errors: List[Tuple[str, Exception]]` => the pages that failed along with their error, in discovery order
+    """
+    loop = asyncio.get_running_loop()
+    found: asyncio.Queue = asyncio.Queue(queue_size)
+    read: asyncio.Queue = asyncio.Queue(queue_size)
+    rendered: asyncio.Queue = asyncio.Queue(queue_size)
+    order: Dict[str, int] = {}
+    errors: List[Tuple[str, Exception]] = []
+
+    dest_path = selection.dest_path
+
+    def walk() -> None:
+        for page in selection:
+            order[page[0]] = len(order)
+            asyncio.run_coroutine_threadsafe(found.put(page), loop).result()
+
+    async def discover() -> None:
+        try:
+            await asyncio.to_thread(walk)
+        finally:
+            await found.put(None)
+
+    async def read_page(page: Tuple[str, str]) -> Optional[Tuple[str, str, str]]:
+        from_path, to_path = page
+        try:
+            return from_path, to_path, await asyncio.to_thread(read_file, from_path)
+        except Exception as error:
+            errors.append((from_path, error))
+            return None
+
+    async def render(item: Tuple[str, str, str]) -> Optional[Tuple[str, str, str]]:
+        from_path, to_path, markdown = item
+        print(f'Generating pades from {from_path} to {to_path} using {template_path}')
+        values = {'Path': page_url(to_path, dest_path, basepath)}
+        try:
+            html, result = await loop.run_in_executor(executor, render_page, markdown, template_path, basepath, values, cache, block_cache_size, site_index is not None, search is not None, images, assets)
+        except Exception as error:
+            errors.append((from_path, error))
+            return None
+        if counts is not None:
+            add_counts(counts, result)
+        if site_index is not None and result.links is not None:
+            site_index.add(page_url(to_path, dest_path, '/'), result.title, result.links)
+        if search is not None and result.terms is not None:
+            search.add(page_url(to_path, dest_path, '/'), result.title, result.terms)
+        return from_path, to_path, html
+
+    async def write(item: Tuple[str, str, str]) -> None:
+        from_path, to_path, html = item
+        try:
+            await asyncio.to_thread(write_file, to_path, [html])
+        except Exception as error:
+            errors.append((from_path, error))
+
+    await asyncio.gather(
+        discover(),
+        run_stage(found, read, read_page, io_jobs),
+        run_stage(read, rendered, render, render_jobs),
+        run_stage(rendered, None, write, io_jobs),
+    )
+    errors.sort(key=lambda error: order[error[0]])
+    return errors
+
+async def build(content_path: str, static_path: str, template_path: str, dest_path: str, basepath: str, manifest: Optional[BuildManifest] = None, jobs: int = 1, io_jobs: int = 8, copy_jobs: int = 8, link: bool = False, cache: Optional[ParseCache] = None, block_cache_size: int = 0, queue_size: int = 64, filters: PageFilter = PageFilter(), site_index: Optional[SiteIndex] = None, search: Optional[SearchIndex] = None, images: Optional[ImageSizer] = None, assets: Optional[AssetManifest] = None, shard: Optional[Shard] = None) -> None:
+    """
+        Builds the site like `copy_files` followed by `generate_page_recursive`, but copies the static files at the same time as the pages are generated
+
+        Takes:
+        `jobs: int` => how many worker processes to render with, 1 renders on a single thread of this process
+        `io_jobs: int` => how many pages may be read and written at the same time
+        `copy_jobs: int` => how many static files to copy at the same time
+        `link: bool` => hardlink static files instead of copying them where possible
+        `queue_size: int` => how many pages may wait between two stages
+        `filters: PageFilter` => globs and drafts to skip while walking
+        `site_index: SiteIndex` => when given, every page is added to it
+        `search: SearchIndex` => when given, every page is added to it
+        `images: ImageSizer` => when given, images from the static folder get their size and `srcset`
+        `assets: AssetManifest` => when given, urls of static files point at their fingerprinted urls
+        `shard: Shard` => when given, only the pages of this shard are built
+
+        Returns
+        `None`
+    """
+    executor: Executor = ProcessPoolExecutor(max_workers=jobs) if jobs > 1 else ThreadPoolExecutor(max_workers=1)
+    copies_static = shard is None or shard.copies_static
+    selection = PageSelection(content_path, dest_path, filters, manifest, search, shard)
+    counts: Dict[str, int] = {}
+    with executor:
+        _, errors = await asyncio.gather(
+            asyncio.to_thread(copy_files, static_path, dest_path, manifest, copy_jobs, link, assets) if copies_static else asyncio.sleep(0),
+            build_pages(
+                selection, template_path, basepath, executor,
+                render_jobs=jobs, io_jobs=io_jobs, cache=cache, block_cache_size=block_cache_size, queue_size=queue_size,
+                site_index=site_index, search=search, images=images, assets=assets, counts=counts,
+            ),
+        )
+    selection.report(errors, counts, block_cache_size)
@@ -0,0 +1,145 @@
+import os
+import json
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Dict, List, Iterator, Optional, ContextManager
+
+from htmlnode import HTMLNode
+
+STAGES = ['read', 'extract_title', 'block_parse', 'inline_parse', 'serialize', 'template', 'write']
+
+def count_nodes(node: HTMLNode) -> int:
+    """
+        Counts `node` and every node below it
+    """
+    count = 0
+    stack = [node]
+    while stack:
+        current = stack.pop()
+        count += 1
+        if current.children:
+            stack.extend(current.children)
+    return count
+
+class PageProfile():
+    """
+        Wall and cpu time spent on every stage of generating a single page
+
+        Args:
+            - `path : str` => The path of the md file
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.pid = os.getpid()
+        self.wall: Dict[str, float] = {}
+        self.cpu: Dict[str, float] = {}
+        self.events: List[Dict] = []
+        self.counters: Dict[str, int] = {}
+        self.nodes = 0
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """
+            Times everything run inside the `with` block as the stage `name`
+        """
+        wall_started = time.perf_counter()
+        cpu_started = time.process_time()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - wall_started
+            self.wall[name] = self.wall.get(name, 0) + wall
+            self.cpu[name] = self.cpu.get(name, 0) + time.process_time() - cpu_started
+            self.events.append({'name': name, 'start': wall_started, 'duration': wall})
+
+    def count(self, name: str, amount: int = 1) -> None:
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    @property
+    def total(self) -> float:
+        return sum(self.wall.values())
+
+def timed(page: Optional[PageProfile], name: str) -> ContextManager[None]:
+    """
+        Times the `with` block as the stage `name` of `page`, or does nothing when the page is not being profiled
+    """
+    return page.stage(name) if page is not None else nullcontext()
+
+class BuildProfile():
+    """
+        Collects the `PageProfile` of every page in a build and reports on them
+    """
+    def __init__(self):
+        self.pages: List[PageProfile] = []
+        self.counters: Dict[str, int] = {}
+
+    def add(self, page: PageProfile) -> None:
+        self.pages.append(page)
+        for name, amount in page.counters.items():
+            self.count(name, amount)
+
+    def count(self, name: str, amount: int = 1) -> None:
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def stage_totals(self) -> Dict[str, Dict[str, float]]:
+        totals = {stage: {'wall': 0.0, 'cpu': 0.0} for stage in STAGES}
+        for page in self.pages:
+            for stage, wall in page.wall.items():
+                totals.setdefault(stage, {'wall': 0.0, 'cpu': 0.0})
+                totals[stage]['wall'] += wall
+                totals[stage]['cpu'] += page.cpu[stage]
+        return totals
+
+    def slowest(self, top: int) -> List[PageProfile]:
+        return sorted(self.pages, key=lambda page: page.total, reverse=True)[:top]
+
+    def report(self, top: int = 10) -> str:
+        """
+            Formats the stage totals and the slowest `top` pages as a table
+
+            Returns
+            `report: str`
+        """
+        lines = [f'Profiled {len(self.pages)} pages, {sum(page.nodes for page in self.pages)} nodes']
+        lines.append(f'{"stage":15} {"wall ms":>10} {"cpu ms":>10}')
+        for stage, total in self.stage_totals().items():
+            lines.append(f'{stage:15} {total["wall"] * 1000:10.2f} {total["cpu"] * 1000:10.2f}')
+        lines.append(f'Slowest {min(top, len(self.pages))} pages:')
+        for page in self.slowest(top):
+            worst_stage = max(page.wall, key=lambda stage: page.wall[stage], default='nothing')
+            lines.append(f'{page.total * 1000:10.2f} ms  {page.path} (mostly {worst_stage}, {page.nodes} nodes)')
+        for name, value in sorted(self.counters.items()):
+            lines.append(f'{name}: {value}')
+        return '\n'.join(lines)
+
+    def write_json(self, path: str) -> None:
+        data = {
+            'stages': self.stage_totals(),
+            'counters': self.counters,
+            'pages': [
+                {'path': page.path, 'wall': page.wall, 'cpu': page.cpu, 'nodes': page.nodes}
+                for page in self.pages
+            ],
+        }
+        with open(path, 'w') as file:
+            json.dump(data, file, indent=1)
+
+    def write_chrome_trace(self, path: str) -> None:
+        """
+            Writes the stages of every page as a trace that can be opened in chrome://tracing or Perfetto, with one row per worker process
+        """
+        events = []
+        for page in self.pages:
+            for event in page.events:
+                events.append({
+                    'name': event['name'],
+                    'cat': 'build',
+                    'ph': 'X',
+                    'ts': event['start'] * 1_000_000,
+                    'dur': event['duration'] * 1_000_000,
+                    'pid': page.pid,
+                    'tid': page.pid,
+                    'args': {'page': page.path},
+                })
+        with open(path, 'w') as file:
+            json.dump({'traceEvents': events}, file)
@@ -0,0 +1,215 @@
+import os
+import re
+import json
+import time
+from typing import Dict, List, Tuple, Optional, Set
+
+from htmlnode import HTMLNode
+from writer import atomic_open
+
+SEARCH_DIR = 'search'
+SEARCH_STATE_NAME = '.search-index.json'
+SEARCH_VERSION = 1
+HEADING_WEIGHTS = {'h1': 8, 'h2': 4, 'h3': 2, 'h4': 2, 'h5': 2, 'h6': 2}
+MAX_TERMS_PER_PAGE = 2000
+MAX_TERM_LENGTH = 32
+
+token_pattern = re.compile(r'[^\W_]+')
+
+def page_terms(node: HTMLNode, max_terms: int = MAX_TERMS_PER_PAGE) -> Dict[str, int]:
+    """
+        Tokenizes the text of a rendered page, which is the text of the `TextNode`s the page was built from.
+        Every occurrence of a term adds the weight of the heading it is in, or 1 outside headings. Alt text of images counts too.
+
+        Takes:
+        `node: HTMLNode` => the page
+        `max_terms: int` => only the highest scoring terms are kept, so a huge page costs a bounded amount in the index
+
+        Returns
+        `terms: { term: score }`
+    """
+    terms: Dict[str, int] = {}
+    stack: List[Tuple[HTMLNode, int]] = [(node, 1)]
+    while stack:
+        current, weight = stack.pop()
+        weight = max(weight, HEADING_WEIGHTS.get(current.tag or '', 1))
+        if current.children:
+            stack.extend((child, weight) for child in current.children)
+            continue
+        text = current.value or ''
+        if current.tag == 'img' and current.props:
+            text = current.props.get('alt', '')
+        for token in token_pattern.findall(text.lower()):
+            if 1 < len(token) <= MAX_TERM_LENGTH:
+                terms[token] = terms.get(token, 0) + weight
+    if len(terms) > max_terms:
+        kept = sorted(terms.items(), key=lambda item: (-item[1], item[0]))[:max_terms]
+        terms = dict(kept)
+    return terms
+
+def shard_name(term: str) -> str:
+    """
+        The shard a term is stored in, named after its first character so the browser only loads the shard for what was typed
+    """
+    first = term[0]
+    if first.isascii() and first.isalnum():
+        return first
+    return f'u{ord(first):x}'
+
+def delta_encode(postings: List[Tuple[int, int]]) -> List[int]:
+    """
+        Flattens sorted `(doc, score)` pairs into `[doc, score, doc gap, score, ...]`, which keeps the numbers small
+    """
+    encoded: List[int] = []
+    previous = 0
+    for doc, score in postings:
+        encoded.append(doc - previous)
+        encoded.append(score)
+        previous = doc
+    return encoded
+
+def delta_decode(encoded: List[int]) -> List[Tuple[int, int]]:
+    postings = []
+    doc = 0
+    for index in range(0, len(encoded), 2):
+        doc += encoded[index]
+        postings.append((doc, encoded[index + 1]))
+    return postings
+
+class SearchIndex():
+    """
+        Inverted index of every page for searching in the browser, written as `search/docs.json` plus one shard per first character of the terms.
+        Each shard has its terms in a sorted array and a delta encoded posting list for every term.
+        The terms of every page are kept in a state file between builds, so an incremental build only tokenizes the pages that changed and only rewrites the shards that changed.
+        Pages keep their id between builds, the ids of removed pages are left empty until more than a quarter are.
+    """
+    def __init__(self):
+        self.pages: Dict[str, Tuple[str, Dict[str, int]]] = {}
+        self.ids: Dict[str, int] = {}
+        self.seen: Set[str] = set()
+        self.added = 0
+
+    @classmethod
+    def load(cls, path: str) -> "SearchIndex":
+        """
+            Loads the pages and ids of the last build, an unreadable or missing state is treated as empty
+        """
+        index = cls()
+        try:
+            with open(path) as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            return index
+        if data.get('version') != SEARCH_VERSION:
+            return index
+        index.pages = {url: (title, terms) for url, (title, terms) in data['pages'].items()}
+        index.ids = data['ids']
+        return index
+
+    def add(self, url: str, title: str, terms: Dict[str, int]) -> None:
+        self.pages[url] = (title, terms)
+        self.seen.add(url)
+        self.added += 1
+
+    def keep(self, url: str) -> None:
+        """
+            Marks a page that was not rebuilt as still being part of the site
+        """
+        self.seen.add(url)
+
+    def assign_ids(self) -> List[Optional[str]]:
+        """
+            Drops pages that were not seen, gives new pages the next free ids in url order and compacts the ids when too many are empty
+
+            Returns
+            `docs: List[url]` => the url of every id, `None` for empty ids
+        """
+        for url in list(self.pages):
+            if url not in self.seen:
+                del self.pages[url]
+        for url in list(self.ids):
+            if url not in self.pages:
+                del self.ids[url]
+        next_id = max(self.ids.values(), default=-1) + 1
+        if next_id > 4 and len(self.ids) < next_id * 3 / 4:
+            self.ids = {}
+            next_id = 0
+        for url in sorted(self.pages):
+            if url not in self.ids:
+                self.ids[url] = next_id
+                next_id += 1
+        docs: List[Optional[str]] = [None] * next_id
+        for url, doc in self.ids.items():
+            docs[doc] = url
+        return docs
+
+    def shards(self) -> Dict[str, Dict[str, list]]:
+        """
+            Builds the inverted index
+
+            Returns
+            `shards: { name: { 'terms': [term], 'postings': [[doc, score, doc gap, score, ...]] } }`
+        """
+        postings: Dict[str, List[Tuple[int, int]]] = {}
+        for url, (_, terms) in self.pages.items():
+            doc = self.ids[url]
+            for term, score in terms.items():
+                postings.setdefault(term, []).append((doc, score))
+        shards: Dict[str, Dict[str, list]] = {}
+        for term in sorted(postings):
+            shard = shards.setdefault(shard_name(term), {'terms': [], 'postings': []})
+            shard['terms'].append(term)
+            shard['postings'].append(delta_encode(sorted(postings[term])))
+        return shards
+
+    def write(self, dest_path: str, basepath: str) -> Dict[str, float]:
+        """
+            Writes the index into `<dest_path>/search`, leaving shards whose contents did not change alone, and saves the state next to the build manifest
+
+            Returns
+            `stats: { name: value }` => pages, terms, shards, files_written and seconds
+        """
+        started = time.perf_counter()
+        docs = self.assign_ids()
+        shards = self.shards()
+        directory = os.path.join(dest_path, SEARCH_DIR)
+        os.makedirs(directory, exist_ok=True)
+        files = {
+            f'{name}.json': json.dumps(shard, separators=(',', ':'))
+            for name, shard in shards.items()
+        }
+        files['docs.json'] = json.dumps({
+            'version': SEARCH_VERSION,
+            'docs': [[f'{basepath}{url[1:]}', self.pages[url][0]] if url is not None else None for url in docs],
+            'shards': sorted(shards),
+        }, separators=(',', ':'))
+        written = 0
+        for name, contents in files.items():
+            path = os.path.join(directory, name)
+            try:
+                with open(path) as file:
+                    if file.read() == contents:
+                        continue
+            except OSError:
+                pass
+            with atomic_open(path) as file:
+                file.write(contents)
+            written += 1
+        for name in os.listdir(directory):
+            if name.removesuffix('.gz') not in files:
+                os.remove(os.path.join(directory, name))
+
+        state = {
+            'version': SEARCH_VERSION,
+            'ids': self.ids,
+            'pages': {url: [title, terms] for url, (title, terms) in self.pages.items()},
+        }
+        with atomic_open(os.path.join(dest_path, SEARCH_STATE_NAME)) as file:
+            json.dump(state, file, separators=(',', ':'))
+        return {
+            'pages': len(self.pages),
+            'terms': sum(len(shard['terms']) for shard in shards.values()),
+            'shards': len(shards),
+            'files_written': written,
+            'seconds': time.perf_counter() - started,
+        }
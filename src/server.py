@@ -0,0 +1,418 @@
+import os
+import sys
+import time
+import struct
+import select
+import ctypes
+import ctypes.util
+import argparse
+import threading
+from shutil import rmtree
+from functools import partial
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+from typing import Optional, Dict, List, Set, Tuple
+
+from main import copy_files, discover_pages, render_content, page_url
+from template import Template
+from assets import place_file
+from writer import atomic_open
+from walker import PageFilter
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+EVENT_HEADER = struct.Struct('iIII')
+
+class QueueOverflow(OSError):
+    """
+        Raised by `InotifyWatcher.wait` when the kernel dropped events, so any file may have changed
+    """
+
+class PollingWatcher():
+    """
+        Watches folders and files for changes by comparing their size and mtime every `interval` seconds
+
+        Args:
+            - `directories : List[str]` => Folders to watch, including everything inside them
+            - `files : List[str]` => Single files to watch
+            - `interval : float` => How long to sleep between checks
+    """
+    def __init__(self, directories: List[str], files: List[str], interval: float = 0.05):
+        self.directories = directories
+        self.files = files
+        self.interval = interval
+        self.state = self.snapshot()
+
+    def snapshot(self) -> Dict[str, Tuple[int, int]]:
+        state = {}
+        stack = list(self.directories)
+        while stack:
+            directory = stack.pop()
+            try:
+                entries = list(os.scandir(directory))
+            except OSError:
+                continue
+            for entry in entries:
+                if entry.is_dir():
+                    stack.append(entry.path)
+                else:
+                    stat = entry.stat()
+                    state[os.path.normpath(entry.path)] = (stat.st_size, stat.st_mtime_ns)
+        for path in self.files:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            state[os.path.normpath(path)] = (stat.st_size, stat.st_mtime_ns)
+        return state
+
+    def wait(self) -> Set[str]:
+        """
+            Blocks until something changes
+
+            Returns
+            `changes: Set[str]` => the paths that were created, modified or deleted
+        """
+        while True:
+            time.sleep(self.interval)
+            state = self.snapshot()
+            changes = {path for path in state.keys() | self.state.keys() if state.get(path) != self.state.get(path)}
+            self.state = state
+            if changes:
+                return changes
+
+    def close(self) -> None:
+        pass
+
+class InotifyWatcher():
+    """
+        Watches folders and files for changes using the linux inotify api, so changes are picked up as soon as they are written
+
+        Args:
+            - `directories : List[str]` => Folders to watch, including everything inside them
+            - `files : List[str]` => Single files to watch, their parent folder is watched so editors that replace the file are still seen
+            - `settle : float` => How long to wait for more events after the first one so an editor's save is handled once
+    """
+    def __init__(self, directories: List[str], files: List[str], settle: float = 0.01):
+        self.libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self.fd = self.libc.inotify_init1(os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        self.settle = settle
+        self.watches: Dict[int, str] = {}
+        self.files = {os.path.normpath(path) for path in files}
+        self.tree_watches: Set[int] = set()
+        self.known: Set[str] = set()
+        for directory in directories:
+            self.add_tree(directory)
+        for path in self.files:
+            self.add_watch(os.path.dirname(path) or '.')
+
+    def add_watch(self, directory: str) -> int:
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(directory), WATCH_MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f'could not watch {directory}')
+        self.watches[wd] = directory
+        return wd
+
+    def add_tree(self, directory: str) -> List[str]:
+        """
+            Watches `directory` and every folder inside it
+
+            Returns
+            `files: List[str]` => the files that are already inside, used when a whole folder is moved in
+        """
+        files = []
+        stack = [directory]
+        while stack:
+            current = stack.pop()
+            self.tree_watches.add(self.add_watch(current))
+            for entry in os.scandir(current):
+                if entry.is_dir():
+                    stack.append(entry.path)
+                else:
+                    files.append(os.path.normpath(entry.path))
+        self.known.update(files)
+        return files
+
+    def remove_tree(self, directory: str) -> List[str]:
+        """
+            Forgets `directory` after it was deleted or moved away, dropping the watches inside it
+
+            Returns
+            `files: List[str]` => the files that were known to be inside, they are gone now
+        """
+        prefix = os.path.join(directory, '')
+        files = [path for path in self.known if path.startswith(prefix)]
+        self.known.difference_update(files)
+        for wd, path in list(self.watches.items()):
+            if path == directory or path.startswith(prefix):
+                self.libc.inotify_rm_watch(self.fd, wd)
+                self.watches.pop(wd)
+                self.tree_watches.discard(wd)
+        return files
+
+    def read_events(self) -> Set[str]:
+        changes = set()
+        data = os.read(self.fd, 1 << 16)
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b'\0'))
+            offset += length
+            if mask & IN_Q_OVERFLOW:
+                raise QueueOverflow('inotify queue overflowed')
+            if mask & IN_IGNORED:
+                self.watches.pop(wd, None)
+                continue
+            directory = self.watches.get(wd)
+            if directory is None or not name:
+                continue
+            path = os.path.normpath(os.path.join(directory, name))
+            if wd not in self.tree_watches and path not in self.files:
+                continue
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    changes.update(self.add_tree(path))
+                elif mask & (IN_DELETE | IN_MOVED_FROM):
+                    changes.update(self.remove_tree(path))
+                continue
+            if mask & IN_CREATE:
+                continue
+            if mask & (IN_DELETE | IN_MOVED_FROM):
+                self.known.discard(path)
+            else:
+                self.known.add(path)
+            changes.add(path)
+        return changes
+
+    def wait(self) -> Set[str]:
+        """
+            Blocks until something changes
+
+            Returns
+            `changes: Set[str]` => the paths that were created, modified or deleted
+        """
+        while True:
+            select.select([self.fd], [], [])
+            changes = self.read_events()
+            while select.select([self.fd], [], [], self.settle)[0]:
+                changes.update(self.read_events())
+            if changes:
+                return changes
+
+    def rescan(self) -> None:
+        """
+            Watches every folder again after events were dropped, folders created in the meantime were never watched
+        """
+        self.known.clear()
+        for wd in list(self.tree_watches):
+            directory = self.watches.get(wd)
+            if directory is not None and os.path.isdir(directory):
+                self.add_tree(directory)
+
+    def close(self) -> None:
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+def create_watcher(directories: List[str], files: List[str], poll: bool = False):
+    """
+        Picks inotify when it is available and falls back to polling
+
+        Takes:
+        `directories: List[str]` => folders to watch recursively
+        `files: List[str]` => single files to watch
+        `poll: bool` => always use polling
+
+        Returns
+        `InotifyWatcher | PollingWatcher`
+    """
+    if not poll and sys.platform.startswith('linux'):
+        try:
+            return InotifyWatcher(directories, files)
+        except (OSError, AttributeError):
+            pass
+    return PollingWatcher(directories, files)
+
+class DevServer():
+    """
+        Builds the site once and then keeps the parsed template and the list of pages in memory so single files can be rebuilt when they change
+
+        Args:
+            - `content_path : str` => The folder containing the md files
+            - `static_path : str` => The folder containing the static files
+            - `template_path : str` => The template file
+            - `dest_path : str` => The folder the site is built into
+            - `basepath : str` => The path the site is served under
+            - `filters : PageFilter` => Content files to leave out, eg drafts
+    """
+    def __init__(self, content_path: str, static_path: str, template_path: str, dest_path: str, basepath: str = '/', filters: PageFilter = PageFilter()):
+        self.content_path = os.path.normpath(content_path)
+        self.static_path = os.path.normpath(static_path)
+        self.template_path = os.path.normpath(template_path)
+        self.dest_path = os.path.normpath(dest_path)
+        self.basepath = basepath
+        self.filters = filters
+        self.template = Template('', basepath)
+        self.pages: Dict[str, str] = {}
+
+    def load_template(self) -> None:
+        with open(self.template_path) as file:
+            self.template = Template(file.read(), self.basepath)
+
+    def build(self) -> None:
+        """
+            Runs a full build and remembers every page it generated
+        """
+        if not os.path.exists(self.static_path):
+            raise Exception('static folder must exist')
+        if os.path.exists(self.dest_path):
+            rmtree(self.dest_path)
+        os.makedirs(self.dest_path)
+        copy_files(self.static_path, self.dest_path)
+        self.load_template()
+        self.pages = {}
+        for from_path, dest_path in discover_pages(self.content_path, self.dest_path, self.filters):
+            self.pages[os.path.normpath(from_path)] = os.path.normpath(dest_path)
+        for from_path, dest_path in self.pages.items():
+            self.render(from_path, dest_path)
+
+    def render(self, from_path: str, dest_path: str) -> None:
+        with open(from_path) as file:
+            markdown = file.read()
+        rendered = render_content(markdown, self.basepath)
+        values = {**rendered.metadata, 'Title': rendered.title, 'Content': rendered.content, 'Path': page_url(dest_path, self.dest_path, self.basepath)}
+        with atomic_open(dest_path) as file:
+            self.template.write_to(file, values)
+
+    def page_destination(self, from_path: str) -> str:
+        relative_path = os.path.relpath(from_path, self.content_path)
+        directory, file = os.path.split(relative_path)
+        name = file.split('.')[0]
+        return os.path.join(self.dest_path, directory, f'{name}.html')
+
+    def handle_change(self, path: str) -> List[str]:
+        """
+            Rebuilds whatever depends on `path`
+
+            Takes:
+            `path: str` => a file that was created, modified or deleted
+
+            Returns
+            `outputs: List[str]` => the outputs that were written or removed
+        """
+        path = os.path.normpath(path)
+        exists = os.path.isfile(path)
+
+        if path == self.template_path:
+            if not exists:
+                return []
+            self.load_template()
+            for from_path, dest_path in self.pages.items():
+                self.render(from_path, dest_path)
+            return list(self.pages.values())
+
+        if os.path.commonpath([self.content_path, path]) == self.content_path:
+            if not exists or not self.filters.allows(os.path.relpath(path, self.content_path)):
+                dest_path = self.pages.pop(path, None)
+                if dest_path is not None and os.path.exists(dest_path):
+                    os.remove(dest_path)
+                return [dest_path] if dest_path else []
+            dest_path = self.page_destination(path)
+            os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+            self.render(path, dest_path)
+            self.pages[path] = dest_path
+            return [dest_path]
+
+        if os.path.commonpath([self.static_path, path]) == self.static_path:
+            dest_path = os.path.join(self.dest_path, os.path.relpath(path, self.static_path))
+            if not exists:
+                if os.path.exists(dest_path):
+                    os.remove(dest_path)
+                return [dest_path]
+            os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+            place_file(path, dest_path)
+            return [dest_path]
+
+        return []
+
+    def watch(self, watcher) -> None:
+        """
+            Rebuilds changed files forever, printing how long each change took to show up
+        """
+        while True:
+            try:
+                changes = watcher.wait()
+            except QueueOverflow:
+                print('Missed some changes, rebuilding everything', file=sys.stderr)
+                watcher.rescan()
+                started = time.time()
+                try:
+                    self.build()
+                except Exception as error:
+                    print(f'Failed to rebuild: {error}', file=sys.stderr)
+                    continue
+                print(f'Rebuilt {len(self.pages)} pages in {(time.time() - started) * 1000:.1f} ms')
+                continue
+            started = time.time()
+            for path in sorted(changes):
+                try:
+                    outputs = self.handle_change(path)
+                except Exception as error:
+                    print(f'Failed to rebuild {path}: {error}', file=sys.stderr)
+                    continue
+                if not outputs:
+                    continue
+                finished = time.time()
+                message = f'Rebuilt {len(outputs)} file(s) for {path} in {(finished - started) * 1000:.1f} ms'
+                try:
+                    saved = os.stat(path).st_mtime
+                    message += f', {(finished - saved) * 1000:.1f} ms after save'
+                except OSError:
+                    pass
+                print(message)
+
+def parse_args(argv: Optional[list] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog='main.py serve', description='Builds the site and serves ./docs, optionally rebuilding files as they change')
+    parser.add_argument('--port', type=int, default=8888, help='the port to serve on')
+    parser.add_argument('--watch', action='store_true', help='rebuild pages and static files when they change')
+    parser.add_argument('--poll', action='store_true', help='poll for changes instead of using inotify')
+    parser.add_argument('--basepath', default='/', help='the path the site is served under')
+    parser.add_argument('--drafts', action=argparse.BooleanOptionalAction, default=True, help='build drafts, content files and folders named _* or *.draft.*, --no-drafts skips them')
+    return parser.parse_args(argv)
+
+def main(argv: Optional[list] = None):
+    args = parse_args(argv)
+    server = DevServer('./content', './static', './template.html', './docs', args.basepath, PageFilter(drafts=args.drafts))
+    started = time.time()
+    server.build()
+    print(f'Built {len(server.pages)} pages in {(time.time() - started) * 1000:.1f} ms')
+
+    handler = partial(SimpleHTTPRequestHandler, directory=server.dest_path)
+    httpd = ThreadingHTTPServer(('', args.port), handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    print(f'Serving {server.dest_path} on http://localhost:{args.port}/')
+
+    watcher = None
+    try:
+        if args.watch:
+            watcher = create_watcher([server.content_path, server.static_path], [server.template_path], args.poll)
+            print(f'Watching for changes using {type(watcher).__name__}')
+            server.watch(watcher)
+        else:
+            thread.join()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.shutdown()
+        if watcher is not None:
+            watcher.close()
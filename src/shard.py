@@ -0,0 +1,218 @@
+import os
+import sys
+import json
+import glob
+import shutil
+import hashlib
+import argparse
+from typing import Any, Optional, Dict, List, Tuple, Iterable, Iterator, NamedTuple
+
+from assets import place_files
+from walker import walk_files
+from writer import atomic_open, prepare_staging, swap_into_place
+
+SHARD_MANIFEST_NAME = '.shard-manifest.json'
+SHARD_MANIFEST_VERSION = 1
+
+class Shard(NamedTuple):
+    """
+        One of `count` machines building part of the site, `index` counts from 1.
+        Pages are split by a hash of their path below the content folder, so every machine picks the same split without talking to the others.
+        Static files are copied by shard 1 only.
+    """
+    index: int
+    count: int
+    weighted: bool = False
+
+    @property
+    def copies_static(self) -> bool:
+        return self.index == 1
+
+    @property
+    def output_path(self) -> str:
+        return f'./docs.shard-{self.index}'
+
+    def select(self, pages: Iterable[Tuple[str, str]], content_path: str) -> Iterator[Tuple[str, str]]:
+        """
+            Keeps the pages that belong to this shard, in the order they were given
+
+            Takes:
+            `pages: Iterable[Tuple[str, str]]` => pairs of source md path and destination html path, eg from `iter_pages`
+            `content_path: str` => the content folder, paths are hashed relative to it so the split does not depend on where the site is checked out
+
+            Returns
+            `Iterator[Tuple[str, str]]` => the pages of this shard. Without weighting they are yielded as they come in, with weighting every page has to be seen first
+        """
+        if not self.weighted:
+            for page in pages:
+                if stable_hash(relative_key(page[0], content_path)) % self.count == self.index - 1:
+                    yield page
+            return
+        pages = list(pages)
+        owners = balance([(relative_key(page[0], content_path), os.path.getsize(page[0])) for page in pages], self.count)
+        for page in pages:
+            if owners[relative_key(page[0], content_path)] == self.index - 1:
+                yield page
+
+def parse_shard(value: str) -> Shard:
+    """
+        Parses `K/N` as passed to `--shard`
+    """
+    index, separator, count = value.partition('/')
+    try:
+        shard = Shard(int(index), int(count))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'{value} is not K/N, eg 1/4')
+    if not separator or shard.count < 1 or not 1 <= shard.index <= shard.count:
+        raise argparse.ArgumentTypeError(f'{value} is not K/N with 1 <= K <= N')
+    return shard
+
+def relative_key(path: str, root: str) -> str:
+    return os.path.relpath(path, root).replace(os.sep, '/')
+
+def stable_hash(key: str) -> int:
+    """
+        Hashes a path the same way on every machine and every run, unlike `hash` which is salted per process
+    """
+    return int.from_bytes(hashlib.sha256(key.encode()).digest()[:8], 'big')
+
+def balance(weights: List[Tuple[str, int]], count: int) -> Dict[str, int]:
+    """
+        Splits weighted keys over `count` shards by giving the heaviest remaining key to the lightest shard.
+        Ties are broken by the stable hash of the key and by shard number, so every machine gets the same answer from the same files.
+
+        Takes:
+        `weights: List[Tuple[key, weight]]`
+        `count: int` => how many shards there are
+
+        Returns
+        `owners: { key: shard }` => shards count from 0
+    """
+    totals = [0] * count
+    owners: Dict[str, int] = {}
+    for key, weight in sorted(weights, key=lambda item: (-item[1], stable_hash(item[0]), item[0])):
+        shard = min(range(count), key=lambda index: (totals[index], index))
+        owners[key] = shard
+        totals[shard] += max(weight, 1)
+    return owners
+
+def write_shard_manifest(output_path: str, shard: Shard, settings: Optional[Dict[str, Any]] = None) -> int:
+    """
+        Lists every file a shard wrote, so `merge_shards` can check that no two shards wrote the same path
+
+        Takes:
+        `output_path: str` => the folder the shard was built into
+        `settings: { name: value }` => what every shard of a build has to agree on, every option that changes the output, eg the basepath
+
+        Returns
+        `count: int` => how many files the shard wrote
+    """
+    prefix = len(os.path.join(output_path, ''))
+    files = {
+        entry.path[prefix:].replace(os.sep, '/'): entry.stat().st_size
+        for entry in walk_files(output_path)
+        if entry.name != SHARD_MANIFEST_NAME
+    }
+    with atomic_open(os.path.join(output_path, SHARD_MANIFEST_NAME)) as file:
+        json.dump({
+            'version': SHARD_MANIFEST_VERSION,
+            'shard': [shard.index, shard.count],
+            'settings': settings or {},
+            'files': files,
+        }, file, indent=1, sort_keys=True)
+    return len(files)
+
+def load_shard_manifest(shard_path: str) -> Dict:
+    with open(os.path.join(shard_path, SHARD_MANIFEST_NAME)) as file:
+        data = json.load(file)
+    if data.get('version') != SHARD_MANIFEST_VERSION:
+        raise Exception(f'{shard_path} was built by a different version of the shard manifest')
+    return data
+
+def find_collisions(manifests: Dict[str, Dict]) -> List[Tuple[str, List[str]]]:
+    """
+        Lists the files written by more than one shard
+
+        Takes:
+        `manifests: { shard_path: manifest }`
+
+        Returns
+        `collisions: List[Tuple[file, List[shard_path]]]`, sorted by file
+    """
+    owners: Dict[str, List[str]] = {}
+    for shard_path, manifest in manifests.items():
+        for name in manifest['files']:
+            owners.setdefault(name, []).append(shard_path)
+    return sorted((name, paths) for name, paths in owners.items() if len(paths) > 1)
+
+def merge_shards(shard_paths: List[str], dest_path: str = './docs', jobs: int = 8, link: bool = False) -> int:
+    """
+        Combines the outputs of every shard of a build into `dest_path`.
+        The merge is built in a staging folder and swapped into place, so `dest_path` is left alone when anything is wrong.
+
+        Takes:
+        `shard_paths: List[str]` => the output folder of every shard
+        `dest_path: str` => the folder the site goes into
+        `jobs: int` => how many files to copy at the same time
+        `link: bool` => hardlink files from the shards instead of copying them
+
+        Returns
+        `count: int` => how many files were merged
+    """
+    manifests = {shard_path: load_shard_manifest(shard_path) for shard_path in shard_paths}
+    counts = {manifest['shard'][1] for manifest in manifests.values()}
+    if len(counts) != 1:
+        splits = ', '.join(f'{index}/{count}' for index, count in (manifest['shard'] for manifest in manifests.values()))
+        raise Exception(f'the shards were split different ways: {splits}')
+    count = counts.pop()
+    indexes = sorted(manifest['shard'][0] for manifest in manifests.values())
+    if indexes != list(range(1, count + 1)):
+        missing = sorted(set(range(1, count + 1)) - set(indexes))
+        duplicated = sorted({index for index in indexes if indexes.count(index) > 1})
+        raise Exception(f'expected shards 1 to {count}, missing {missing or "none"}, duplicated {duplicated or "none"}')
+    if len({json.dumps(manifest['settings'], sort_keys=True) for manifest in manifests.values()}) != 1:
+        names = {name for manifest in manifests.values() for name in manifest['settings']}
+        differing = sorted(name for name in names if len({json.dumps(manifest['settings'].get(name)) for manifest in manifests.values()}) != 1)
+        raise Exception(f'the shards were built with different settings: {", ".join(differing)}')
+    collisions = find_collisions(manifests)
+    if collisions:
+        for name, paths in collisions:
+            print(f'Collision: {name} was written by {", ".join(paths)}', file=sys.stderr)
+        raise Exception(f'{len(collisions)} files were written by more than one shard')
+
+    staging_path = prepare_staging(dest_path)
+    try:
+        files = []
+        made = set()
+        for shard_path, manifest in manifests.items():
+            for name in manifest['files']:
+                to_path = os.path.join(staging_path, *name.split('/'))
+                directory = os.path.dirname(to_path)
+                if directory not in made:
+                    os.makedirs(directory, exist_ok=True)
+                    made.add(directory)
+                files.append((os.path.join(shard_path, *name.split('/')), to_path))
+        place_files(files, jobs, link)
+    except BaseException:
+        shutil.rmtree(staging_path)
+        raise
+    swap_into_place(staging_path, dest_path)
+    return len(files)
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(prog='main.py merge', description='Merges the outputs of a build split with --shard into ./docs')
+    parser.add_argument('shards', nargs='*', help='the output folder of every shard, defaults to ./docs.shard-*')
+    parser.add_argument('--link', action='store_true', help='hardlink files from the shards instead of copying them')
+    parser.add_argument('--jobs', type=int, default=8, help='how many files to copy at the same time')
+    args = parser.parse_args(argv)
+    shard_paths = args.shards or sorted(glob.glob('./docs.shard-*'))
+    if not shard_paths:
+        print('No shard outputs to merge', file=sys.stderr)
+        return 1
+    try:
+        count = merge_shards(shard_paths, './docs', args.jobs, args.link)
+    except Exception as error:
+        print(f'Failed to merge: {error}', file=sys.stderr)
+        return 1
+    print(f'Merged {count} files from {len(shard_paths)} shards into ./docs')
+    return 0
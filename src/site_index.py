@@ -0,0 +1,187 @@
+import os
+import posixpath
+from urllib.parse import urlsplit
+from xml.sax.saxutils import escape
+from typing import Dict, List, Tuple, NamedTuple, Optional, Iterable
+
+from htmlnode import HTMLNode, LeafNode, ParentNode
+from template import Template
+from writer import atomic_open
+
+SITEMAP_NAME = 'sitemap.xml'
+
+class PageLinks(NamedTuple):
+    links: Tuple[str, ...]
+    images: Tuple[str, ...]
+
+class PageRecord(NamedTuple):
+    url: str
+    title: str
+    links: Tuple[str, ...]
+    images: Tuple[str, ...]
+
+def collect_links(node: HTMLNode) -> PageLinks:
+    """
+        Walks a rendered page and collects the targets of its links and images, in document order.
+        The urls are the ones written in the markdown, before they are pointed at the basepath.
+
+        Returns
+        `PageLinks`
+    """
+    links: List[str] = []
+    images: List[str] = []
+    stack = [node]
+    while stack:
+        current = stack.pop()
+        if current.tag == 'a' and current.props and 'href' in current.props:
+            links.append(current.props['href'])
+        elif current.tag == 'img' and current.props and 'src' in current.props:
+            images.append(current.props['src'])
+        if current.children:
+            stack.extend(reversed(current.children))
+    return PageLinks(tuple(links), tuple(images))
+
+def resolve_link(page_url: str, link: str) -> Optional[str]:
+    """
+        Works out which path on the site a link from `page_url` points at
+
+        Returns
+        `path: str` or `None` for external links, `mailto:` and the like, and links within the page
+    """
+    parts = urlsplit(link)
+    if parts.scheme or parts.netloc or not parts.path:
+        return None
+    base = page_url if page_url.endswith('/') else posixpath.dirname(page_url)
+    path = posixpath.normpath(posixpath.join(base, parts.path))
+    if parts.path.endswith('/') and path != '/':
+        path += '/'
+    return path
+
+def section_of(url: str) -> Optional[str]:
+    parts = url.strip('/').split('/')
+    if len(parts) < 2:
+        return None
+    return parts[0]
+
+class SiteIndex():
+    """
+        Every page of the site with its title and the links and images on it, collected while the pages are rendered.
+        Urls are relative to the root of the site, eg `/blog/tom/`, so the index does not depend on the basepath.
+    """
+    def __init__(self):
+        self.pages: Dict[str, PageRecord] = {}
+        self.files: set = set()
+
+    def add(self, url: str, title: str, links: PageLinks) -> None:
+        self.pages[url] = PageRecord(url, title, links.links, links.images)
+
+    def add_file(self, url: str) -> None:
+        self.files.add(url)
+
+    def exists(self, path: str) -> bool:
+        if path in self.pages or path in self.files:
+            return True
+        if path.endswith('/index.html'):
+            return path[:-len('index.html')] in self.pages
+        return not path.endswith('/') and f'{path}/' in self.pages
+
+    def broken_links(self) -> List[Tuple[str, str]]:
+        """
+            Lists the links and images that point at a path on the site that no page or static file is at
+
+            Returns
+            `broken: List[Tuple[page_url, link]]`, sorted by page
+        """
+        broken = []
+        for url in sorted(self.pages):
+            page = self.pages[url]
+            for link in page.links + page.images:
+                path = resolve_link(url, link)
+                if path is not None and not self.exists(path):
+                    broken.append((url, link))
+        return broken
+
+    def sections(self) -> Dict[str, List[PageRecord]]:
+        """
+            Groups the pages by the top level folder they are in, pages at the root are not in a section
+
+            Returns
+            `sections: { section: [PageRecord] }` with the pages sorted by url
+        """
+        sections: Dict[str, List[PageRecord]] = {}
+        for url in sorted(self.pages):
+            section = section_of(url)
+            if section is not None and url != f'/{section}/':
+                sections.setdefault(section, []).append(self.pages[url])
+        return sections
+
+    def sitemap(self, site_url: str, basepath: str) -> str:
+        """
+            Makes a sitemap.xml of every page
+
+            Takes:
+            `site_url: str` => the scheme and host the site is served from, eg `https://example.com`, sitemaps need absolute locations
+            `basepath: str` => the path the site is served under
+
+            Returns
+            `xml: str`
+        """
+        lines = ['<?xml version="1.0" encoding="UTF-8"?>', '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">']
+        for url in sorted(self.pages):
+            lines.append(f'<url><loc>{escape(site_url.rstrip("/") + basepath + url[1:])}</loc></url>')
+        lines.append('</urlset>')
+        return '\n'.join(lines) + '\n'
+
+    def write_listings(self, template: Template, dest_path: str) -> List[str]:
+        """
+            Writes a page listing every page of a section to `<section>/index.html`, for every section that does not have its own index page.
+            The listings are added to the index.
+
+            Returns
+            `written: List[str]` => the urls of the listings
+        """
+        written = []
+        for section, pages in self.sections().items():
+            url = f'/{section}/'
+            if url in self.pages:
+                continue
+            items: List[HTMLNode] = [ParentNode('li', [LeafNode('a', page.title, {'href': page.url})]) for page in pages]
+            content = ParentNode('div', [LeafNode('h1', section.capitalize()), ParentNode('ul', items)])
+            with atomic_open(os.path.join(dest_path, section, 'index.html')) as file:
+                template.write_to(file, {'Title': section.capitalize(), 'Content': content, 'Path': f'{template.basepath}{section}/'})
+            self.add(url, section.capitalize(), collect_links(content))
+            written.append(url)
+        return written
+
+    def write(self, dest_path: str, template: Template, site_url: str = '', report_path: Optional[str] = None) -> List[Tuple[str, str]]:
+        """
+            Writes the section listings and sitemap.xml into `dest_path`, and the broken link report to `report_path` when given.
+            Sitemaps need absolute urls, so without `site_url` no sitemap.xml is written and an old one is removed
+
+            Returns
+            `broken: List[Tuple[page_url, link]]`
+        """
+        self.write_listings(template, dest_path)
+        sitemap_path = os.path.join(dest_path, SITEMAP_NAME)
+        if site_url:
+            with atomic_open(sitemap_path) as file:
+                file.write(self.sitemap(site_url, template.basepath))
+        elif os.path.exists(sitemap_path):
+            os.remove(sitemap_path)
+        broken = self.broken_links()
+        if report_path is not None:
+            with atomic_open(report_path) as file:
+                file.writelines(f'{url} -> {link}\n' for url, link in broken)
+        return broken
+
+def index_files(site_index: SiteIndex, paths: Iterable[str], root: str) -> None:
+    """
+        Adds files copied into the site to the index so links to them are not reported as broken
+
+        Takes:
+        `paths: Iterable[str]` => the paths of the files in the source folder
+        `root: str` => the source folder, eg ./static
+    """
+    prefix = len(os.path.join(root, ''))
+    for path in paths:
+        site_index.add_file('/' + path[prefix:].replace(os.sep, '/'))
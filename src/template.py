@@ -0,0 +1,127 @@
+import os
+import re
+from typing import Optional, Dict, List, Tuple, Callable, TextIO, Union
+
+from htmlnode import HTMLNode
+from fingerprint import AssetManifest
+
+slot_pattern = re.compile(r"\{\{\s*(\w+)\s*\}\}")
+url_attribute_pattern = re.compile(r'\b(href|src)="(/[^"]*)"')
+
+_template_cache: Dict[Tuple[str, str, str], Tuple[int, int, "Template"]] = {}
+
+def basepath_rewriter(basepath: str, assets: Optional[AssetManifest] = None) -> Callable[[str], str]:
+    """
+        Makes the function used to point root relative urls in the rendered content at the basepath
+
+        Takes:
+        `basepath: str` => the path the site is served under
+        `assets: AssetManifest` => when given, urls of static files are also swapped for their fingerprinted urls
+
+        Returns
+        `rewrite_url: (url) => url`
+    """
+    if assets is not None:
+        def rewrite_asset_url(url: str) -> str:
+            if url.startswith('/'):
+                return f'{basepath}{assets.url(url)[1:]}'
+            return url
+        return rewrite_asset_url
+
+    def rewrite_url(url: str) -> str:
+        if url.startswith('/'):
+            return f'{basepath}{url[1:]}'
+        return url
+    return rewrite_url
+
+class Template():
+    """
+        A template parsed once into literal text and `{{ Name }}` slots.
+        Root relative `href` and `src` attributes in the literal text are pointed at the basepath, and at fingerprinted assets, when the template is parsed, so rendering a page is a single pass over the segments.
+
+        Args:
+            - `source : str` => The contents of the template file
+            - `basepath : str` => The path the site is served under
+            - `assets : AssetManifest` => The fingerprinted urls of the static files, if they are fingerprinted
+    """
+    def __init__(self, source: str, basepath: str = '/', assets: Optional[AssetManifest] = None):
+        self.basepath = basepath
+        self.assets = assets
+        rewrite_url = basepath_rewriter(basepath, assets)
+        parts = slot_pattern.split(source)
+        self.literals: List[str] = [
+            url_attribute_pattern.sub(lambda match: f'{match[1]}="{rewrite_url(match[2])}"', part)
+            for part in parts[::2]
+        ]
+        self.slots: List[str] = parts[1::2]
+
+    def write_to(self, out: TextIO, values: Dict[str, Union[str, HTMLNode]], rewrite_url: Optional[Callable[[str], str]]=None) -> None:
+        """
+            Writes the filled in template to `out`. `HTMLNode` values are streamed, missing values are left empty
+
+            Takes:
+            `out: TextIO` => the file to write to
+            `values: { slot: value }` => the value of every slot, eg `Title` and `Content`
+            `rewrite_url: (url) => url` => applied to urls inside `HTMLNode` values
+
+            Returns
+            `None`
+        """
+        if rewrite_url is None:
+            rewrite_url = basepath_rewriter(self.basepath, self.assets)
+        write = out.write
+        for literal, slot in zip(self.literals, self.slots):
+            write(literal)
+            value = values.get(slot, '')
+            if isinstance(value, HTMLNode):
+                value.write_to(out, rewrite_url)
+            else:
+                write(value)
+        write(self.literals[-1])
+
+    def render(self, values: Dict[str, Union[str, HTMLNode]], rewrite_url: Optional[Callable[[str], str]]=None) -> str:
+        """
+            Fills in the template and returns it as a string
+
+            Takes:
+            `values: { slot: value }` => the value of every slot, eg `Title` and `Content`
+
+            Returns
+            `html: str`
+        """
+        chunks = []
+        self.write_to(ChunkList(chunks), values, rewrite_url)
+        return ''.join(chunks)
+
+class ChunkList():
+    """
+        Minimal file like object that collects everything written to it in a list
+    """
+    def __init__(self, chunks: List[str]):
+        self.chunks = chunks
+        self.write = chunks.append
+
+    def writelines(self, lines) -> None:
+        self.chunks.extend(lines)
+
+def load_template(template_path: str, basepath: str, assets: Optional[AssetManifest] = None) -> Template:
+    """
+        Parses a template file, reusing the parsed template until the file changes
+
+        Takes:
+        `template_path: str` => the path of the template file
+        `basepath: str` => the path the site is served under
+        `assets: AssetManifest` => the fingerprinted urls of the static files, if they are fingerprinted
+
+        Returns
+        `Template`
+    """
+    stat = os.stat(template_path)
+    key = (template_path, basepath, assets.version if assets is not None else '')
+    cached = _template_cache.get(key)
+    if cached is not None and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+        return cached[2]
+    with open(template_path) as file:
+        template = Template(file.read(), basepath, assets)
+    _template_cache[key] = (stat.st_mtime_ns, stat.st_size, template)
+    return template
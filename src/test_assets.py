@@ -0,0 +1,82 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from assets import is_up_to_date, place_file, place_files, copy_range
+from main import copy_files
+
+class TestAssets(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = self.temp_dir.name
+        self.static = os.path.join(self.root, 'static')
+        self.docs = os.path.join(self.root, 'docs')
+        os.makedirs(os.path.join(self.static, 'images'))
+        os.mkdir(self.docs)
+        self.write(os.path.join(self.static, 'index.css'), 'body {}')
+        self.write(os.path.join(self.static, 'images', 'a.png'), 'png' * 1000)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def write(self, path, text):
+        with open(path, 'w') as file:
+            file.write(text)
+
+    def read(self, path):
+        with open(path) as file:
+            return file.read()
+
+    def test_place_file(self):
+        source = os.path.join(self.static, 'index.css')
+        dest = os.path.join(self.docs, 'index.css')
+        self.assertFalse(is_up_to_date(source, dest))
+        method = place_file(source, dest)
+        self.assertIn(method, ('reflink', 'copy_file_range', 'copy'))
+        self.assertEqual(self.read(dest), 'body {}')
+        self.assertTrue(is_up_to_date(source, dest))
+        self.assertNotEqual(os.stat(source).st_ino, os.stat(dest).st_ino)
+        self.assertEqual(os.listdir(self.docs), ['index.css'])
+
+    @unittest.skipUnless(hasattr(os, 'copy_file_range'), 'copy_file_range is not available')
+    def test_short_copy_range_fails(self):
+        source = os.path.join(self.static, 'images', 'a.png')
+        dest = os.path.join(self.docs, 'a.png')
+        with open(source, 'rb') as source_file, open(dest, 'wb') as dest_file:
+            with mock.patch('os.copy_file_range', return_value=0):
+                with self.assertRaises(OSError):
+                    copy_range(source_file, dest_file)
+
+    def test_place_file_link(self):
+        source = os.path.join(self.static, 'index.css')
+        dest = os.path.join(self.docs, 'index.css')
+        self.write(dest, 'old')
+        self.assertEqual(place_file(source, dest, link=True), 'link')
+        self.assertEqual(os.stat(source).st_ino, os.stat(dest).st_ino)
+
+    def test_place_files(self):
+        files = [
+            (os.path.join(self.static, 'index.css'), os.path.join(self.docs, 'index.css')),
+            (os.path.join(self.static, 'images', 'a.png'), os.path.join(self.docs, 'a.png')),
+        ]
+        methods = place_files(files, jobs=2)
+        self.assertEqual(sum(methods.values()), 2)
+        self.assertEqual(self.read(os.path.join(self.docs, 'a.png')), 'png' * 1000)
+
+    def test_copy_files_skips_unchanged(self):
+        copy_files(self.static, self.docs)
+        dest = os.path.join(self.docs, 'images', 'a.png')
+        self.assertEqual(self.read(dest), 'png' * 1000)
+        inode = os.stat(dest).st_ino
+
+        copy_files(self.static, self.docs)
+        self.assertEqual(os.stat(dest).st_ino, inode)
+
+        self.write(os.path.join(self.static, 'images', 'a.png'), 'new png')
+        copy_files(self.static, self.docs)
+        self.assertNotEqual(os.stat(dest).st_ino, inode)
+        self.assertEqual(self.read(dest), 'new png')
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,45 @@
+import os
+import time
+import tempfile
+import unittest
+
+from cache import ParseCache, CachedPage, parser_version
+
+class TestParseCache(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cache = ParseCache(self.temp_dir.name, parser_version())
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_get_and_put(self):
+        key = self.cache.key('# Title', '/')
+        self.assertIsNone(self.cache.get(key))
+        self.cache.put(key, 'Title', '<div><h1>Title</h1></div>')
+        self.assertEqual(self.cache.get(key), CachedPage('Title', '<div><h1>Title</h1></div>'))
+
+    def test_key(self):
+        key = self.cache.key('# Title', '/')
+        self.assertEqual(key, self.cache.key('# Title', '/'))
+        self.assertNotEqual(key, self.cache.key('# Title', '/base/'))
+        self.assertNotEqual(key, self.cache.key('# Other title', '/'))
+        self.assertNotEqual(key, ParseCache(self.temp_dir.name, 'other version').key('# Title', '/'))
+        self.assertNotEqual(parser_version(), parser_version('def extract_title(): pass'))
+
+    def test_evict_least_recently_used(self):
+        keys = [self.cache.key(f'# Page {i}', '/') for i in range(3)]
+        for i, key in enumerate(keys):
+            self.cache.put(key, f'Page {i}', 'x' * 100)
+            os.utime(self.cache.path(key), ns=(i, i))
+        self.cache.get(keys[0])
+
+        entry_size = os.path.getsize(self.cache.path(keys[0]))
+        self.cache.max_bytes = entry_size * 2
+        self.assertEqual(self.cache.evict(), [keys[1]])
+        self.assertIsNotNone(self.cache.get(keys[0]))
+        self.assertIsNone(self.cache.get(keys[1]))
+        self.assertIsNotNone(self.cache.get(keys[2]))
+
+if __name__ == "__main__":
+    unittest.main()
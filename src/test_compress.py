@@ -0,0 +1,53 @@
+import os
+import gzip
+import tempfile
+import unittest
+
+from compress import minify_html, minify_css, compress_file, compress_site
+
+class TestCompress(unittest.TestCase):
+    def test_minify_html(self):
+        html = '<html>\n  <head>\n    <!-- note -->\n    <title> Hi </title>\n  </head>\n<body><p>a\n   b</p><pre><code>x\n    y</code></pre>\n<PRE>  keep  </PRE></body>\n</html>\n'
+        self.assertEqual(
+            minify_html(html),
+            '<html> <head> <title> Hi </title> </head> <body><p>a b</p><pre><code>x\n    y</code></pre> <PRE>  keep  </PRE></body> </html>',
+        )
+        self.assertEqual(minify_html('<p>a</p>'), '<p>a</p>')
+
+    def test_minify_css(self):
+        css = '/* header */\nbody {\n  margin: 0 auto;\n  width: calc(100% - 2rem);\n}\n\na > b, q::before {\n  content: "a  ;  b";\n}\n'
+        self.assertEqual(minify_css(css), 'body{margin:0 auto;width:calc(100% - 2rem)}a>b,q::before{content:"a  ;  b"}')
+
+    def test_compress_file_skips_unchanged(self):
+        with tempfile.TemporaryDirectory() as root:
+            path = os.path.join(root, 'index.html')
+            with open(path, 'w') as file:
+                file.write('<p>\n  hello\n</p>\n')
+            self.assertEqual(compress_file(path), (True, True))
+            with open(path) as file:
+                self.assertEqual(file.read(), '<p> hello </p>')
+            with gzip.open(f'{path}.gz', 'rt') as file:
+                self.assertEqual(file.read(), '<p> hello </p>')
+            self.assertEqual(compress_file(path), (False, False))
+
+            os.utime(path, ns=(0, 1))
+            self.assertEqual(compress_file(path), (False, False))
+            self.assertEqual(os.stat(f'{path}.gz').st_mtime_ns, 1)
+
+    def test_compress_site(self):
+        with tempfile.TemporaryDirectory() as root:
+            os.makedirs(os.path.join(root, 'blog'))
+            for name in ('index.html', 'blog/index.html', 'index.css', 'image.png', '.build-manifest.json'):
+                with open(os.path.join(root, *name.split('/')), 'w') as file:
+                    file.write('a  {  }')
+            counts = compress_site(root, minify=True, sidecar=True, jobs=2)
+            self.assertEqual(counts, {'files': 3, 'minified': 3, 'compressed': 3, 'removed': 0})
+            self.assertEqual(sorted(name for name in os.listdir(root) if name.endswith('.gz')), ['index.css.gz', 'index.html.gz'])
+            self.assertEqual(compress_site(root, jobs=2), {'files': 3, 'minified': 0, 'compressed': 0, 'removed': 0})
+
+            os.remove(os.path.join(root, 'blog', 'index.html'))
+            self.assertEqual(compress_site(root, jobs=2), {'files': 2, 'minified': 0, 'compressed': 0, 'removed': 1})
+            self.assertEqual(os.listdir(os.path.join(root, 'blog')), [])
+
+if __name__ == '__main__':
+    unittest.main()
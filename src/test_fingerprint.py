@@ -0,0 +1,81 @@
+import os
+import tempfile
+import unittest
+
+from fingerprint import AssetManifest, fingerprinted_url, ASSET_MANIFEST_NAME
+from template import Template
+from main import copy_files, render_content
+from manifest import BuildManifest
+
+class TestFingerprint(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.root = self.directory.name
+        self.static = os.path.join(self.root, 'static')
+        os.makedirs(os.path.join(self.static, 'images'))
+        os.makedirs(os.path.join(self.static, '.well-known'))
+        for name, contents in (('index.css', 'body {}'), ('images/tom.png', 'png'), ('robots.txt', 'User-agent: *'), ('.well-known/security.txt', 'Contact: me')):
+            with open(os.path.join(self.static, *name.split('/')), 'w') as file:
+                file.write(contents)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_fingerprinted_url(self):
+        self.assertEqual(fingerprinted_url('/index.css', 'abcdef0123456789'), '/index.abcdef01.css')
+        self.assertEqual(fingerprinted_url('/js/app.min.js', 'abcdef0123456789'), '/js/app.abcdef01.min.js')
+        self.assertEqual(fingerprinted_url('/LICENSE', 'abcdef0123456789'), '/LICENSE.abcdef01')
+
+    def test_scan_and_lookup(self):
+        assets = AssetManifest.scan(self.static)
+        self.assertEqual(sorted(assets.assets), ['/images/tom.png', '/index.css'])
+        css = assets.url('/index.css')
+        self.assertRegex(css, r'^/index\.[0-9a-f]{8}\.css$')
+        self.assertEqual(assets.url('/index.css?v=1#top'), f'{css}?v=1#top')
+        self.assertEqual(assets.url('/index.css#a?b'), f'{css}#a?b')
+        self.assertEqual(assets.url('/robots.txt'), '/robots.txt')
+        self.assertEqual(assets.url('/blog/'), '/blog/')
+
+        assets.write(self.root)
+        again = AssetManifest.scan(self.static, AssetManifest.load(os.path.join(self.root, ASSET_MANIFEST_NAME)))
+        self.assertEqual((again.assets, again.version, again.hashed), (assets.assets, assets.version, 0))
+        with open(os.path.join(self.static, 'index.css'), 'w') as file:
+            file.write('body { margin: 0 }')
+        changed = AssetManifest.scan(self.static, again)
+        self.assertEqual(changed.hashed, 1)
+        self.assertNotEqual(changed.url('/index.css'), css)
+        self.assertNotEqual(changed.version, assets.version)
+
+    def test_copy_and_rewrite(self):
+        assets = AssetManifest.scan(self.static)
+        docs = os.path.join(self.root, 'docs')
+        copy_files(self.static, docs, assets=assets)
+        self.assertTrue(os.path.isfile(os.path.join(docs, *assets.url('/images/tom.png')[1:].split('/'))))
+        self.assertTrue(os.path.isfile(os.path.join(docs, 'robots.txt')))
+        self.assertTrue(os.path.isfile(os.path.join(docs, '.well-known', 'security.txt')))
+        self.assertTrue(os.path.isfile(os.path.join(docs, 'index.css')))
+
+        template = Template('<link href="/index.css"><a href="/blog/">{{ Content }}</a>', '/base/', assets)
+        self.assertEqual(template.literals[0], f'<link href="/base{assets.url("/index.css")}"><a href="/base/blog/">')
+        rendered = render_content('# Title\n\n![tom](/images/tom.png) [home](/)', '/base/', assets=assets)
+        html = template.render({'Content': rendered.content})
+        self.assertIn(f'src="/base{assets.url("/images/tom.png")}"', html)
+        self.assertIn('href="/base/"', html)
+
+    def test_both_names_are_tracked(self):
+        docs = os.path.join(self.root, 'docs')
+        manifest_path = os.path.join(self.root, 'manifest.json')
+        manifest = BuildManifest.load(manifest_path)
+        copy_files(self.static, docs, manifest, assets=AssetManifest.scan(self.static))
+        manifest.finish(docs, complete=True)
+
+        os.remove(os.path.join(self.static, 'index.css'))
+        manifest = BuildManifest.load(manifest_path)
+        assets = AssetManifest.scan(self.static)
+        copy_files(self.static, docs, manifest, assets=assets)
+        self.assertEqual(len(manifest.finish(docs, complete=True)), 2)
+        self.assertEqual(sorted(name for name in os.listdir(docs) if name.endswith('.css')), [])
+        self.assertTrue(os.path.isfile(os.path.join(docs, 'images', 'tom.png')))
+
+if __name__ == '__main__':
+    unittest.main()
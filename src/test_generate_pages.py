@@ -0,0 +1,147 @@
+import os
+import tempfile
+import unittest
+
+from main import discover_pages, generate_pages, generate_page_recursive, PageSelection, render_content
+from search import SearchIndex
+from manifest import BuildManifest
+from profiler import BuildProfile, PageProfile, STAGES
+from cache import ParseCache
+
+class TestGeneratePages(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = self.temp_dir.name
+        self.content = os.path.join(self.root, 'content')
+        self.docs = os.path.join(self.root, 'docs')
+        self.template = os.path.join(self.root, 'template.html')
+        os.makedirs(os.path.join(self.content, 'blog', 'post'))
+        os.mkdir(self.docs)
+        with open(self.template, 'w') as file:
+            file.write('<title>{{ Title }}</title><a href="/">home</a>{{ Content }}')
+        self.write('index.md', '# Home\n\nhello **there**')
+        self.write('blog/post/index.md', '# Post\n\n- one\n- two')
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def write(self, path, text):
+        with open(os.path.join(self.content, path), 'w') as file:
+            file.write(text)
+
+    def read(self, path):
+        with open(os.path.join(self.docs, path)) as file:
+            return file.read()
+
+    def test_discover_pages(self):
+        pages = discover_pages(self.content, self.docs)
+        self.assertEqual(pages, [
+            (f'{self.content}/blog/post/index.md', f'{self.docs}/blog/post/index.html'),
+            (f'{self.content}/index.md', f'{self.docs}/index.html'),
+        ])
+        self.assertTrue(os.path.isdir(os.path.join(self.docs, 'blog', 'post')))
+
+    def test_parallel_matches_serial(self):
+        pages = discover_pages(self.content, self.docs)
+        self.assertEqual(generate_pages(pages, self.template, '/base/', jobs=1), [])
+        serial = [self.read('index.html'), self.read('blog/post/index.html')]
+
+        self.assertEqual(generate_pages(pages, self.template, '/base/', jobs=2), [])
+        parallel = [self.read('index.html'), self.read('blog/post/index.html')]
+        self.assertEqual(serial, parallel)
+        self.assertEqual(parallel[0], '<title>Home</title><a href="/base/">home</a><div><h1>Home</h1><p>hello <b>there</b></p></div>')
+
+    def test_errors_are_reported_per_file(self):
+        self.write('broken.md', 'no title here')
+        pages = discover_pages(self.content, self.docs)
+        for jobs in (1, 2):
+            errors = generate_pages(pages, self.template, '/', jobs=jobs)
+            self.assertEqual([path for path, _ in errors], [f'{self.content}/broken.md'])
+        self.assertTrue(os.path.exists(os.path.join(self.docs, 'index.html')))
+
+    def test_profile(self):
+        pages = discover_pages(self.content, self.docs)
+        for jobs in (1, 2):
+            profile = BuildProfile()
+            self.assertEqual(generate_pages(pages, self.template, '/', jobs=jobs, profile=profile), [])
+            self.assertEqual(sorted(page.path for page in profile.pages), sorted(path for path, _ in pages))
+            for page in profile.pages:
+                self.assertEqual(sorted(page.wall), sorted(STAGES))
+                self.assertGreater(page.nodes, 0)
+            report = profile.report(top=1)
+            self.assertIn('inline_parse', report)
+            self.assertIn('Slowest 1 pages', report)
+        self.assertEqual(self.read('index.html'), '<title>Home</title><a href="/">home</a><div><h1>Home</h1><p>hello <b>there</b></p></div>')
+
+    def test_render_content_profile(self):
+        markdown = '# Home\n\nhello **there** and [home](/)'
+        cache = ParseCache(os.path.join(self.root, 'cache'), 'test')
+        expected = render_content(markdown, '/', index=True)
+        for page_cache in (None, cache):
+            page = PageProfile('index.md')
+            rendered = render_content(markdown, '/', page_cache, index=True, page=page)
+            self.assertEqual((rendered.title, rendered.links), (expected.title, expected.links))
+            content = rendered.content if page_cache is not None else rendered.content.to_html()
+            self.assertEqual(content, expected.content.to_html())
+            self.assertIn('inline_parse', page.wall)
+        self.assertEqual(page.counters, {'parse_cache_misses': 1})
+
+    def test_parse_cache(self):
+        pages = discover_pages(self.content, self.docs)
+        cache = ParseCache(os.path.join(self.root, 'cache'), 'test')
+        expected = '<title>Home</title><a href="/base/">home</a><div><h1>Home</h1><p>hello <b>there</b></p></div>'
+        for hits in (0, 2):
+            profile = BuildProfile()
+            self.assertEqual(generate_pages(pages, self.template, '/base/', profile=profile, cache=cache), [])
+            self.assertEqual(profile.counters.get('parse_cache_hits', 0), hits)
+            self.assertEqual(self.read('index.html'), expected)
+
+        self.assertEqual(generate_pages(pages, self.template, '/base/', jobs=2, cache=cache), [])
+        self.assertEqual(self.read('index.html'), expected)
+
+    def test_block_cache_counts(self):
+        self.write('other.md', '# Home\n\nhello **there**')
+        pages = discover_pages(self.content, self.docs)
+        counts = {}
+        self.assertEqual(generate_pages(pages, self.template, '/', block_cache_size=16, counts=counts), [])
+        self.assertGreater(counts['block_cache_hits'], 0)
+        self.assertGreater(counts['block_cache_misses'], 0)
+
+    def test_page_selection(self):
+        manifest = BuildManifest(os.path.join(self.docs, 'manifest.json'))
+        selection = PageSelection(self.content, self.docs, manifest=manifest)
+        self.assertEqual(generate_pages(selection, self.template, '/'), [])
+        selection.report([], {}, 0)
+        self.assertEqual(selection.count, 2)
+
+        manifest = BuildManifest(manifest.path)
+        manifest.entries = dict(selection.manifest.seen)
+        manifest.settings_changed = False
+        search = SearchIndex()
+        selection = PageSelection(self.content, self.docs, manifest=manifest, search=search)
+        self.assertEqual(list(selection), [])
+        self.assertEqual(search.seen, {'/', '/blog/post/'})
+        with self.assertRaisesRegex(Exception, '1 of 0 pages failed'):
+            selection.report([(os.path.join(self.content, 'index.md'), ValueError('broken'))], {}, 0)
+        self.assertIsNone(manifest.seen[os.path.join(self.content, 'index.md')]['hash'])
+
+    def test_failed_walk_keeps_unseen_pages(self):
+        manifest_path = os.path.join(self.docs, 'manifest.json')
+        manifest = BuildManifest.load(manifest_path)
+        generate_page_recursive(self.content, self.template, self.docs, '/', manifest)
+        manifest.finish(self.docs, complete=True)
+
+        os.symlink(os.path.join(self.root, 'missing.md'), os.path.join(self.content, 'aaa.md'))
+        manifest = BuildManifest.load(manifest_path)
+        with self.assertRaises(OSError):
+            generate_page_recursive(self.content, self.template, self.docs, '/', manifest)
+        self.assertEqual(manifest.finish(self.docs, complete=False), [])
+        self.assertTrue(os.path.exists(os.path.join(self.docs, 'index.html')))
+        self.assertTrue(os.path.exists(os.path.join(self.docs, 'blog', 'post', 'index.html')))
+
+        manifest = BuildManifest.load(manifest_path)
+        self.assertEqual(sorted(manifest.entries), [os.path.join(self.content, 'blog', 'post', 'index.md'), os.path.join(self.content, 'index.md')])
+        self.assertFalse(manifest.needs_update(os.path.join(self.content, 'index.md'), os.path.join(self.docs, 'index.html'), 'page'))
+
+if __name__ == "__main__":
+    unittest.main()
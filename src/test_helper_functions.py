@@ -263,6 +263,28 @@ class TestHelperFuntions(unittest.TestCase):
         assert result[2].text_type == TextType.IMAGE
         assert result[3].text_type == TextType.TEXT
 
+    def test_find_markdown_links(self):
+        text = "[a](/x) and ![a](/x) then [a](/x)"
+        result = list(find_markdown_links(text))
+        assert [(match.start, match.end) for match in result] == [(0, 7), (26, 33)]
+        assert result[0].text == "a" and result[0].url == "/x"
+        result = list(find_markdown_images(text))
+        assert [(match.start, match.end, match.text) for match in result] == [(12, 20, "a")]
+
+    def test_split_repeated_links(self):
+        text = "![home](/) first [home](/) middle [home](/) end"
+        result = split_nodes_link([TextNode(text, TextType.TEXT)])
+        assert result == [
+            TextNode("![home](/) first ", TextType.TEXT),
+            TextNode("home", TextType.LINK, "/"),
+            TextNode(" middle ", TextType.TEXT),
+            TextNode("home", TextType.LINK, "/"),
+            TextNode(" end", TextType.TEXT),
+        ]
+        result = split_nodes_image(result)
+        assert result[0] == TextNode("home", TextType.IMAGE, "/")
+        assert result[1] == TextNode(" first ", TextType.TEXT)
+
     def test_text_to_textnodes(self):
         # Basic cases
         assert text_to_textnodes("Plain text") == [
@@ -306,6 +328,48 @@ class TestHelperFuntions(unittest.TestCase):
         assert nodes[0] == TextNode("Bold", TextType.BOLD)
         assert nodes[1] == TextNode(" ", TextType.TEXT)
         assert nodes[2] == TextNode("More Bold", TextType.BOLD)
+
+    def test_text_to_textnodes_nested(self):
+        self.assertEqual(text_to_textnodes("**Note: run `make`**"), [
+            TextNode("Note: run ", TextType.BOLD),
+            TextNode("make", TextType.CODE),
+        ])
+        self.assertEqual(text_to_textnodes("**a _b_ c**"), [
+            TextNode("a ", TextType.BOLD),
+            TextNode("b", TextType.ITALIC),
+            TextNode(" c", TextType.BOLD),
+        ])
+        self.assertEqual(text_to_textnodes("_one `two` **three**_"), [
+            TextNode("one ", TextType.ITALIC),
+            TextNode("two", TextType.CODE),
+            TextNode(" ", TextType.ITALIC),
+            TextNode("three", TextType.BOLD),
+        ])
+
+    def test_text_to_textnodes_single_pass(self):
+        nodes = text_to_textnodes("[a](x) [a](x)")
+        self.assertEqual(nodes, [
+            TextNode("a", TextType.LINK, "x"),
+            TextNode(" ", TextType.TEXT),
+            TextNode("a", TextType.LINK, "x"),
+        ])
+
+        nodes = text_to_textnodes("run `snake_case_name` and `**kwargs`")
+        self.assertEqual(nodes, [
+            TextNode("run ", TextType.TEXT),
+            TextNode("snake_case_name", TextType.CODE),
+            TextNode(" and ", TextType.TEXT),
+            TextNode("**kwargs", TextType.CODE),
+        ])
+
+        nodes = text_to_textnodes("[my_link_name](https://example.com/a_b_c) is _nice_")
+        self.assertEqual(nodes, [
+            TextNode("my_link_name", TextType.LINK, "https://example.com/a_b_c"),
+            TextNode(" is ", TextType.TEXT),
+            TextNode("nice", TextType.ITALIC),
+        ])
+
+        self.assertEqual(text_to_textnodes(""), [])
     
     def test_md_to_block(self):
         test = """# This is a heading
@@ -336,6 +400,38 @@ This is a paragraph of text. It has some **bold** and _italic_ words inside of i
             assert block[0] != " "
 
 
+    def test_parse_blocks(self):
+        md = "# heading\n   \n\t\nparagraph\ntext  \n\n```\nfirst\n\n  second\n```\n- a\n- b\n"
+        blocks = list(parse_blocks(md))
+        self.assertEqual(blocks, [
+            Block(block_type_heading, ["# heading"]),
+            Block(block_type_paragraph, ["paragraph", "text"]),
+            Block(block_type_code, ["```", "first", "", "  second", "```"]),
+            Block(block_type_ulist, ["- a", "- b"]),
+        ])
+
+        html = markdown_to_html_node(md).to_html()
+        self.assertIn("<pre><code>first\n\n  second\n</code></pre>", html)
+
+        blocks = list(parse_blocks("```\nnever closed\n\nstill code"))
+        self.assertEqual(blocks, [Block(block_type_code, ["```", "never closed", "", "still code"])])
+
+    def test_block_cache(self):
+        md = "# Page\n\nShared **footer** with a [link](/about)\n\n- one\n- two"
+        cache = BlockCache(max_entries=3, rewrite_url=lambda url: f"/base{url}")
+        first = markdown_to_html_node(md, cache).to_html()
+        self.assertEqual((cache.hits, cache.misses), (0, 3))
+        self.assertEqual(len(cache.entries), 3)
+
+        second = markdown_to_html_node(md.replace("# Page", "# Other page"), cache).to_html()
+        self.assertEqual((cache.hits, cache.misses), (2, 4))
+        self.assertEqual(len(cache.entries), 3)
+        self.assertEqual(first.replace("Page", "Other page"), second)
+        self.assertEqual(
+            first,
+            markdown_to_html_node(md).to_html(lambda url: f"/base{url}"),
+        )
+
     def test_block_to_block_types(self):
         block = "# heading"
         self.assertEqual(block_to_block_type(block), block_type_heading)
@@ -1,3 +1,4 @@
+import io
 import unittest
 from htmlnode import HTMLNode, LeafNode, ParentNode
 
@@ -104,4 +105,31 @@ class TestHTMLNode(unittest.TestCase):
         )
         
         with self.assertRaises(ValueError):
-            node.to_html()           
\ No newline at end of file
+            node.to_html()
+
+    def test_streaming(self):
+        node = ParentNode(
+            "p",
+            [
+                LeafNode("a", "home", {"href": "/index.html"}),
+                ParentNode("b", [LeafNode(None, "bold")]),
+                LeafNode("img", "", {"src": "https://example.com/a.png", "alt": "a"}),
+            ],
+        )
+
+        self.assertEqual(list(node.iter_html()), [
+            '<p>',
+            '<a href="/index.html">home</a>',
+            '<b>', 'bold', '</b>',
+            '<img src="https://example.com/a.png" alt="a"></img>',
+            '</p>',
+        ])
+
+        out = io.StringIO()
+        node.write_to(out, lambda url: f'/base{url}' if url.startswith('/') else url)
+        self.assertEqual(out.getvalue(), '<p><a href="/base/index.html">home</a><b>bold</b><img src="https://example.com/a.png" alt="a"></img></p>')
+        self.assertEqual(node.to_html(), '<p><a href="/index.html">home</a><b>bold</b><img src="https://example.com/a.png" alt="a"></img></p>')
+
+    def test_slots(self):
+        for node in (HTMLNode("p"), LeafNode("b", "bold"), ParentNode("p", [])):
+            self.assertFalse(hasattr(node, "__dict__"))
@@ -0,0 +1,116 @@
+import os
+import pickle
+import struct
+import tempfile
+import unittest
+
+from htmlnode import LeafNode, ParentNode, RenderedNode
+from helper_functions import markdown_to_html_node, BlockCache
+from template import basepath_rewriter
+from images import ImageSizer, probe_size, derivative_url, images_fingerprint, build_derivatives, can_resize, cached_digest
+from main import render_content
+
+def png_header(width: int, height: int) -> bytes:
+    return b'\x89PNG\r\n\x1a\n' + struct.pack('>I', 13) + b'IHDR' + struct.pack('>IIBBBBB', width, height, 8, 6, 0, 0, 0) + b'\0' * 4
+
+def jpeg_header(width: int, height: int) -> bytes:
+    app0 = b'\xff\xe0' + struct.pack('>H', 16) + b'JFIF\0' + b'\0' * 9
+    sof = b'\xff\xc0' + struct.pack('>HBHHB', 11, 8, height, width, 1) + b'\x01\x11\x00'
+    return b'\xff\xd8' + app0 + sof + b'\xff\xd9'
+
+class TestImages(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.root = self.directory.name
+        os.makedirs(os.path.join(self.root, 'images'))
+        self.write('images/wide.png', png_header(1200, 600))
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self, name: str, contents: bytes) -> str:
+        path = os.path.join(self.root, *name.split('/'))
+        with open(path, 'wb') as file:
+            file.write(contents)
+        return path
+
+    def test_probe_size(self):
+        self.assertEqual(probe_size(os.path.join(self.root, 'images', 'wide.png')), (1200, 600))
+        self.assertEqual(probe_size(self.write('a.gif', b'GIF89a' + struct.pack('<HH', 30, 20) + b'\0' * 8)), (30, 20))
+        self.assertEqual(probe_size(self.write('a.jpg', jpeg_header(640, 480))), (640, 480))
+        vp8x = b'RIFF' + struct.pack('<I', 30) + b'WEBPVP8X' + struct.pack('<I', 10) + b'\0' * 4 + (799).to_bytes(3, 'little') + (599).to_bytes(3, 'little')
+        self.assertEqual(probe_size(self.write('a.webp', vp8x)), (800, 600))
+        self.assertIsNone(probe_size(self.write('a.txt', b'not an image at all')))
+
+    def test_attributes(self):
+        sizer = ImageSizer(self.root, [480, 1600, 960])
+        self.assertEqual(sizer.attributes('/images/wide.png'), {
+            'width': '1200',
+            'height': '600',
+            'srcset': '/images/wide-480w.png 480w, /images/wide-960w.png 960w, /images/wide.png 1200w',
+        })
+        self.assertEqual(sizer.attributes('/images/missing.png'), {})
+        self.assertEqual(sizer.attributes('https://example.com/wide.png'), {})
+        self.assertEqual(derivative_url('/a/b.c.png', 480), '/a/b.c-480w.png')
+
+    def test_annotate_rewrites_srcset(self):
+        sizer = ImageSizer(self.root, [480])
+        node = markdown_to_html_node('# Title\n\n![wide](/images/wide.png) and ![gone](/images/gone.png)')
+        self.assertTrue(sizer.annotate(node))
+        self.assertEqual(
+            node.to_html(basepath_rewriter('/base/')),
+            '<div><h1>Title</h1><p><img src="/base/images/wide.png" alt="wide" width="1200" height="600" srcset="/base/images/wide-480w.png 480w, /base/images/wide.png 1200w"></img> and <img src="/base/images/gone.png" alt="gone"></img></p></div>',
+        )
+        self.assertFalse(sizer.annotate(node))
+
+    def test_annotate_rendered_node(self):
+        sizer = ImageSizer(self.root)
+        image = LeafNode('img', '', {'src': '/images/wide.png', 'alt': 'wide'})
+        rendered = RenderedNode(ParentNode('p', [image]), '<p>stale</p>')
+        sizer.annotate(ParentNode('div', [rendered]), basepath_rewriter('/base/'))
+        self.assertEqual(rendered.to_html(), '<p><img src="/base/images/wide.png" alt="wide" width="1200" height="600"></img></p>')
+
+    def test_render_content_with_block_cache(self):
+        sizer = ImageSizer(self.root)
+        block_cache = BlockCache(16, basepath_rewriter('/base/'))
+        markdown = '# Title\n\n![wide](/images/wide.png)'
+        first = render_content(markdown, '/base/', None, block_cache, images=sizer).content.to_html()
+        second = render_content(markdown, '/base/', None, block_cache, images=sizer).content.to_html()
+        self.assertIn('width="1200" height="600"', first)
+        self.assertEqual(first, second)
+
+    def test_fingerprint_and_pickling(self):
+        before = images_fingerprint(self.root)
+        self.write('images/new.png', png_header(10, 10))
+        self.assertNotEqual(images_fingerprint(self.root), before)
+        sizer = ImageSizer(self.root, [480])
+        self.assertIs(pickle.loads(pickle.dumps(sizer)), pickle.loads(pickle.dumps(sizer)))
+
+    def test_cached_digest(self):
+        path = os.path.join(self.root, 'images', 'wide.png')
+        digests = {}
+        digest, hashed = cached_digest(path, os.stat(path), digests)
+        self.assertTrue(hashed)
+        self.assertEqual(cached_digest(path, os.stat(path), digests), (digest, False))
+        self.write('images/wide.png', png_header(1200, 601))
+        self.assertNotEqual(cached_digest(path, os.stat(path), digests), (digest, False))
+
+    @unittest.skipIf(can_resize(), 'Pillow is installed')
+    def test_derivatives_need_pillow(self):
+        with self.assertRaises(Exception):
+            build_derivatives(self.root, os.path.join(self.root, 'out'), [480], os.path.join(self.root, 'cache'))
+
+    @unittest.skipUnless(can_resize(), 'needs Pillow')
+    def test_build_derivatives(self):
+        from PIL import Image
+        Image.new('RGB', (1200, 600)).save(os.path.join(self.root, 'images', 'wide.png'))
+        out = os.path.join(self.root, 'out')
+        cache_dir = os.path.join(self.root, 'cache')
+        counts = build_derivatives(self.root, out, [480, 960], cache_dir, jobs=2)
+        self.assertEqual((counts['resized'], counts['placed']), (2, 2))
+        self.assertEqual(probe_size(os.path.join(out, 'images', 'wide-480w.png')), (480, 240))
+        counts = build_derivatives(self.root, os.path.join(self.root, 'other'), [480, 960], cache_dir)
+        self.assertEqual((counts['resized'], counts['cached'], counts['hashed']), (0, 2, 0))
+
+if __name__ == '__main__':
+    unittest.main()
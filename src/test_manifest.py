@@ -0,0 +1,107 @@
+import os
+import tempfile
+import unittest
+
+from manifest import BuildManifest
+
+class TestBuildManifest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = self.temp_dir.name
+        self.source = os.path.join(self.root, 'page.md')
+        self.output = os.path.join(self.root, 'out', 'page.html')
+        self.manifest_path = os.path.join(self.root, 'manifest.json')
+        os.mkdir(os.path.join(self.root, 'out'))
+        with open(self.source, 'w') as file:
+            file.write('# hello')
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def build(self, settings=None) -> BuildManifest:
+        manifest = BuildManifest.load(self.manifest_path, settings or {'template': 'a'})
+        return manifest
+
+    def finish(self, manifest: BuildManifest):
+        with open(self.output, 'w') as file:
+            file.write('<h1>hello</h1>')
+        manifest.save()
+
+    def test_unchanged_file_is_skipped(self):
+        manifest = self.build()
+        self.assertTrue(manifest.needs_update(self.source, self.output, 'page'))
+        self.finish(manifest)
+
+        manifest = self.build()
+        self.assertFalse(manifest.needs_update(self.source, self.output, 'page'))
+
+    def test_changed_content_is_rebuilt(self):
+        manifest = self.build()
+        manifest.needs_update(self.source, self.output, 'page')
+        self.finish(manifest)
+
+        with open(self.source, 'w') as file:
+            file.write('# hello there')
+        manifest = self.build()
+        self.assertTrue(manifest.needs_update(self.source, self.output, 'page'))
+
+    def test_settings_change_rebuilds_pages_only(self):
+        manifest = self.build()
+        manifest.needs_update(self.source, self.output, 'page')
+        self.finish(manifest)
+
+        manifest = self.build({'template': 'b'})
+        self.assertTrue(manifest.needs_update(self.source, self.output, 'page'))
+
+        manifest = self.build()
+        manifest.needs_update(self.source, self.output, 'static')
+        manifest.save()
+        manifest = self.build({'template': 'b'})
+        self.assertFalse(manifest.needs_update(self.source, self.output, 'static'))
+
+    def test_removed_sources_are_deleted(self):
+        manifest = self.build()
+        manifest.needs_update(self.source, self.output, 'page')
+        self.finish(manifest)
+
+        open(f'{self.output}.gz', 'w').close()
+        manifest = self.build()
+        removed = manifest.remove_stale(self.root)
+        self.assertEqual(removed, [os.path.normpath(self.output)])
+        self.assertFalse(os.path.exists(self.output))
+        self.assertFalse(os.path.exists(os.path.join(self.root, 'out')))
+
+    def test_moved_output_is_deleted(self):
+        manifest = self.build()
+        manifest.needs_update(self.source, self.output, 'static')
+        self.finish(manifest)
+
+        moved_output = os.path.join(self.root, 'out', 'page.2.html')
+        manifest = self.build()
+        self.assertTrue(manifest.needs_update(self.source, moved_output, 'static'))
+        with open(moved_output, 'w') as file:
+            file.write('<h1>hello</h1>')
+        self.assertEqual(manifest.finish(self.root, complete=True), [os.path.normpath(self.output)])
+        self.assertTrue(os.path.exists(moved_output))
+
+    def test_failed_build_keeps_outputs(self):
+        manifest = self.build()
+        manifest.needs_update(self.source, self.output, 'page')
+        self.finish(manifest)
+
+        manifest = self.build()
+        self.assertEqual(manifest.finish(self.root, complete=False), [])
+        self.assertTrue(os.path.exists(self.output))
+
+    def test_forgotten_source_is_rebuilt(self):
+        manifest = self.build()
+        manifest.needs_update(self.source, self.output, 'page')
+        manifest.forget(self.source)
+        self.finish(manifest)
+
+        manifest = self.build()
+        self.assertTrue(manifest.needs_update(self.source, self.output, 'page'))
+        self.assertEqual(manifest.remove_stale(self.root), [])
+
+if __name__ == "__main__":
+    unittest.main()
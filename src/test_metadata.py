@@ -0,0 +1,69 @@
+import os
+import sys
+import tempfile
+import subprocess
+import unittest
+
+from metadata import split_front_matter, extract_metadata, read_metadata, title_from_line
+from main import discover_pages, generate_pages
+
+PAGE = '---\ndate: 2024-05-01\ndescription: "A page: with colons"\n---\n# #1 Title\n\nbody'
+
+class TestMetadata(unittest.TestCase):
+    def test_split_front_matter(self):
+        metadata, body = split_front_matter(PAGE)
+        self.assertEqual(metadata, {'Date': '2024-05-01', 'Description': 'A page: with colons'})
+        self.assertEqual(body, '# #1 Title\n\nbody')
+        self.assertEqual(split_front_matter('# Title\n---\na: b\n---'), ({}, '# Title\n---\na: b\n---'))
+        self.assertEqual(split_front_matter('---\na: b\n# Title'), ({}, '---\na: b\n# Title'))
+
+    def test_title_from_line(self):
+        self.assertEqual(title_from_line('  # #1 fan  \n'), '#1 fan')
+        self.assertIsNone(title_from_line('## sub'))
+        self.assertIsNone(title_from_line('#tag'))
+
+    def test_extract_metadata_stops_at_title(self):
+        lines = iter(PAGE.splitlines(keepends=True) + ['# Later\n'])
+        self.assertEqual(extract_metadata(lines), {'Date': '2024-05-01', 'Description': 'A page: with colons', 'Title': '#1 Title'})
+        self.assertEqual(list(lines), ['\n', 'body', '# Later\n'])
+
+        lines = iter(['---\n', 'title: From Front Matter\n', '---\n', '# Heading\n'])
+        self.assertEqual(extract_metadata(lines), {'Title': 'From Front Matter'})
+        self.assertEqual(list(lines), ['# Heading\n'])
+        with self.assertRaises(Exception):
+            extract_metadata(['## no title\n'])
+
+    def test_unclosed_front_matter_is_part_of_the_page(self):
+        page = '---\ntitle: Ignored\n# Real Title\n\nbody'
+        self.assertEqual(split_front_matter(page), ({}, page))
+        self.assertEqual(extract_metadata(page.splitlines(keepends=True)), {'Title': 'Real Title'})
+        with self.assertRaises(Exception):
+            extract_metadata(['---\n', 'title: Ignored\n'])
+
+    def test_front_matter_fills_template(self):
+        with tempfile.TemporaryDirectory() as root:
+            content = os.path.join(root, 'content')
+            docs = os.path.join(root, 'docs')
+            template = os.path.join(root, 'template.html')
+            os.mkdir(content)
+            with open(template, 'w') as file:
+                file.write('<title>{{ Title }}</title><time>{{ Date }}</time>{{ Content }}')
+            with open(os.path.join(content, 'index.md'), 'w') as file:
+                file.write(PAGE)
+            self.assertEqual(read_metadata(os.path.join(content, 'index.md'))['Title'], '#1 Title')
+            self.assertEqual(generate_pages(discover_pages(content, docs), template, '/', dest_root=docs), [])
+            with open(os.path.join(docs, 'index.html')) as file:
+                self.assertEqual(file.read(), '<title>#1 Title</title><time>2024-05-01</time><div><h1>#1 Title</h1><p>body</p></div>')
+
+    def test_list_fails_on_pages_without_a_title(self):
+        with tempfile.TemporaryDirectory() as root:
+            os.mkdir(os.path.join(root, 'content'))
+            with open(os.path.join(root, 'content', 'index.md'), 'w') as file:
+                file.write('no title')
+            main_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'main.py')
+            listed = subprocess.run([sys.executable, main_path, 'list'], cwd=root, capture_output=True, text=True)
+            self.assertEqual(listed.returncode, 1)
+            self.assertIn('Failed to read', listed.stderr)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+import os
+import asyncio
+import tempfile
+import unittest
+
+from main import discover_pages, generate_pages
+from manifest import BuildManifest
+import pipeline
+
+class TestPipeline(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = self.temp_dir.name
+        self.content = os.path.join(self.root, 'content')
+        self.static = os.path.join(self.root, 'static')
+        self.docs = os.path.join(self.root, 'docs')
+        self.template = os.path.join(self.root, 'template.html')
+        os.makedirs(os.path.join(self.content, 'blog', 'post'))
+        os.makedirs(os.path.join(self.static, 'blog'))
+        os.mkdir(self.docs)
+        with open(self.template, 'w') as file:
+            file.write('<title>{{ Title }}</title><a href="{{ Path }}">here</a>{{ Content }}')
+        with open(os.path.join(self.static, 'blog', 'style.css'), 'w') as file:
+            file.write('body {}')
+        for index in range(20):
+            self.write(f'page{index}.md', f'# Page {index}\n\n[home](/) and `code`')
+        self.write('blog/post/index.md', '# Post\n\n- one\n- two')
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def write(self, path, text):
+        with open(os.path.join(self.content, path), 'w') as file:
+            file.write(text)
+
+    def read_all(self):
+        files = {}
+        for root, _, names in os.walk(self.docs):
+            for name in names:
+                with open(os.path.join(root, name)) as file:
+                    files[os.path.relpath(os.path.join(root, name), self.docs)] = file.read()
+        return files
+
+    def build(self, **kwargs):
+        asyncio.run(pipeline.build(self.content, self.static, self.template, self.docs, '/base/', **kwargs))
+
+    def test_matches_generate_pages(self):
+        pages = discover_pages(self.content, self.docs)
+        self.assertEqual(generate_pages(pages, self.template, '/base/', dest_root=self.docs), [])
+        expected = self.read_all()
+
+        for jobs in (1, 2):
+            self.build(jobs=jobs, io_jobs=3, queue_size=2)
+            files = self.read_all()
+            self.assertEqual(files.pop(os.path.join('blog', 'style.css')), 'body {}')
+            self.assertEqual(files, expected)
+
+    def test_errors(self):
+        self.write('broken.md', 'no title here')
+        manifest = BuildManifest(os.path.join(self.docs, 'manifest.json'), {})
+        with self.assertRaisesRegex(Exception, '1 of 22 pages failed'):
+            self.build(manifest=manifest)
+        self.assertTrue(os.path.exists(os.path.join(self.docs, 'page19.html')))
+        self.assertFalse(os.path.exists(os.path.join(self.docs, 'broken.html')))
+        self.assertTrue(manifest.needs_update(os.path.join(self.content, 'broken.md'), os.path.join(self.docs, 'broken.html'), 'page'))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+import os
+import json
+import tempfile
+import unittest
+
+from helper_functions import markdown_to_html_node
+from search import SearchIndex, page_terms, delta_encode, delta_decode, shard_name, SEARCH_DIR, SEARCH_STATE_NAME
+
+class TestSearch(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = self.temp_dir.name
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def read(self, name):
+        with open(os.path.join(self.root, SEARCH_DIR, name)) as file:
+            return json.load(file)
+
+    def test_page_terms(self):
+        node = markdown_to_html_node('# Tom Bombadil\n\n## Old Forest\n\nTom sings in the **forest**. ![Goldberry](/g.png) a')
+        self.assertEqual(page_terms(node), {'tom': 9, 'bombadil': 8, 'old': 4, 'forest': 5, 'sings': 1, 'in': 1, 'the': 1, 'goldberry': 1})
+        self.assertEqual(page_terms(node, max_terms=2), {'tom': 9, 'bombadil': 8})
+
+    def test_delta_encoding(self):
+        postings = [(0, 3), (4, 1), (5, 2), (100, 8)]
+        self.assertEqual(delta_encode(postings), [0, 3, 4, 1, 1, 2, 95, 8])
+        self.assertEqual(delta_decode(delta_encode(postings)), postings)
+        self.assertEqual(shard_name('tom'), 't')
+        self.assertEqual(shard_name('élan'), 'ue9')
+
+    def test_write(self):
+        index = SearchIndex()
+        index.add('/blog/tom/', 'Tom', {'tom': 9, 'forest': 1})
+        index.add('/', 'Home', {'tolkien': 8, 'forest': 2})
+        stats = index.write(self.root, '/base/')
+        self.assertEqual(stats['terms'], 3)
+        self.assertEqual(self.read('docs.json')['docs'], [['/base/', 'Home'], ['/base/blog/tom/', 'Tom']])
+        self.assertEqual(self.read('t.json'), {'terms': ['tolkien', 'tom'], 'postings': [[0, 8], [1, 9]]})
+        self.assertEqual(self.read('f.json'), {'terms': ['forest'], 'postings': [[0, 2, 1, 1]]})
+
+    def test_incremental_update(self):
+        index = SearchIndex()
+        index.add('/', 'Home', {'home': 8})
+        index.add('/a/', 'A', {'apple': 1})
+        index.add('/b/', 'B', {'banana': 1})
+        index.write(self.root, '/')
+        b_shard = os.path.join(self.root, SEARCH_DIR, 'b.json')
+        os.utime(b_shard, ns=(0, 0))
+        for name in ('b.json.gz', 'z.json.gz'):
+            open(os.path.join(self.root, SEARCH_DIR, name), 'w').close()
+
+        index = SearchIndex.load(os.path.join(self.root, SEARCH_STATE_NAME))
+        index.keep('/')
+        index.keep('/b/')
+        index.add('/c/', 'C', {'cherry': 1, 'apple': 2})
+        stats = index.write(self.root, '/')
+        self.assertEqual(self.read('docs.json')['docs'], [['/', 'Home'], None, ['/b/', 'B'], ['/c/', 'C']])
+        self.assertEqual(self.read('a.json'), {'terms': ['apple'], 'postings': [[3, 2]]})
+        self.assertEqual(os.stat(b_shard).st_mtime_ns, 0)
+        self.assertEqual(stats['files_written'], 3)
+        self.assertTrue(os.path.exists(f'{b_shard}.gz'))
+        self.assertFalse(os.path.exists(os.path.join(self.root, SEARCH_DIR, 'z.json.gz')))
+        self.assertEqual(stats['pages'], 3)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,154 @@
+import os
+import sys
+import tempfile
+import shutil
+import threading
+import unittest
+
+from server import DevServer, PollingWatcher, InotifyWatcher, QueueOverflow
+from walker import PageFilter
+
+class TestDevServer(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = self.temp_dir.name
+        self.content = os.path.join(self.root, 'content')
+        self.static = os.path.join(self.root, 'static')
+        self.docs = os.path.join(self.root, 'docs')
+        self.template = os.path.join(self.root, 'template.html')
+        for path in (self.content, self.static, self.docs):
+            os.mkdir(path)
+        self.write(self.template, '<title>{{ Title }}</title>{{ Content }}')
+        self.write(os.path.join(self.content, 'index.md'), '# Home')
+        self.server = DevServer(self.content, self.static, self.template, self.docs)
+        self.server.load_template()
+        self.server.handle_change(os.path.join(self.content, 'index.md'))
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def write(self, path, text):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as file:
+            file.write(text)
+
+    def read(self, path):
+        with open(path) as file:
+            return file.read()
+
+    def test_page_changes(self):
+        page = os.path.join(self.content, 'blog', 'post.md')
+        self.write(page, '# Post')
+        outputs = self.server.handle_change(page)
+        self.assertEqual(outputs, [os.path.join(self.docs, 'blog', 'post.html')])
+        self.assertEqual(self.read(outputs[0]), '<title>Post</title><div><h1>Post</h1></div>')
+
+        os.remove(page)
+        self.server.handle_change(page)
+        self.assertFalse(os.path.exists(outputs[0]))
+
+    def test_drafts_can_be_skipped(self):
+        page = os.path.join(self.content, '_drafts', 'post.md')
+        self.write(page, '# Post')
+        self.assertEqual(self.server.handle_change(page), [os.path.join(self.docs, '_drafts', 'post.html')])
+
+        server = DevServer(self.content, self.static, self.template, self.docs, filters=PageFilter(drafts=False))
+        server.load_template()
+        self.assertEqual(server.handle_change(page), [])
+        self.assertNotIn(os.path.normpath(page), server.pages)
+
+    def test_template_change_rebuilds_every_page(self):
+        self.write(self.template, '<h2>{{ Title }}</h2>')
+        outputs = self.server.handle_change(self.template)
+        self.assertEqual(outputs, [os.path.join(self.docs, 'index.html')])
+        self.assertEqual(self.read(outputs[0]), '<h2>Home</h2>')
+
+    def test_static_changes(self):
+        asset = os.path.join(self.static, 'images', 'logo.png')
+        self.write(asset, 'png')
+        outputs = self.server.handle_change(asset)
+        self.assertEqual(self.read(os.path.join(self.docs, 'images', 'logo.png')), 'png')
+
+        os.remove(asset)
+        self.server.handle_change(asset)
+        self.assertFalse(os.path.exists(outputs[0]))
+
+    def test_build_cleans_its_own_folder(self):
+        self.write(os.path.join(self.docs, 'old.html'), 'old')
+        self.server.build()
+        self.assertEqual(sorted(os.listdir(self.docs)), ['index.html'])
+
+    def test_queue_overflow_rebuilds_everything(self):
+        class Watcher():
+            def __init__(self):
+                self.events = [QueueOverflow('inotify queue overflowed'), KeyboardInterrupt()]
+                self.rescanned = False
+
+            def wait(self):
+                raise self.events.pop(0)
+
+            def rescan(self):
+                self.rescanned = True
+
+        watcher = Watcher()
+        os.remove(os.path.join(self.docs, 'index.html'))
+        with self.assertRaises(KeyboardInterrupt):
+            self.server.watch(watcher)
+        self.assertTrue(watcher.rescanned)
+        self.assertTrue(os.path.exists(os.path.join(self.docs, 'index.html')))
+
+class TestWatchers(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = self.temp_dir.name
+        self.content = os.path.join(self.root, 'content')
+        self.template = os.path.join(self.root, 'template.html')
+        os.makedirs(os.path.join(self.content, 'blog'))
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def check_watcher(self, watcher):
+        page = os.path.join(self.content, 'blog', 'post.md')
+        timer = threading.Timer(0.05, lambda: open(page, 'w').close())
+        timer.start()
+        self.assertEqual(watcher.wait(), {page})
+
+        timer = threading.Timer(0.05, lambda: open(self.template, 'w').close())
+        timer.start()
+        self.assertEqual(watcher.wait(), {self.template})
+
+    def test_polling_watcher(self):
+        self.check_watcher(PollingWatcher([self.content], [self.template], interval=0.01))
+
+    @unittest.skipUnless(sys.platform.startswith('linux'), 'inotify is linux only')
+    def test_inotify_watcher(self):
+        watcher = InotifyWatcher([self.content], [self.template])
+        try:
+            self.check_watcher(watcher)
+        finally:
+            watcher.close()
+
+    @unittest.skipUnless(sys.platform.startswith('linux'), 'inotify is linux only')
+    def test_inotify_watcher_removed_folders(self):
+        for name in ('a.md', 'b/c.md'):
+            page = os.path.join(self.content, 'blog', name)
+            os.makedirs(os.path.dirname(page), exist_ok=True)
+            open(page, 'w').close()
+        watcher = InotifyWatcher([self.content], [self.template])
+        try:
+            timer = threading.Timer(0.05, lambda: shutil.rmtree(os.path.join(self.content, 'blog')))
+            timer.start()
+            self.assertEqual(watcher.wait(), {os.path.join(self.content, 'blog', 'a.md'), os.path.join(self.content, 'blog', 'b', 'c.md')})
+
+            os.makedirs(os.path.join(self.content, 'news'))
+            open(os.path.join(self.content, 'news', 'd.md'), 'w').close()
+            self.assertEqual(watcher.wait(), {os.path.join(self.content, 'news', 'd.md')})
+            timer = threading.Timer(0.05, lambda: os.rename(os.path.join(self.content, 'news'), os.path.join(self.root, 'news')))
+            timer.start()
+            self.assertEqual(watcher.wait(), {os.path.join(self.content, 'news', 'd.md')})
+        finally:
+            watcher.close()
+
+if __name__ == "__main__":
+    unittest.main()
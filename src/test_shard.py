@@ -0,0 +1,89 @@
+import os
+import sys
+import argparse
+import subprocess
+import tempfile
+import unittest
+
+from main import copy_files, generate_page_recursive
+from shard import Shard, parse_shard, balance, stable_hash, write_shard_manifest, merge_shards
+
+class TestShard(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = self.temp_dir.name
+        self.content = os.path.join(self.root, 'content')
+        self.static = os.path.join(self.root, 'static')
+        self.template = os.path.join(self.root, 'template.html')
+        os.makedirs(self.static)
+        self.write(self.template, '<title>{{ Title }}</title>{{ Content }}')
+        self.write(os.path.join(self.static, 'index.css'), 'body {}')
+        for index in range(12):
+            self.write(os.path.join(self.content, f'section{index % 3}', f'page{index}.md'), f'# Page {index}\n\n' + 'words ' * index * 50)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def write(self, path, text):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as file:
+            file.write(text)
+
+    def pages(self):
+        return [(os.path.join(self.content, f'section{index % 3}', f'page{index}.md'), f'page{index}.html') for index in range(12)]
+
+    def test_parse_shard(self):
+        self.assertEqual(parse_shard('2/3'), Shard(2, 3))
+        for value in ('0/3', '4/3', '3', 'a/b', '1/0'):
+            with self.assertRaises(argparse.ArgumentTypeError):
+                parse_shard(value)
+
+    def test_every_page_is_in_one_shard(self):
+        for weighted in (False, True):
+            selected = [list(Shard(index, 3, weighted).select(self.pages(), self.content)) for index in range(1, 4)]
+            self.assertEqual(sorted(page for shard in selected for page in shard), sorted(self.pages()))
+            again = [list(Shard(index, 3, weighted).select(self.pages(), self.content)) for index in range(1, 4)]
+            self.assertEqual(selected, again)
+
+    def test_weighting_balances_sizes(self):
+        owners = balance([('a', 10), ('b', 6), ('c', 5), ('d', 1)], 2)
+        self.assertEqual(owners, {'a': 0, 'b': 1, 'c': 1, 'd': 0})
+        self.assertEqual(stable_hash('blog/post.md'), stable_hash('blog/post.md'))
+
+    def test_build_and_merge(self):
+        shard_paths = []
+        for index in (1, 2):
+            shard = Shard(index, 2)
+            output = os.path.join(self.root, f'docs.shard-{index}')
+            os.mkdir(output)
+            if shard.copies_static:
+                copy_files(self.static, output)
+            generate_page_recursive(self.content, self.template, output, '/', shard=shard)
+            write_shard_manifest(output, shard, {'basepath': '/'})
+            shard_paths.append(output)
+
+        docs = os.path.join(self.root, 'docs')
+        self.assertEqual(merge_shards(shard_paths, docs), 13)
+        for index in range(12):
+            with open(os.path.join(docs, f'section{index % 3}', f'page{index}.html')) as file:
+                self.assertIn(f'<h1>Page {index}</h1>', file.read())
+        self.assertTrue(os.path.isfile(os.path.join(docs, 'index.css')))
+
+        with self.assertRaisesRegex(Exception, 'missing \\[2\\]'):
+            merge_shards(shard_paths[:1], docs)
+        write_shard_manifest(shard_paths[1], Shard(2, 2), {'basepath': '/', 'minify': True})
+        with self.assertRaisesRegex(Exception, 'different settings: minify'):
+            merge_shards(shard_paths, docs)
+        copy_files(self.static, shard_paths[1])
+        write_shard_manifest(shard_paths[1], Shard(2, 2), {'basepath': '/'})
+        with self.assertRaisesRegex(Exception, '1 files were written by more than one shard'):
+            merge_shards(shard_paths, docs)
+        self.assertTrue(os.path.isfile(os.path.join(docs, 'section0', 'page0.html')))
+
+        main_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'main.py')
+        merged = subprocess.run([sys.executable, main_path, 'merge', *shard_paths], cwd=self.root, capture_output=True, text=True)
+        self.assertEqual(merged.returncode, 1)
+        self.assertIn('written by more than one shard', merged.stderr)
+
+if __name__ == '__main__':
+    unittest.main()
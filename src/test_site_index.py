@@ -0,0 +1,72 @@
+import os
+import tempfile
+import unittest
+
+from htmlnode import LeafNode, ParentNode, RenderedNode
+from helper_functions import markdown_to_html_node
+from site_index import SiteIndex, PageLinks, collect_links, resolve_link
+from template import Template
+from main import discover_pages, generate_pages
+from cache import ParseCache, parser_version
+
+class TestSiteIndex(unittest.TestCase):
+    def test_collect_links(self):
+        node = markdown_to_html_node('# Title\n\n[one](/a/) and ![pic](/i.png)\n\n- [two](b.html)')
+        wrapped = ParentNode('div', [RenderedNode(node, node.to_html())])
+        self.assertEqual(collect_links(wrapped), PageLinks(('/a/', 'b.html'), ('/i.png',)))
+
+    def test_resolve_link(self):
+        self.assertEqual(resolve_link('/blog/tom/', '../glorfindel/'), '/blog/glorfindel/')
+        self.assertEqual(resolve_link('/blog/tom/', '/index.css#top'), '/index.css')
+        self.assertEqual(resolve_link('/notes.html', 'other.html'), '/other.html')
+        self.assertIsNone(resolve_link('/', 'https://example.com/'))
+        self.assertIsNone(resolve_link('/', 'mailto:me@example.com'))
+        self.assertIsNone(resolve_link('/', '#top'))
+
+    def test_broken_links_and_sections(self):
+        index = SiteIndex()
+        index.add('/', 'Home', PageLinks(('/blog/tom', '/blog/missing/', 'https://example.com'), ('/images/a.png',)))
+        index.add('/blog/tom/', 'Tom', PageLinks(('../bob/', '/'), ('/images/b.png',)))
+        index.add('/blog/bob/', 'Bob', PageLinks((), ()))
+        index.add_file('/images/a.png')
+        self.assertEqual(index.broken_links(), [('/', '/blog/missing/'), ('/blog/tom/', '/images/b.png')])
+        self.assertEqual({section: [page.url for page in pages] for section, pages in index.sections().items()}, {'blog': ['/blog/bob/', '/blog/tom/']})
+
+        with tempfile.TemporaryDirectory() as root:
+            os.makedirs(os.path.join(root, 'blog'))
+            broken = index.write(root, Template('<title>{{ Title }}</title>{{ Content }}', '/base/'), 'https://example.com/')
+            self.assertEqual(len(broken), 2)
+            with open(os.path.join(root, 'blog', 'index.html')) as file:
+                self.assertEqual(file.read(), '<title>Blog</title><div><h1>Blog</h1><ul><li><a href="/base/blog/bob/">Bob</a></li><li><a href="/base/blog/tom/">Tom</a></li></ul></div>')
+            with open(os.path.join(root, 'sitemap.xml')) as file:
+                self.assertIn('<url><loc>https://example.com/base/blog/</loc></url>', file.read())
+            index.write(root, Template('{{ Content }}', '/base/'))
+            self.assertFalse(os.path.exists(os.path.join(root, 'sitemap.xml')))
+        self.assertIn('/blog/', index.pages)
+
+    def test_generate_pages_fills_index(self):
+        with tempfile.TemporaryDirectory() as root:
+            content = os.path.join(root, 'content')
+            docs = os.path.join(root, 'docs')
+            template = os.path.join(root, 'template.html')
+            os.makedirs(os.path.join(content, 'blog'))
+            with open(template, 'w') as file:
+                file.write('{{ Content }}')
+            with open(os.path.join(content, 'index.md'), 'w') as file:
+                file.write('# Home\n\n[post](/blog/post)')
+            with open(os.path.join(content, 'blog', 'post.md'), 'w') as file:
+                file.write('# Post\n\n![pic](/pic.png)')
+            cache = ParseCache(os.path.join(root, 'cache'), parser_version())
+            pages = discover_pages(content, docs)
+            expected = None
+            for jobs, page_cache in ((1, None), (2, None), (1, cache), (1, cache)):
+                index = SiteIndex()
+                self.assertEqual(generate_pages(pages, template, '/', jobs, docs, cache=page_cache, site_index=index), [])
+                if expected is None:
+                    expected = index.pages
+                self.assertEqual(index.pages, expected)
+            self.assertEqual(expected['/blog/post.html'].images, ('/pic.png',))
+            self.assertEqual(expected['/'].title, 'Home')
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,39 @@
+import os
+import tempfile
+import unittest
+
+from htmlnode import LeafNode, ParentNode
+from template import Template, load_template
+
+class TestTemplate(unittest.TestCase):
+    def test_render(self):
+        template = Template('<title> {{ Title }} </title><link href="/index.css"><a href="https://example.com">x</a>{{ Content }}<p>{{Date}}{{ Missing }}</p>', '/base/')
+        self.assertEqual(template.slots, ['Title', 'Content', 'Date', 'Missing'])
+
+        content = ParentNode('div', [LeafNode('img', '', {'src': '/images/a.png'}), LeafNode('a', 'b', {'href': 'https://b.com'})])
+        html = template.render({'Title': 'Hi', 'Content': content, 'Date': '2024-01-01'})
+        self.assertEqual(
+            html,
+            '<title> Hi </title><link href="/base/index.css"><a href="https://example.com">x</a>'
+            '<div><img src="/base/images/a.png"></img><a href="https://b.com">b</a></div><p>2024-01-01</p>',
+        )
+
+    def test_values_are_not_rewritten(self):
+        template = Template('{{ Title }}', '/base/')
+        self.assertEqual(template.render({'Title': 'href="/'}), 'href="/')
+
+    def test_load_template_is_cached_until_the_file_changes(self):
+        with tempfile.TemporaryDirectory() as root:
+            path = os.path.join(root, 'template.html')
+            with open(path, 'w') as file:
+                file.write('{{ Title }}')
+            template = load_template(path, '/')
+            self.assertIs(load_template(path, '/'), template)
+
+            with open(path, 'w') as file:
+                file.write('<h1>{{ Title }}</h1>')
+            os.utime(path, ns=(0, 0))
+            self.assertEqual(load_template(path, '/').render({'Title': 'a'}), '<h1>a</h1>')
+
+if __name__ == "__main__":
+    unittest.main()
@@ -28,6 +28,12 @@ class TestTextNode(unittest.TestCase):
         node = TextNode("This is a text node", TextType.LINK, url="https://example.com")
         node2 = TextNode("This is a text node", TextType.LINK)
         self.assertNotEqual(node, node2)
+
+    def test_slots(self):
+        node = TextNode("This is a text node", TextType.TEXT)
+        self.assertFalse(hasattr(node, "__dict__"))
+        with self.assertRaises(AttributeError):
+            node.extra = "not allowed" # type: ignore
         
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -11,3 +11,9 @@ class TestTitleExtractions(unittest.TestCase):
         case = '## hello tro'
         with self.assertRaises(Exception):
             extract_title(case)
+
+    def test_extract_title_keeps_hashes_in_title(self):
+        self.assertEqual(extract_title('# #1 fan'), '#1 fan')
+        self.assertEqual(extract_title('# # not a subheading #'), '# not a subheading #')
+        self.assertEqual(extract_title('intro\n\n   #  Spaced Title  \n\n# Second'), 'Spaced Title')
+        self.assertEqual(extract_title('#hashtag\n## sub\n# Real'), 'Real')
@@ -0,0 +1,52 @@
+import os
+import tempfile
+import unittest
+
+from walker import walk_files, PageFilter
+from main import iter_pages, discover_pages
+
+class TestWalker(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = self.temp_dir.name
+        self.content = os.path.join(self.root, 'content')
+        self.docs = os.path.join(self.root, 'docs')
+        for path in ['index.md', 'b.md', 'blog/post/index.md', 'blog/_notes.md', 'blog/idea.draft.md', '_drafts/wip.md', 'api/index.md', 'api/raw.txt']:
+            path = os.path.join(self.content, path)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'w') as file:
+                file.write('# Title')
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def walk(self, **kwargs):
+        return [os.path.relpath(entry.path, self.content) for entry in walk_files(self.content, **kwargs)]
+
+    def test_walk_order(self):
+        self.assertEqual(self.walk(), [
+            '_drafts/wip.md', 'api/index.md', 'api/raw.txt', 'b.md',
+            'blog/_notes.md', 'blog/idea.draft.md', 'blog/post/index.md', 'index.md',
+        ])
+
+    def test_filters(self):
+        self.assertEqual(self.walk(drafts=False), ['api/index.md', 'api/raw.txt', 'b.md', 'blog/post/index.md', 'index.md'])
+        self.assertEqual(self.walk(include=['*.md'], exclude=['api', 'blog/*'], drafts=False), ['b.md', 'index.md'])
+        self.assertEqual(self.walk(include=['blog/*'], drafts=False), ['blog/post/index.md'])
+
+    def test_filter_allows_matches_walk(self):
+        everything = self.walk()
+        for filters in (PageFilter(drafts=False), PageFilter(['*.md'], ['api', 'blog/*'], False), PageFilter(['blog/*'])):
+            self.assertEqual([path for path in everything if filters.allows(path)], self.walk(include=filters.include, exclude=filters.exclude, drafts=filters.drafts))
+
+    def test_iter_pages(self):
+        pages = iter_pages(self.content, self.docs, PageFilter(exclude=['api/*.txt'], drafts=False))
+        self.assertFalse(os.path.exists(self.docs))
+        self.assertEqual(next(pages), (os.path.join(self.content, 'api', 'index.md'), os.path.join(self.docs, 'api', 'index.html')))
+        self.assertTrue(os.path.isdir(os.path.join(self.docs, 'api')))
+        self.assertFalse(os.path.exists(os.path.join(self.docs, 'blog')))
+        self.assertEqual(len(list(pages)), 3)
+        self.assertEqual(len(discover_pages(self.content, self.docs)), 8)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+import os
+import tempfile
+import unittest
+
+from writer import OutputWriter, atomic_open, prepare_staging, swap_into_place
+
+class TestWriter(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = self.temp_dir.name
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def read(self, path):
+        with open(path) as file:
+            return file.read()
+
+    def test_atomic_open(self):
+        path = os.path.join(self.root, 'page.html')
+        with atomic_open(path) as file:
+            file.write('new')
+        self.assertEqual(self.read(path), 'new')
+        with self.assertRaises(ValueError):
+            with atomic_open(path) as file:
+                file.write('half')
+                raise ValueError('render failed')
+        self.assertEqual(self.read(path), 'new')
+        self.assertEqual(os.listdir(self.root), ['page.html'])
+
+    def test_output_writer(self):
+        writer = OutputWriter(max_pending=2, batch_size=2)
+        paths = [os.path.join(self.root, f'{i}.html') for i in range(5)]
+        for i, path in enumerate(paths):
+            writer.write(path, ['<p>', str(i), '</p>'])
+        missing = os.path.join(self.root, 'missing', 'page.html')
+        writer.write(missing, ['lost'])
+        errors = writer.close()
+        self.assertEqual([path for path, _ in errors], [missing])
+        self.assertEqual(writer.written, 5)
+        self.assertEqual(self.read(paths[3]), '<p>3</p>')
+
+    def test_swap_into_place(self):
+        dest = os.path.join(self.root, 'docs')
+        os.mkdir(dest)
+        with open(os.path.join(dest, 'old.html'), 'w') as file:
+            file.write('old')
+        staging = prepare_staging(dest)
+        self.assertEqual(staging, f'{dest}.staging')
+        with open(os.path.join(staging, 'new.html'), 'w') as file:
+            file.write('new')
+        swap_into_place(staging, dest)
+        self.assertEqual(os.listdir(dest), ['new.html'])
+        self.assertEqual(sorted(os.listdir(self.root)), ['docs'])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,111 @@
+import os
+import tempfile
+import unittest
+from wsgiref.util import setup_testing_defaults
+from wsgiref.validate import validator
+
+from wsgi import PreviewApp, PageCache, CachedResponse
+from walker import PageFilter
+
+class TestPreviewApp(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = self.temp_dir.name
+        self.content = os.path.join(self.root, 'content')
+        self.static = os.path.join(self.root, 'static')
+        self.template = os.path.join(self.root, 'template.html')
+        self.write(self.template, '<title>{{ Title }}</title><link href="/index.css">{{ Content }}')
+        self.write(os.path.join(self.content, 'index.md'), '# Home\n\n[post](/blog/post/)')
+        self.write(os.path.join(self.content, 'blog', 'post', 'index.md'), '# Post')
+        self.write(os.path.join(self.content, 'notes.md'), '# Notes')
+        self.write(os.path.join(self.static, 'index.css'), 'body {}')
+        self.app = PreviewApp(self.content, self.static, self.template, '/base/')
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def write(self, path, text, mtime_ns=None):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as file:
+            file.write(text)
+        if mtime_ns is not None:
+            os.utime(path, ns=(mtime_ns, mtime_ns))
+
+    def request(self, path, **headers):
+        environ = {'PATH_INFO': path, 'SCRIPT_NAME': '', **headers}
+        setup_testing_defaults(environ)
+        response = {}
+
+        def start_response(status, response_headers, exc_info=None):
+            response['status'] = status
+            response['headers'] = dict(response_headers)
+
+        body = validator(self.app)(environ, start_response)
+        try:
+            data = b''.join(body)
+        finally:
+            body.close()
+        return response['status'], response['headers'], data
+
+    def test_pages_and_static_files(self):
+        status, headers, body = self.request('/base/')
+        self.assertEqual(status, '200 OK')
+        self.assertEqual(body, b'<title>Home</title><link href="/base/index.css"><div><h1>Home</h1><p><a href="/base/blog/post/">post</a></p></div>')
+        self.assertEqual(self.request('/base/blog/post/')[2], b'<title>Post</title><link href="/base/index.css"><div><h1>Post</h1></div>')
+        self.assertEqual(self.request('/base/notes.html')[0], '200 OK')
+        self.assertEqual(self.request('/base/index.css')[2], b'body {}')
+        self.assertEqual(self.request('/base/blog/post')[1]['Location'], '/base/blog/post/')
+        self.assertEqual(self.request('/base')[1]['Location'], '/base/')
+        self.assertEqual(self.request('/base/missing/')[0], '404 Not Found')
+        self.assertEqual(self.request('/base/../template.html')[0], '404 Not Found')
+        self.assertEqual(self.request('/other/')[0], '404 Not Found')
+
+    def test_etag_and_invalidation(self):
+        page = os.path.join(self.content, 'notes.md')
+        status, headers, _ = self.request('/base/notes.html')
+        etag = headers['ETag']
+        self.assertEqual(self.request('/base/notes.html', HTTP_IF_NONE_MATCH=etag)[:1], ('304 Not Modified',))
+        self.assertEqual((self.app.cache.hits, self.app.cache.misses), (1, 1))
+
+        self.write(page, '# Changed notes', mtime_ns=os.stat(page).st_mtime_ns + 1)
+        status, headers, body = self.request('/base/notes.html', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(status, '200 OK')
+        self.assertNotEqual(headers['ETag'], etag)
+        self.assertIn(b'Changed notes', body)
+
+        self.write(self.template, '{{ Content }}', mtime_ns=os.stat(self.template).st_mtime_ns + 1)
+        self.assertEqual(self.request('/base/notes.html')[2], b'<div><h1>Changed notes</h1></div>')
+
+    def test_drafts_can_be_hidden(self):
+        self.write(os.path.join(self.content, 'blog', 'idea.draft.md'), '# Idea')
+        self.assertEqual(self.request('/base/blog/idea.draft.html')[0], '200 OK')
+        self.app = PreviewApp(self.content, self.static, self.template, '/base/', filters=PageFilter(drafts=False))
+        self.assertEqual(self.request('/base/blog/idea.draft.html')[0], '404 Not Found')
+        self.assertEqual(self.request('/base/blog/post/')[0], '200 OK')
+
+    def test_path_depends_on_the_url(self):
+        self.write(self.template, '{{ Path }}')
+        self.assertEqual(self.request('/base/blog/post/')[2], b'/base/blog/post/')
+        self.assertEqual(self.request('/base/blog/post/index.html')[2], b'/base/blog/post/index.html')
+        self.assertEqual(self.request('/base/blog/post/')[2], b'/base/blog/post/')
+
+    def test_render_errors(self):
+        self.write(os.path.join(self.content, 'broken.md'), 'no title')
+        status, _, body = self.request('/base/broken.html')
+        self.assertEqual(status, '500 Internal Server Error')
+        self.assertIn(b'no h1 header', body)
+
+    def test_page_cache_is_bounded(self):
+        cache = PageCache(max_bytes=10)
+        for name in ('a', 'b', 'c'):
+            cache.put(name, CachedResponse((0, 0), (0, 0), b'x' * 4, '"e"'))
+        self.assertEqual(list(cache.entries), ['b', 'c'])
+        self.assertIsNotNone(cache.get('b', (0, 0), (0, 0)))
+        cache.put('d', CachedResponse((0, 0), (0, 0), b'x' * 4, '"e"'))
+        self.assertEqual(list(cache.entries), ['b', 'd'])
+        self.assertIsNone(cache.get('b', (1, 0), (0, 0)))
+        cache.put('huge', CachedResponse((0, 0), (0, 0), b'x' * 11, '"e"'))
+        self.assertEqual(cache.size, 8)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -18,6 +18,8 @@ class TextNode():
             text_type: `TextType` => The type of content the node represent, should use a type available in the `TextType` enum
             url (optional): `string` => URL for cases where the element needs a url (links or images)
     """
+    __slots__ = ("text", "text_type", "url")
+
     def __init__(self, text: str, text_type: TextType, url: Optional[str]=None):
         self.text = text
         self.text_type = text_type
@@ -26,9 +28,7 @@ class TextNode():
     def __eq__(self, other_node: Any) -> bool:
         if not isinstance(other_node, TextNode):
             return False
-        if (other_node.text == self.text and other_node.text_type == self.text_type and other_node.url == self.url):
-           return True
-        return False 
+        return other_node.text_type is self.text_type and other_node.text == self.text and other_node.url == self.url
     
     def __repr__(self):
         return f"TextNode({self.text}, {self.text_type}, {self.url})"
@@ -0,0 +1,66 @@
+import os
+from fnmatch import fnmatchcase
+from typing import Iterator, Optional, Sequence, List, NamedTuple
+
+DRAFT_PATTERNS = ['_*', '*.draft.*']
+
+class PageFilter(NamedTuple):
+    """
+        Which content files are built, see `walk_files`
+    """
+    include: Sequence[str] = ()
+    exclude: Sequence[str] = ()
+    drafts: bool = True
+
+    def allows(self, relative_path: str) -> bool:
+        """
+            Checks a single file the way `walk_files` would, for when a file changes without walking the whole folder
+
+            Takes:
+            `relative_path: str` => the path of the file below the folder that is walked
+        """
+        parts = relative_path.replace(os.sep, '/').split('/')
+        for index in range(len(parts)):
+            if self.exclude and matches_any('/'.join(parts[:index + 1]), self.exclude):
+                return False
+            if not self.drafts and matches_any(parts[index], DRAFT_PATTERNS):
+                return False
+        return not self.include or matches_any('/'.join(parts), self.include)
+
+def matches_any(path: str, patterns: Sequence[str]) -> bool:
+    return any(fnmatchcase(path, pattern) for pattern in patterns)
+
+def sorted_entries(path: str) -> List[os.DirEntry]:
+    with os.scandir(path) as entries:
+        return sorted(entries, key=lambda entry: entry.name)
+
+def walk_files(root: str, include: Optional[Sequence[str]] = None, exclude: Optional[Sequence[str]] = None, drafts: bool = True) -> Iterator[os.DirEntry]:
+    """
+        Walks `root` depth first with `os.scandir`, yielding every file as it is found.
+        Folders are visited in name order without recursion, and the type of every entry comes from the `DirEntry` so no extra stat is needed.
+
+        Takes:
+        `root: str` => the folder to walk
+        `include: List[str]` => globs of paths relative to `root`, when given only files matching one of them are yielded
+        `exclude: List[str]` => globs of paths relative to `root`, files and folders matching one of them are skipped
+        `drafts: bool` => whether to yield drafts, files and folders whose name matches `DRAFT_PATTERNS`
+
+        Returns
+        `Iterator[DirEntry]` => the files, their `path` is joined onto `root`
+    """
+    prefix = len(os.path.join(root, ''))
+    stack = [iter(sorted_entries(root))]
+    while stack:
+        entry = next(stack[-1], None)
+        if entry is None:
+            stack.pop()
+            continue
+        relative_path = entry.path[prefix:].replace(os.sep, '/')
+        if exclude and matches_any(relative_path, exclude):
+            continue
+        if not drafts and matches_any(entry.name, DRAFT_PATTERNS):
+            continue
+        if entry.is_dir():
+            stack.append(iter(sorted_entries(entry.path)))
+        elif not include or matches_any(relative_path, include):
+            yield entry
@@ -0,0 +1,128 @@
+import os
+import sys
+import queue
+import shutil
+import ctypes
+import ctypes.util
+import threading
+from contextlib import contextmanager
+from typing import List, Tuple, Iterator, IO
+
+AT_FDCWD = -100
+RENAME_EXCHANGE = 2
+WRITE_BUFFER_SIZE = 1 << 16
+
+@contextmanager
+def atomic_open(path: str, mode: str = 'w') -> Iterator[IO]:
+    """
+        Opens a temporary file next to `path` for writing and renames it over `path` once the `with` block finishes, so readers never see a half written file.
+        Pass `mode='wb'` to write bytes.
+    """
+    temp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    try:
+        with open(temp_path, mode, buffering=WRITE_BUFFER_SIZE) as file:
+            yield file
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+def write_file(path: str, chunks: List[str]) -> None:
+    with atomic_open(path) as file:
+        file.writelines(chunks)
+
+class OutputWriter():
+    """
+        Writes files on a background thread so rendering the next page can carry on while the last one is written.
+        Files are queued as lists of chunks and the thread takes them off the queue in batches.
+
+        Args:
+            - `max_pending : int` => How many files may be waiting to be written before `write` blocks, this bounds the memory used
+            - `batch_size : int` => How many queued files the thread writes before checking for more
+    """
+    def __init__(self, max_pending: int = 64, batch_size: int = 16):
+        self.queue: queue.Queue = queue.Queue(max_pending)
+        self.batch_size = batch_size
+        self.errors: List[Tuple[str, Exception]] = []
+        self.written = 0
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def write(self, path: str, chunks: List[str]) -> None:
+        self.queue.put((path, chunks))
+
+    def run(self) -> None:
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            for item in batch:
+                if item is None:
+                    return
+                path, chunks = item
+                try:
+                    write_file(path, chunks)
+                    self.written += 1
+                except Exception as error:
+                    self.errors.append((path, error))
+
+    def close(self) -> List[Tuple[str, Exception]]:
+        """
+            Waits for every queued file to be written
+
+            Returns
+            `errors: List[Tuple[str, Exception]]` => the files that could not be written along with their error
+        """
+        self.queue.put(None)
+        self.thread.join()
+        return self.errors
+
+def prepare_staging(dest_path: str) -> str:
+    """
+        Creates an empty folder next to `dest_path` to build into
+
+        Returns
+        `staging_path: str`
+    """
+    staging_path = f'{os.path.normpath(dest_path)}.staging'
+    if os.path.exists(staging_path):
+        shutil.rmtree(staging_path)
+    os.mkdir(staging_path)
+    return staging_path
+
+def exchange(first_path: str, second_path: str) -> bool:
+    """
+        Swaps two paths in one atomic step using `renameat2`, only available on linux
+
+        Returns
+        `bool` => whether the paths were swapped
+    """
+    if not sys.platform.startswith('linux'):
+        return False
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        result = libc.renameat2(AT_FDCWD, os.fsencode(first_path), AT_FDCWD, os.fsencode(second_path), RENAME_EXCHANGE)
+    except (OSError, AttributeError):
+        return False
+    return result == 0
+
+def swap_into_place(staging_path: str, dest_path: str) -> None:
+    """
+        Replaces `dest_path` with the finished build in `staging_path` and removes the old build.
+        The swap is atomic where the system supports it, otherwise `dest_path` is missing for the moment between two renames.
+    """
+    dest_path = os.path.normpath(dest_path)
+    if os.path.exists(dest_path) and exchange(staging_path, dest_path):
+        shutil.rmtree(staging_path)
+        return
+    old_path = f'{dest_path}.old'
+    if os.path.exists(old_path):
+        shutil.rmtree(old_path)
+    if os.path.exists(dest_path):
+        os.rename(dest_path, old_path)
+    os.rename(staging_path, dest_path)
+    if os.path.exists(old_path):
+        shutil.rmtree(old_path)
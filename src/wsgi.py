@@ -0,0 +1,215 @@
+import os
+import sys
+import hashlib
+import argparse
+import mimetypes
+import posixpath
+import threading
+from collections import OrderedDict
+from typing import Optional, Dict, List, Tuple, Iterable, Callable, NamedTuple
+
+from main import render_content
+from template import load_template
+from walker import PageFilter
+
+DEFAULT_PAGE_CACHE_SIZE = 64 * 1024 * 1024
+
+class CachedResponse(NamedTuple):
+    source: Tuple[int, int]
+    template: Tuple[int, int]
+    body: bytes
+    etag: str
+
+def file_version(path: str) -> Tuple[int, int]:
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+def etag_matches(header: Optional[str], etag: str) -> bool:
+    if not header:
+        return False
+    return header.strip() == '*' or etag in (tag.strip().removeprefix('W/') for tag in header.split(','))
+
+class PageCache():
+    """
+        Rendered pages kept in least recently used order, bounded by the total size of their bodies
+
+        Args:
+            - `max_bytes : int` => How many bytes of rendered html to keep, the least recently used pages are dropped first
+    """
+    def __init__(self, max_bytes: int = DEFAULT_PAGE_CACHE_SIZE):
+        self.max_bytes = max_bytes
+        self.entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, url: str, source: Tuple[int, int], template: Tuple[int, int]) -> Optional[CachedResponse]:
+        """
+            Returns the page rendered for `url` unless the md file or the template changed since
+        """
+        with self.lock:
+            entry = self.entries.get(url)
+            if entry is None or entry.source != source or entry.template != template:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(url)
+            self.hits += 1
+            return entry
+
+    def put(self, url: str, entry: CachedResponse) -> None:
+        with self.lock:
+            old_entry = self.entries.pop(url, None)
+            if old_entry is not None:
+                self.size -= len(old_entry.body)
+            if len(entry.body) > self.max_bytes:
+                return
+            self.entries[url] = entry
+            self.size += len(entry.body)
+            while self.size > self.max_bytes:
+                _, dropped = self.entries.popitem(last=False)
+                self.size -= len(dropped.body)
+
+class PreviewApp():
+    """
+        WSGI application that renders pages when they are first requested instead of building the whole site up front.
+        `/blog/tom/` is rendered from `content/blog/tom/index.md` and `/notes.html` from `content/notes.md`, anything else is served from the static folder.
+        Rendered pages are kept in a `PageCache` and rendered again once their md file or the template changes. Every response has an `ETag` and requests that already have it get a `304`.
+
+        Args:
+            - `content_path : str` => The folder containing the md files
+            - `static_path : str` => The folder containing the static files
+            - `template_path : str` => The template file
+            - `basepath : str` => The path the site is served under
+            - `cache_size : int` => How many bytes of rendered pages to keep
+            - `filters : PageFilter` => Content files that are not served, eg drafts
+    """
+    def __init__(self, content_path: str, static_path: str, template_path: str, basepath: str = '/', cache_size: int = DEFAULT_PAGE_CACHE_SIZE, filters: PageFilter = PageFilter()):
+        self.content_path = content_path
+        self.static_path = static_path
+        self.template_path = template_path
+        self.basepath = basepath
+        self.cache = PageCache(cache_size)
+        self.filters = filters
+
+    def resolve(self, url: str) -> Tuple[Optional[str], Optional[str]]:
+        """
+            Works out which file answers a request path
+
+            Takes:
+            `url: str` => the request path below the basepath, eg `/blog/tom/`
+
+            Returns
+            `(page, static)` => the md file to render or the static file to serve, both `None` when there is neither
+        """
+        parts = [part for part in posixpath.normpath(url).split('/') if part]
+        if url.endswith('/') or not parts:
+            return self.resolve_page([*parts, 'index.md'])
+        if parts[-1].endswith('.html'):
+            return self.resolve_page([*parts[:-1], f'{parts[-1][:-len(".html")]}.md'])
+        static = os.path.join(self.static_path, *parts)
+        return (None, static) if os.path.isfile(static) else (None, None)
+
+    def resolve_page(self, parts: List[str]) -> Tuple[Optional[str], Optional[str]]:
+        page = os.path.join(self.content_path, *parts)
+        if not os.path.isfile(page) or not self.filters.allows('/'.join(parts)):
+            return None, None
+        return page, None
+
+    def render(self, page: str, url: str) -> CachedResponse:
+        """
+            Returns the page rendered from `page`, rendering it when it is not in the cache or changed.
+            Pages are cached by `url` since the `Path` filled into the template comes from it, eg `/blog/tom/` and `/blog/tom/index.html` differ
+        """
+        source = file_version(page)
+        template_version = file_version(self.template_path)
+        cached = self.cache.get(url, source, template_version)
+        if cached is not None:
+            return cached
+        with open(page) as file:
+            markdown = file.read()
+        rendered = render_content(markdown, self.basepath)
+        template = load_template(self.template_path, self.basepath)
+        html = template.render({**rendered.metadata, 'Title': rendered.title, 'Content': rendered.content, 'Path': f'{self.basepath}{url[1:]}'})
+        body = html.encode('utf-8')
+        entry = CachedResponse(source, template_version, body, f'"{hashlib.sha256(body).hexdigest()[:20]}"')
+        self.cache.put(url, entry)
+        return entry
+
+    def __call__(self, environ: Dict, start_response: Callable) -> Iterable[bytes]:
+        method = environ.get('REQUEST_METHOD', 'GET')
+        if method not in ('GET', 'HEAD'):
+            return respond(start_response, '405 Method Not Allowed', [('Allow', 'GET, HEAD')], b'method not allowed\n', method)
+        path = environ.get('PATH_INFO', '/') or '/'
+        if f'{path}/' == self.basepath:
+            return respond(start_response, '301 Moved Permanently', [('Location', self.basepath)], b'', method)
+        if not path.startswith(self.basepath):
+            return respond(start_response, '404 Not Found', [], b'not found\n', method)
+        url = '/' + path[len(self.basepath):]
+        page, static = self.resolve(url)
+        if page is None and static is None and not url.endswith('/') and self.resolve(f'{url}/')[0] is not None:
+            return respond(start_response, '301 Moved Permanently', [('Location', f'{path}/')], b'', method)
+
+        if page is not None:
+            try:
+                entry = self.render(page, url)
+            except Exception as error:
+                print(f'Failed to render {page}: {error}', file=sys.stderr)
+                return respond(start_response, '500 Internal Server Error', [], f'failed to render {url}: {error}\n'.encode(), method)
+            headers = [('Content-Type', 'text/html; charset=utf-8'), ('ETag', entry.etag), ('Cache-Control', 'no-cache')]
+            if etag_matches(environ.get('HTTP_IF_NONE_MATCH'), entry.etag):
+                return respond(start_response, '304 Not Modified', headers, b'', method)
+            return respond(start_response, '200 OK', headers, entry.body, method)
+
+        if static is not None:
+            mtime, size = file_version(static)
+            etag = f'"{mtime:x}-{size:x}"'
+            content_type = mimetypes.guess_type(static)[0] or 'application/octet-stream'
+            headers = [('Content-Type', content_type), ('ETag', etag), ('Cache-Control', 'no-cache')]
+            if etag_matches(environ.get('HTTP_IF_NONE_MATCH'), etag):
+                return respond(start_response, '304 Not Modified', headers, b'', method)
+            start_response('200 OK', headers + [('Content-Length', str(size))])
+            if method == 'HEAD':
+                return [b'']
+            file = open(static, 'rb')
+            wrapper = environ.get('wsgi.file_wrapper')
+            if wrapper is not None:
+                return wrapper(file)
+            return read_and_close(file)
+
+        return respond(start_response, '404 Not Found', [], b'not found\n', method)
+
+def respond(start_response: Callable, status: str, headers: List[Tuple[str, str]], body: bytes, method: str) -> List[bytes]:
+    if status.startswith('304'):
+        start_response(status, [(name, value) for name, value in headers if name != 'Content-Type'])
+        return [b'']
+    if not any(name == 'Content-Type' for name, _ in headers):
+        headers = headers + [('Content-Type', 'text/plain; charset=utf-8')]
+    start_response(status, headers + [('Content-Length', str(len(body)))])
+    return [b''] if method == 'HEAD' else [body]
+
+def read_and_close(file) -> Iterable[bytes]:
+    with file:
+        for chunk in iter(lambda: file.read(1 << 16), b''):
+            yield chunk
+
+application = PreviewApp('./content', './static', './template.html', os.environ.get('SITE_BASEPATH', '/'))
+
+def parse_args(argv: Optional[list] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog='main.py preview', description='Serves the site rendering each page when it is first requested, without building ./docs')
+    parser.add_argument('--port', type=int, default=8888, help='the port to serve on')
+    parser.add_argument('--basepath', default='/', help='the path the site is served under')
+    parser.add_argument('--drafts', action=argparse.BooleanOptionalAction, default=True, help='serve drafts, content files and folders named _* or *.draft.*, --no-drafts hides them')
+    parser.add_argument('--cache-size', type=int, default=DEFAULT_PAGE_CACHE_SIZE // (1024 * 1024), help='how many megabytes of rendered pages to keep')
+    return parser.parse_args(argv)
+
+def main(argv: Optional[list] = None):
+    from wsgiref.simple_server import make_server
+    args = parse_args(argv)
+    app = PreviewApp('./content', './static', './template.html', args.basepath, args.cache_size * 1024 * 1024, PageFilter(drafts=args.drafts))
+    with make_server('', args.port, app) as httpd:
+        print(f'Previewing ./content on http://localhost:{args.port}{args.basepath}')
+        try:
+            httpd.serve_forever()
+        except KeyboardInterrupt:
+            pass